@@ -1,22 +1,52 @@
+from .backend import CacheBackend, ContextVarBackend, SizeAwareBackend, WeakValueBackend
 from .decorator import injectable
 from .exception import DependencyResolveError
-from .main import register_app, resolve_dependencies
+from .main import get_dependency_graph, register_app, resolve_dependencies, resolve_dependencies_many, warmup
+from .policy import cached
+from .process import InjectableProcessPoolExecutor
+from .request import capture_request
+from .scope import Scope, dependency_scope, injection_scope
 from .util import (
+    aget_injected_obj,
     cleanup_all_exit_stacks,
     cleanup_exit_stack_of_func,
     clear_dependency_cache,
+    configure_dependency_cache,
+    configure_loop_pool,
+    get_dependency_cache_stats,
     get_injected_obj,
+    get_injected_objs,
+    invalidate_dependency_cache,
     setup_graceful_shutdown,
 )
 
 __all__ = [
+    "CacheBackend",
+    "ContextVarBackend",
     "DependencyResolveError",
+    "InjectableProcessPoolExecutor",
+    "Scope",
+    "SizeAwareBackend",
+    "WeakValueBackend",
+    "aget_injected_obj",
+    "cached",
+    "capture_request",
     "cleanup_all_exit_stacks",
     "cleanup_exit_stack_of_func",
     "clear_dependency_cache",
+    "configure_dependency_cache",
+    "configure_loop_pool",
+    "dependency_scope",
+    "get_dependency_cache_stats",
+    "get_dependency_graph",
     "get_injected_obj",
+    "get_injected_objs",
     "injectable",
+    "injection_scope",
+    "invalidate_dependency_cache",
     "register_app",
     "resolve_dependencies",
+    "resolve_dependencies_many",
     "setup_graceful_shutdown",
+    "warmup",
 ]
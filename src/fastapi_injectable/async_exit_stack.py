@@ -1,5 +1,6 @@
 import asyncio
 import logging
+import threading
 from collections.abc import Callable
 from contextlib import AsyncExitStack
 from typing import Any
@@ -12,9 +13,15 @@ logger = logging.getLogger(__name__)
 
 
 class AsyncExitStackManager:
+    """The exit stacks of the injectable functions, shared by all the threads and event loops of the process.
+
+    The stacks are looked up without any lock. Creating or removing them holds a thread lock, but the stacks are
+    closed after it is released.
+    """
+
     def __init__(self) -> None:
         self._stacks: WeakKeyDictionary[Callable[..., Any], AsyncExitStack] = WeakKeyDictionary()
-        self._lock = asyncio.Lock()
+        self._lock = threading.Lock()
 
     async def get_stack(self, func: Callable[..., Any]) -> AsyncExitStack:
         """Retrieve or create a stack and loop for managing async resources.
@@ -25,10 +32,28 @@ class AsyncExitStackManager:
         Returns:
             AsyncExitStack: The exit stack for the given function
         """
-        async with self._lock:
-            if func not in self._stacks:
-                self._stacks[func] = AsyncExitStack()
-            return self._stacks[func]
+        return self.get_stack_sync(func)
+
+    def get_stack_sync(self, func: Callable[..., Any]) -> AsyncExitStack:
+        """Retrieve or create a stack for managing resources, without an event loop.
+
+        Args:
+            func: The function to associate with an exit stack
+
+        Returns:
+            AsyncExitStack: The exit stack for the given function
+        """
+        stack = self._stacks.get(func)
+        if stack is None:
+            with self._lock:
+                stack = self._stacks.setdefault(func, AsyncExitStack())
+        return stack
+
+    def reset(self) -> None:
+        """Forget all the stacks without closing them, for a forked process that does not own their resources."""
+        self._stacks = WeakKeyDictionary()
+        # The lock may have been held by another thread of the parent process when it forked.
+        self._lock = threading.Lock()
 
     async def cleanup_stack(self, func: Callable[..., Any], *, raise_exception: bool = False) -> None:
         """Clean up the stack associated with the given function.
@@ -45,18 +70,18 @@ class AsyncExitStackManager:
 
         original_func = getattr(func, "__original_func__", func)
 
-        async with self._lock:
+        with self._lock:
             stack = self._stacks.pop(original_func, None)
-            if not stack:
-                return  # pragma: no cover
+        if not stack:
+            return  # pragma: no cover
 
-            try:
-                await loop_manager.run_in_loop(stack.aclose())
-            except Exception as e:  # pragma: no cover
-                msg = f"Failed to cleanup stack for {func.__name__}"
-                if raise_exception:
-                    raise DependencyCleanupError(msg) from e
-                logger.exception(msg)
+        try:
+            await loop_manager.run_in_loop(stack.aclose())
+        except Exception as e:  # pragma: no cover
+            msg = f"Failed to cleanup stack for {func.__name__}"
+            if raise_exception:
+                raise DependencyCleanupError(msg) from e
+            logger.exception(msg)
 
     async def cleanup_all_stacks(self, *, raise_exception: bool = False) -> None:
         """Clean up all stacks.
@@ -70,20 +95,20 @@ class AsyncExitStackManager:
         if not self._stacks:
             return
 
-        async with self._lock:
-            tasks = [stack.aclose() for stack in self._stacks.values()]
+        with self._lock:
+            stacks = list(self._stacks.values())
             self._stacks.clear()
 
-            if not tasks:
-                return  # pragma: no cover
+        if not stacks:
+            return  # pragma: no cover
 
-            try:
-                await loop_manager.run_in_loop(asyncio.gather(*tasks))
-            except Exception as e:  # pragma: no cover
-                msg = "Failed to cleanup one or more dependency stacks"
-                if raise_exception:
-                    raise DependencyCleanupError(msg) from e
-                logger.exception(msg)
+        try:
+            await loop_manager.run_in_loop(asyncio.gather(*(stack.aclose() for stack in stacks)))
+        except Exception as e:  # pragma: no cover
+            msg = "Failed to cleanup one or more dependency stacks"
+            if raise_exception:
+                raise DependencyCleanupError(msg) from e
+            logger.exception(msg)
 
 
 async_exit_stack_manager = AsyncExitStackManager()
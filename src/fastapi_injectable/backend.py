@@ -0,0 +1,236 @@
+import sys
+import threading
+import weakref
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator, Mapping, MutableMapping
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import partial
+from typing import Any
+
+_MISSING = object()
+
+
+class CacheBackend(MutableMapping[Any, Any]):
+    """A storage that the dependency cache can be kept in, instead of the default plain dict.
+
+    A backend is a mutable mapping from cache keys to resolved dependencies: subclasses implement `__getitem__`,
+    `__setitem__`, `__delitem__`, `__iter__` and `__len__`, and may override `clear`, `get_many` and `set_many` with
+    faster versions. Lookups can be made from many threads and event loops at once, so they should not block, while
+    writes must be thread-safe. Backends that drop entries on their own count them in `evictions`, which is reported
+    by `get_dependency_cache_stats()`.
+    """
+
+    evictions = 0
+
+    def get_many(self, keys: Iterable[Any]) -> dict[Any, Any]:
+        """Look several keys up at once.
+
+        Args:
+            keys: The cache keys to look up
+
+        Returns:
+            The cached values of the keys that are cached.
+        """
+        values: dict[Any, Any] = {}
+        for key in keys:
+            value = self.get(key, _MISSING)
+            if value is not _MISSING:
+                values[key] = value
+        return values
+
+    def set_many(self, values: Mapping[Any, Any]) -> None:
+        """Cache several values at once."""
+        self.update(values)
+
+    def get_partition(self) -> object | None:
+        """Get the storage that the lookups currently go to.
+
+        The concurrent resolutions of a dependency are only coalesced within the same partition, which is the backend
+        itself unless it keeps separate storages, e.g. per context. None means that the cache is bypassed, so nothing
+        is coalesced.
+        """
+        return self
+
+
+class _StrongRef:
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any) -> None:  # noqa: ANN401
+        self.value = value
+
+    def __call__(self) -> Any:  # noqa: ANN401
+        return self.value
+
+
+class WeakValueBackend(CacheBackend):
+    """A backend holding the resolved dependencies by weak references, so that unused ones can be garbage collected.
+
+    A dependency stays cached only as long as something else, e.g. a long-lived service, references it, and is
+    resolved again afterwards. Values that cannot be weakly referenced, such as numbers, strings or built-in
+    containers, are held strongly instead.
+    """
+
+    def __init__(self) -> None:
+        self.evictions = 0
+        self._refs: dict[Any, Callable[[], Any]] = {}
+
+    def __getitem__(self, key: Any) -> Any:  # noqa: ANN401
+        ref = self._refs[key]
+        value = ref()
+        if value is None and isinstance(ref, weakref.ref):
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:  # noqa: ANN401
+        try:
+            self._refs[key] = weakref.ref(value, partial(self._collect, key))
+        except TypeError:
+            self._refs[key] = _StrongRef(value)
+
+    def __delitem__(self, key: Any) -> None:  # noqa: ANN401
+        del self._refs[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._refs))
+
+    def __len__(self) -> int:
+        return len(self._refs)
+
+    def clear(self) -> None:
+        self._refs.clear()
+
+    def _collect(self, key: Any, ref: Callable[[], Any]) -> None:  # noqa: ANN401
+        # Called by the garbage collector, possibly while a lock is held, so this must not take any lock itself.
+        if self._refs.get(key) is ref:
+            self._refs.pop(key, None)
+            self.evictions += 1
+
+
+class SizeAwareBackend(CacheBackend):
+    """A backend holding resolved dependencies within a memory budget, evicting the least recently used ones first.
+
+    A value larger than the whole budget is not cached at all, and leaves the other values in place.
+
+    Args:
+        max_bytes: The memory budget, in bytes
+        sizeof: A callable estimating the size of a value in bytes. Defaults to `sys.getsizeof`, which does not count
+            the objects referenced by the value, so pass a deep estimate for containers.
+    """
+
+    def __init__(self, max_bytes: int, *, sizeof: Callable[[Any], int] = sys.getsizeof) -> None:
+        if max_bytes <= 0:
+            msg = f"max_bytes must be positive, got {max_bytes}"
+            raise ValueError(msg)
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.evictions = 0
+        self._sizeof = sizeof
+        self._data: OrderedDict[Any, tuple[Any, int]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: Any) -> Any:  # noqa: ANN401
+        value, _ = self._data[key]
+        # Raises a KeyError, i.e. a miss, if the entry was evicted by another thread in the meantime.
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: Any, value: Any) -> None:  # noqa: ANN401
+        size = self._sizeof(value)
+        with self._lock:
+            _, previous_size = self._data.pop(key, (None, 0))
+            if size > self.max_bytes:
+                # Not cached, without evicting the other values to make room for it in vain. The previous value is
+                # dropped all the same, so that the key is not left pointing to an outdated value.
+                self.size_bytes -= previous_size
+                return
+            self._data[key] = (value, size)
+            self.size_bytes += size - previous_size
+            while self.size_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._data.popitem(last=False)
+                self.size_bytes -= evicted_size
+                self.evictions += 1
+
+    def __delitem__(self, key: Any) -> None:  # noqa: ANN401
+        with self._lock:
+            _, size = self._data.pop(key)
+            self.size_bytes -= size
+
+    def __iter__(self) -> Iterator[Any]:
+        # Iterate over a snapshot, since lookups reorder the entries.
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.size_bytes = 0
+
+
+class ContextVarBackend(CacheBackend):
+    """A backend keeping a separate cache per context, e.g. per tenant or per test, through a context variable.
+
+    A cache is only active within a `with backend.partition():` block, and is shared with the contexts copied from
+    it meanwhile, such as the tasks it creates or the sync injectable functions it calls. Partitions never see each
+    other's values, and their concurrent resolutions of a dependency are not coalesced. Outside of any partition,
+    the cache is bypassed: every lookup misses and nothing is stored.
+
+    Args:
+        name: The name of the underlying context variable
+
+    Example:
+        ```python
+        backend = ContextVarBackend()
+        await register_app(app, cache_backend=backend)
+
+        with backend.partition():
+            await handle_tenant_request()
+        ```
+    """
+
+    def __init__(self, name: str = "fastapi_injectable_cache") -> None:
+        self._data: ContextVar[dict[Any, Any] | None] = ContextVar(name, default=None)
+
+    def __getitem__(self, key: Any) -> Any:  # noqa: ANN401
+        data = self._data.get()
+        if data is None:
+            raise KeyError(key)
+        return data[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:  # noqa: ANN401
+        data = self._data.get()
+        if data is not None:
+            data[key] = value
+
+    def __delitem__(self, key: Any) -> None:  # noqa: ANN401
+        data = self._data.get()
+        if data is None:
+            raise KeyError(key)
+        del data[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(list(self._data.get() or ()))
+
+    def __len__(self) -> int:
+        return len(self._data.get() or ())
+
+    def clear(self) -> None:
+        """Clear the cache of the active partition only."""
+        data = self._data.get()
+        if data is not None:
+            data.clear()
+
+    @contextmanager
+    def partition(self) -> Iterator[None]:
+        """Activate a new, empty cache for the current context, until the block exits."""
+        token = self._data.set({})
+        try:
+            yield
+        finally:
+            self._data.reset(token)
+
+    def get_partition(self) -> object | None:
+        """Get the cache of the active partition, or None if there is none."""
+        return self._data.get()
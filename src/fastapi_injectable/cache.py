@@ -1,24 +1,394 @@
-import asyncio
-from collections.abc import Callable
+import os
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Iterator, MutableMapping
+from concurrent.futures import Future
+from dataclasses import dataclass
 from typing import Any
 
+from .backend import CacheBackend
+from .concurrency import get_running_loop_or_none, is_blocked_loop
+
+MISSING = object()
+RETRY = object()
+HIT = 0
+MISS = 1
+COALESCED = 2
+
+
+class BoundedCache(CacheBackend):
+    """A mapping holding at most `max_size` entries, each for at most `ttl` seconds, plus `stale_ttl` seconds.
+
+    The least recently used entry is evicted when a new one does not fit, and expired entries are dropped when they
+    are looked up or when they reach the least recently used end. An entry older than `ttl` but not than `ttl` plus
+    `stale_ttl` is stale: it is still looked up as usual, but `is_stale()` tells it should be refreshed. Every
+    operation is O(1): lookups are lock-free, while the writes hold a lock of the cache only for the time of a few
+    dict operations, so that it can be shared by many threads and event loops.
+    """
+
+    def __init__(
+        self, *, max_size: int | None = None, ttl: float | None = None, stale_ttl: float | None = None
+    ) -> None:
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.evictions = 0
+        self._data: OrderedDict[Any, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __getitem__(self, key: Any) -> Any:  # noqa: ANN401
+        value, expires_at = self._data[key]
+        if expires_at is not None and expires_at <= time.monotonic():
+            with self._lock:
+                self._data.pop(key, None)
+                self.evictions += 1
+            raise KeyError(key)
+        # Raises a KeyError, i.e. a miss, if the entry was evicted by another thread in the meantime.
+        self._data.move_to_end(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        try:
+            self[key]
+        except KeyError:
+            return False
+        return True
+
+    def __setitem__(self, key: Any, value: Any) -> None:  # noqa: ANN401
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl + (self.stale_ttl or 0)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            if self.max_size is not None and len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            if expires_at is not None:
+                self._drop_expired(time.monotonic())
+
+    def __delitem__(self, key: Any) -> None:  # noqa: ANN401
+        with self._lock:
+            del self._data[key]
+
+    def __iter__(self) -> Iterator[Any]:
+        # Iterate over a snapshot, since lookups reorder the entries.
+        return iter(list(self._data))
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def is_stale(self, key: Any) -> bool:  # noqa: ANN401
+        """Check whether the given entry is older than `ttl`, and is only kept until it is refreshed."""
+        entry = self._data.get(key)
+        if entry is None or entry[1] is None or self.stale_ttl is None:
+            return False
+        return entry[1] - self.stale_ttl <= time.monotonic()
+
+    def _drop_expired(self, now: float) -> None:
+        # Only called with the lock held. Even the entry that was just inserted may have expired by now, if the ttl is
+        # shorter than the time it took to get here.
+        while self._data and (expires_at := next(iter(self._data.values()))[1]) is not None and expires_at <= now:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+class Flight:
+    """The resolution of a cached dependency, which the concurrent resolvers of the same dependency wait for."""
+
+    __slots__ = ("_key", "_single_flight", "future", "loop")
+
+    def __init__(self, single_flight: "SingleFlight", key: tuple[int, Any] | None) -> None:
+        self._single_flight = single_flight
+        self._key = key
+        self.future: Future[Any] = Future()
+        # The loop of the resolver, if it resolves the dependency in one.
+        self.loop = get_running_loop_or_none()
+
+    def resolve(self, cache: MutableMapping[Any, Any], cache_key: Any, value: Any) -> None:  # noqa: ANN401
+        """Cache the resolved value, then hand it to the waiting resolvers."""
+        if cache_key not in cache:
+            cache[cache_key] = value
+            self._single_flight.dependency_cache.record_insert(cache)
+        if self._key is not None:
+            self._single_flight.flights.pop(self._key, None)
+        self.future.set_result(value)
+
+    def fail(self, error: BaseException) -> None:
+        """Hand the error to the waiting resolvers, or let them retry if the resolution was cancelled."""
+        if self._key is not None:
+            self._single_flight.flights.pop(self._key, None)
+        if isinstance(error, Exception):
+            self.future.set_exception(error)
+        else:
+            self.future.set_result(RETRY)
+
+
+class SingleFlight:
+    """Coalesce the concurrent resolutions of a cached dependency, across tasks, event loops and threads."""
+
+    def __init__(self, dependency_cache: "DependencyCache") -> None:
+        self.dependency_cache = dependency_cache
+        self.flights: dict[tuple[int, Any], Flight] = {}
+
+    def reset(self) -> None:
+        """Forget the resolutions in flight, for a forked process where the threads resolving them do not exist."""
+        self.flights = {}
+
+    def join(self, cache: MutableMapping[Any, Any], cache_key: Any) -> tuple[Any, "Future[Any] | Flight | None"]:  # noqa: ANN401
+        """Look the given cache key up, or join the resolution of the same cache key that is already in flight.
+
+        A resolution in flight in a loop that is blocked waiting for the caller is not joined, but resolved anew.
+
+        Args:
+            cache: The cache that the dependency is resolved into
+            cache_key: The cache key of the dependency
+
+        Returns:
+            The cached value and None if there is one. Otherwise `MISSING` and either the future of the resolution
+            in flight, which gives the resolved value or `RETRY`, or a new `Flight` if the caller has to resolve the
+            dependency itself, in which case it must either resolve or fail it.
+        """
+        value = cache.get(cache_key, MISSING)
+        if value is not MISSING:
+            self.dependency_cache.record_lookup(cache, cache_key, HIT)
+            return value, None
+
+        partition = cache.get_partition() if isinstance(cache, CacheBackend) else cache
+        if partition is None:
+            # The cache is bypassed, so there is nothing to coalesce on: the flight is not registered.
+            self.dependency_cache.record_lookup(cache, cache_key, MISS)
+            return MISSING, Flight(self, None)
+
+        key = (id(partition), cache_key)
+        flight = Flight(self, key)
+        in_flight = self.flights.setdefault(key, flight)
+        if in_flight is not flight:
+            if in_flight.loop is not None and is_blocked_loop(in_flight.loop):
+                # The resolver in flight is blocked waiting for the caller, which was offloaded from its loop, so
+                # waiting for it in turn would deadlock: the caller resolves the dependency on its own instead.
+                self.dependency_cache.record_lookup(cache, cache_key, MISS)
+                return MISSING, Flight(self, None)
+            self.dependency_cache.record_lookup(cache, cache_key, COALESCED)
+            return MISSING, in_flight.future
+
+        # Resolved by another resolver between the lookup and the claim.
+        value = cache.get(cache_key, MISSING)
+        if value is not MISSING:
+            self.flights.pop(key, None)
+            flight.future.set_result(value)
+            self.dependency_cache.record_lookup(cache, cache_key, HIT)
+            return value, None
+
+        self.dependency_cache.record_lookup(cache, cache_key, MISS)
+        return MISSING, flight
+
+
+@dataclass(frozen=True, slots=True)
+class DependencyStats:
+    hits: int
+    misses: int
+    coalesced: int
+
+
+@dataclass(frozen=True, slots=True)
+class CacheStats:
+    """A snapshot of the counters of the dependency cache.
+
+    Attributes:
+        hits: The number of lookups served from the cache
+        misses: The number of lookups that had to resolve the dependency
+        coalesced: The number of lookups that waited for a concurrent resolution of the same dependency
+        inserts: The number of dependencies stored into the cache
+        evictions: The number of dependencies evicted from the cache because of its bounds
+        size: The number of dependencies currently cached
+        dependencies: The hits, misses and coalesced lookups of each dependency
+    """
+
+    hits: int
+    misses: int
+    coalesced: int
+    inserts: int
+    evictions: int
+    size: int
+    dependencies: dict[Callable[..., Any] | None, DependencyStats]
+
 
 class DependencyCache:
+    """The global dependency cache, shared by all the threads and event loops of the process.
+
+    The cache is read without any lock. Replacing or clearing it holds a thread lock, which, unlike an asyncio lock,
+    is not bound to the event loop it was first used in.
+    """
+
     def __init__(self) -> None:
-        self._cache: dict[tuple[Callable[..., Any], tuple[str]], Any] = {}
-        self._lock = asyncio.Lock()
+        self._cache: MutableMapping[tuple[Callable[..., Any], tuple[str]], Any] = {}
+        self._lock = threading.Lock()
+        self._lookups = [0, 0, 0]
+        self._inserts = 0
+        self._evictions = 0
+        self._dependency_lookups: dict[Callable[..., Any] | None, list[int]] = {}
+        self._policy_caches: dict[Callable[..., Any] | None, BoundedCache] = {}
 
-    def get(self) -> dict[tuple[Callable[..., Any], tuple[str]], Any]:
+    def get(self) -> MutableMapping[tuple[Callable[..., Any], tuple[str]], Any]:
         """Get the current cache."""
         return self._cache
 
-    async def clear(self) -> None:
-        """Clear the cache."""
-        if not self._cache:
+    def get_policy_cache(
+        self,
+        call: Callable[..., Any] | None,
+        *,
+        max_size: int | None,
+        ttl: float | None,
+        stale_ttl: float | None = None,
+    ) -> BoundedCache:
+        """Get the own cache of a dependency declaring a cache policy, creating it on first use.
+
+        Args:
+            call: The dependency, as it is keyed in the cache
+            max_size: The maximum number of cached values of the dependency, if the cache has to be created
+            ttl: The number of seconds after which a cached value of the dependency is stale, if the cache has to be
+                created
+            stale_ttl: The number of seconds a stale value of the dependency is still served for while it is
+                refreshed, if the cache has to be created
+
+        Returns:
+            The cache of the dependency.
+        """
+        cache = self._policy_caches.get(call)
+        if cache is None:
+            with self._lock:
+                cache = self._policy_caches.setdefault(
+                    call, BoundedCache(max_size=max_size, ttl=ttl, stale_ttl=stale_ttl)
+                )
+        return cache
+
+    def configure(self, *, max_size: int | None = None, ttl: float | None = None) -> None:
+        """Bound the cache by a number of entries and an age, or make it unbounded again.
+
+        The entries already cached are kept, as long as they fit.
+
+        Args:
+            max_size: The maximum number of cached dependencies, the least recently used ones being evicted first.
+                Unbounded if None.
+            ttl: The number of seconds after which a cached dependency expires. Never expires if None.
+
+        Raises:
+            ValueError: If `max_size` or `ttl` is not positive.
+        """
+        if max_size is not None and max_size <= 0:
+            msg = f"max_size must be positive, got {max_size}"
+            raise ValueError(msg)
+        if ttl is not None and ttl <= 0:
+            msg = f"ttl must be positive, got {ttl}"
+            raise ValueError(msg)
+
+        self.set_backend(None if max_size is None and ttl is None else BoundedCache(max_size=max_size, ttl=ttl))
+
+    def set_backend(self, backend: CacheBackend | None) -> None:
+        """Keep the cache in the given backend, or in a plain dict if None.
+
+        The entries already cached are moved to the new backend, as long as it keeps them.
+
+        Args:
+            backend: The backend to keep the cache in
+        """
+        cache: MutableMapping[tuple[Callable[..., Any], tuple[str]], Any] = {} if backend is None else backend
+        with self._lock:
+            cache.update(self._cache)
+            if isinstance(self._cache, CacheBackend):
+                self._evictions += self._cache.evictions
+            self._cache = cache
+
+    def record_lookup(self, cache: MutableMapping[Any, Any], cache_key: Any, outcome: int) -> None:  # noqa: ANN401
+        """Count a lookup of the given cache key, if it was made in this cache.
+
+        The counters are plain integers updated without any lock, so concurrent updates from several threads may
+        occasionally be lost.
+
+        Args:
+            cache: The cache that the lookup was made in
+            cache_key: The cache key that was looked up
+            outcome: `HIT`, `MISS` or `COALESCED`
+        """
+        if cache is not self._cache:
             return
+        self._lookups[outcome] += 1
+        lookups = self._dependency_lookups.get(cache_key[0])
+        if lookups is None:
+            lookups = self._dependency_lookups.setdefault(cache_key[0], [0, 0, 0])
+        lookups[outcome] += 1
+
+    def record_insert(self, cache: MutableMapping[Any, Any]) -> None:
+        """Count an insert into the given cache, if it is this cache."""
+        if cache is self._cache:
+            self._inserts += 1
 
-        async with self._lock:
+    def stats(self) -> CacheStats:
+        """Take a snapshot of the counters of the cache.
+
+        Only the dependencies resolved by compiled execution plans are counted, the graphs that need request data
+        being solved by FastAPI itself.
+        """
+        evictions = self._evictions
+        if isinstance(self._cache, CacheBackend):
+            evictions += self._cache.evictions
+        return CacheStats(
+            hits=self._lookups[HIT],
+            misses=self._lookups[MISS],
+            coalesced=self._lookups[COALESCED],
+            inserts=self._inserts,
+            evictions=evictions,
+            size=len(self._cache),
+            dependencies={
+                call: DependencyStats(hits=lookups[HIT], misses=lookups[MISS], coalesced=lookups[COALESCED])
+                for call, lookups in list(self._dependency_lookups.items())
+            },
+        )
+
+    def invalidate(self, calls: Collection[Callable[..., Any] | None]) -> int:
+        """Evict every cached value of the given dependencies, whatever their security scopes and keys.
+
+        Args:
+            calls: The dependencies to evict, as they are keyed in the cache
+
+        Returns:
+            The number of evicted values.
+        """
+        with self._lock:
+            keys = [key for key in list(self._cache) if key[0] in calls]
+            for key in keys:
+                self._cache.pop(key, None)
+            evicted = len(keys)
+            for call in calls:
+                cache = self._policy_caches.get(call)
+                if cache is not None:
+                    evicted += len(cache)
+                    cache.clear()
+        return evicted
+
+    async def clear(self) -> None:
+        """Clear the cache, along with the caches of the dependencies declaring a cache policy."""
+        with self._lock:
             self._cache.clear()
+            for cache in self._policy_caches.values():
+                cache.clear()
+
+    def reset(self) -> None:
+        """Forget every cached value, including the ones of the policy caches, for a forked process.
+
+        The lock is replaced too, since it may have been held by another thread of the parent at the time of the fork.
+        """
+        self._lock = threading.Lock()
+        self._cache.clear()
+        for cache in self._policy_caches.values():
+            cache.clear()
 
 
 dependency_cache = DependencyCache()
+single_flight = SingleFlight(dependency_cache)
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=single_flight.reset)
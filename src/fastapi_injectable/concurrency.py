@@ -1,16 +1,29 @@
 import asyncio
 import atexit
+import contextvars
+import os
 import threading
-from collections.abc import Coroutine
-from typing import Any, TypeVar
+import weakref
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Coroutine, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from itertools import count, islice
+from typing import Any, Literal, TypeVar
 
-from fastapi_injectable.exception import RunCoroutineSyncMaxRetriesError
+from fastapi_injectable.exception import RunCoroutineSyncInRunningLoopError, RunCoroutineSyncMaxRetriesError
 
 T = TypeVar("T")
+Item = TypeVar("Item")
+Sharding = Literal["thread", "round-robin"]
+RunningLoopStrategy = Literal["offload", "raise"]
+
+
+LoopFactory = Callable[[], asyncio.AbstractEventLoop]
 
 
 class LoopManager:
-    def __init__(self) -> None:
+    def __init__(self, loop_factory: LoopFactory | None = None) -> None:
+        self.loop_factory = loop_factory
         self._loop: asyncio.AbstractEventLoop | None = None
         self._thread: threading.Thread | None = None
         self._lock = threading.Lock()
@@ -24,7 +37,7 @@ class LoopManager:
             return self._loop
 
     def start(self) -> None:
-        self._loop = asyncio.new_event_loop()
+        self._loop = (self.loop_factory or asyncio.new_event_loop)()
         self._thread = threading.Thread(target=self._run_loop, daemon=True, name="async-util-loop")
         self._thread.start()
 
@@ -54,6 +67,13 @@ class LoopManager:
             if not self._shutting_down:
                 self._loop.close()
 
+    def reset(self) -> None:
+        """Forget the managed loop without stopping it, for a forked process where its thread does not exist."""
+        self._loop = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._shutting_down = False
+
     def shutdown(self) -> None:
         with self._lock:
             self._shutting_down = True
@@ -65,8 +85,243 @@ class LoopManager:
                 self._loop.close()
 
 
-loop_manager = LoopManager()
+class LoopPool:
+    """A pool of managed loops, each running in a thread of its own, that sync callers are sharded over.
+
+    With the `"thread"` sharding, every calling thread sticks to one loop, assigned in turn on its first call, so the
+    coroutines it runs, and the generator dependencies they enter, are always driven by the same loop. With the
+    `"round-robin"` sharding, every call goes to the next loop, which spreads an uneven load better but moves a
+    thread's calls across loops. Either way, the dependency cache and the exit stacks are shared by all the loops.
+
+    In the inline mode, the callers without a running loop of their own run their coroutines in place instead, on a
+    loop kept per calling thread.
+
+    The callers that are already running a loop cannot wait for a managed loop without blocking their own, and would
+    deadlock if their own loop is the managed one they are sharded to. Their coroutines are offloaded to helper
+    threads instead, each running a loop of its own, or refused with an error.
+
+    Args:
+        size: The number of loops
+        sharding: How calls are spread over the loops
+        inline: Whether to run the coroutines of the callers without a running loop on a loop of their own thread
+        on_running_loop: `"offload"` to run the coroutines of the callers running a loop on a helper thread, or
+            `"raise"` to refuse them
+        loop_factory: The callable creating every loop of the pool, e.g. `uvloop.new_event_loop`. Defaults to
+            `asyncio.new_event_loop`.
+    """
+
+    def __init__(
+        self,
+        size: int = 1,
+        *,
+        sharding: Sharding = "thread",
+        inline: bool = False,
+        on_running_loop: RunningLoopStrategy = "offload",
+        loop_factory: LoopFactory | None = None,
+    ) -> None:
+        self._managers: list[LoopManager] = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counter = count()
+        self._inline_loops: weakref.WeakSet[asyncio.AbstractEventLoop] = weakref.WeakSet()
+        self._helpers: ThreadPoolExecutor | None = None
+        self.configure(
+            size, sharding=sharding, inline=inline, on_running_loop=on_running_loop, loop_factory=loop_factory
+        )
+
+    def configure(
+        self,
+        size: int,
+        *,
+        sharding: Sharding = "thread",
+        inline: bool = False,
+        on_running_loop: RunningLoopStrategy = "offload",
+        loop_factory: LoopFactory | None = None,
+    ) -> None:
+        """Resize the pool, shutting down the loops that are removed.
+
+        The loops that are already running are kept as they are, the loop factory only applies to the loops created
+        from then on.
+
+        Args:
+            size: The number of loops
+            sharding: How calls are spread over the loops
+            inline: Whether to run the coroutines of the callers without a running loop on a loop of their own thread
+            on_running_loop: `"offload"` to run the coroutines of the callers running a loop on a helper thread, or
+                `"raise"` to refuse them
+            loop_factory: The callable creating every loop of the pool. Defaults to `asyncio.new_event_loop`.
+
+        Raises:
+            ValueError: If `size` is not positive, or `sharding` or `on_running_loop` is unknown.
+        """
+        if size < 1:
+            msg = f"size must be positive, got {size}"
+            raise ValueError(msg)
+        if sharding not in ("thread", "round-robin"):
+            msg = f"sharding must be 'thread' or 'round-robin', got {sharding!r}"
+            raise ValueError(msg)
+        if on_running_loop not in ("offload", "raise"):
+            msg = f"on_running_loop must be 'offload' or 'raise', got {on_running_loop!r}"
+            raise ValueError(msg)
+
+        with self._lock:
+            removed = self._managers[size:]
+            self._managers = self._managers[:size] + [LoopManager() for _ in range(size - len(self._managers))]
+            for manager in self._managers:
+                manager.loop_factory = loop_factory
+            self.loop_factory = loop_factory
+            self.sharding = sharding
+            self.inline = inline
+            self.on_running_loop = on_running_loop
+        for manager in removed:
+            manager.shutdown()
+
+    @property
+    def size(self) -> int:
+        return len(self._managers)
+
+    def get_manager(self) -> LoopManager:
+        """Pick the managed loop that the calling thread should use."""
+        managers = self._managers
+        if len(managers) == 1:
+            return managers[0]
+        if self.sharding == "round-robin":
+            return managers[next(self._counter) % len(managers)]
+
+        shard: int | None = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = next(self._counter)
+        return managers[shard % len(managers)]
+
+    def get_loop(self) -> asyncio.AbstractEventLoop:
+        return self.get_manager().get_loop()
+
+    def run_inline(self, coro: Coroutine[Any, Any, T], timeout: float) -> T:
+        """Run a coroutine in place, on the loop of the calling thread, which must not be running a loop already.
+
+        Args:
+            coro: Coroutine to run
+            timeout: The number of seconds after which the coroutine is cancelled
+
+        Returns:
+            Result of the coroutine
+        """
+        inline_loop: _InlineLoop | None = getattr(self._local, "inline_loop", None)
+        if inline_loop is None or inline_loop.loop.is_closed():
+            inline_loop = self._local.inline_loop = _InlineLoop((self.loop_factory or asyncio.new_event_loop)())
+            self._inline_loops.add(inline_loop.loop)
+        return inline_loop.loop.run_until_complete(asyncio.wait_for(coro, timeout))
+
+    def run_offloaded(self, coro: Coroutine[Any, Any, T], timeout: float) -> T:
+        """Run a coroutine on a helper thread, in a copy of the caller's context, and wait for it.
+
+        The caller must be running a loop, which is blocked meanwhile.
+
+        Args:
+            coro: Coroutine to run
+            timeout: The number of seconds after which the coroutine is cancelled
+
+        Returns:
+            Result of the coroutine
+        """
+        with self._lock:
+            if self._helpers is None:
+                self._helpers = ThreadPoolExecutor(thread_name_prefix="async-util-helper")
+            helpers = self._helpers
+        context = contextvars.copy_context()
+        context.run(_blocked_loops.set, (*_blocked_loops.get(), asyncio.get_running_loop()))
+        return helpers.submit(context.run, self.run_inline, coro, timeout).result()
+
+    def start(self) -> None:
+        for manager in self._managers:
+            manager.start()
+
+    async def run_in_loop(self, coro: Coroutine[Any, Any, T] | asyncio.Future[T]) -> T:
+        """Run coroutine in a managed loop.
+
+        Args:
+            coro: Coroutine to run
+
+        Returns:
+            Result of the coroutine
+        """
+        return await self.get_manager().run_in_loop(coro)
+
+    def reset(self) -> None:
+        """Forget all the loops without closing them, for a forked process where their threads do not exist."""
+        for manager in self._managers:
+            manager.reset()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counter = count()
+        self._inline_loops = weakref.WeakSet()
+        self._helpers = None
+
+    def shutdown(self) -> None:
+        for manager in self._managers:
+            manager.shutdown()
+        with self._lock:
+            helpers, self._helpers = self._helpers, None
+        if helpers is not None:
+            helpers.shutdown(wait=False, cancel_futures=True)
+        for loop in list(self._inline_loops):
+            _close_inline_loop(loop)
+
+
+# The loops blocked waiting for the coroutines offloaded from them, as seen from the context of those coroutines.
+_blocked_loops: contextvars.ContextVar[tuple[asyncio.AbstractEventLoop, ...]] = contextvars.ContextVar(
+    "blocked_loops", default=()
+)
+
+
+def is_blocked_loop(loop: asyncio.AbstractEventLoop) -> bool:
+    """Tell whether the given loop is blocked waiting for the caller, which was offloaded from it, to complete."""
+    return loop in _blocked_loops.get()
+
+
+def get_running_loop_or_none() -> asyncio.AbstractEventLoop | None:
+    """Get the loop running in the calling thread, if any."""
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+class _InlineLoop:
+    # Kept in a thread local, so that the loop is closed once its thread is gone.
+    __slots__ = ("loop", "pid")
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        self.pid = os.getpid()
+
+    def __del__(self) -> None:
+        if self.pid == os.getpid():
+            _close_inline_loop(self.loop)
+        else:
+            # Dropped in a forked process. Closing the loop would unregister its wakeup pipe from the selector it
+            # shares with the parent process, whose loop would then miss the wakeups from other threads.
+            _inherited_loops.append(self.loop)
+
+
+_inherited_loops: list[asyncio.AbstractEventLoop] = []
+
+
+# Reentrant, since the garbage collector may close a loop in a thread that is already closing one.
+_inline_loops_lock = threading.RLock()
+
+
+def _close_inline_loop(loop: asyncio.AbstractEventLoop) -> None:
+    # A loop may be closed both by its thread going away and by a shutdown.
+    with _inline_loops_lock:
+        if not loop.is_closed() and not loop.is_running():
+            loop.close()
+
+
+loop_manager = LoopPool()
 atexit.register(loop_manager.shutdown)
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    os.register_at_fork(after_in_child=loop_manager.reset)
 
 
 def run_coroutine_sync(
@@ -84,23 +339,134 @@ def run_coroutine_sync(
         The result of the coroutine execution.
 
     Raises:
+        RunCoroutineSyncInRunningLoopError: If the caller is running an event loop, and such calls are refused.
         Any exception raised by the coroutine or during execution.
 
     Notes:
-        - In the main thread, if the event loop is running, a new thread is used to run the coroutine.
+        - If the calling thread is running an event loop, which waiting would block, or even deadlock if it is the
+          managed loop, the coroutine runs on a helper thread with a loop of its own, unless such calls are refused.
         - In non-main threads, asyncio's `run_coroutine_threadsafe` is used for compatibility.
+        - The coroutine runs in the managed loop that the calling thread is sharded to, see `configure_loop_pool()`.
+        - In the inline mode, if the calling thread is not running a loop, the coroutine runs in place on a loop kept
+          per thread instead, and is cancelled on timeout.
+        - The coroutine runs in a copy of the caller's context, so it sees the caller's context variables.
     """
     if retries > max_retries:
         msg = f"Maximum retries ({max_retries}) reached while running coroutine."
         raise RunCoroutineSyncMaxRetriesError(msg)
 
+    if _is_running_loop():
+        if loop_manager.on_running_loop == "raise":
+            coro.close()
+            msg = (
+                "run_coroutine_sync() was called from a running event loop, which it would block. "
+                "Await the coroutine instead, e.g. call the async version of the function."
+            )
+            raise RunCoroutineSyncInRunningLoopError(msg)
+        return loop_manager.run_offloaded(coro, timeout)
+    if loop_manager.inline:
+        return loop_manager.run_inline(coro, timeout)
+
+    manager = loop_manager.get_manager()
     try:
-        loop = loop_manager.get_loop()
-        future = asyncio.run_coroutine_threadsafe(coro, loop)
+        loop = manager.get_loop()
+        future = asyncio.run_coroutine_threadsafe(_run_in_context(coro, contextvars.copy_context()), loop)
         return future.result(timeout)
     except RuntimeError as e:
         if "Event loop is closed" in str(e):
-            loop_manager.shutdown()
-            loop_manager.start()
+            manager.shutdown()
+            manager.start()
             return run_coroutine_sync(coro, timeout=timeout, retries=retries + 1, max_retries=max_retries)
         raise
+
+
+def _is_running_loop() -> bool:
+    return get_running_loop_or_none() is not None
+
+
+async def _run_in_context(coro: Coroutine[Any, Any, T], context: contextvars.Context) -> T:
+    return await context.run(asyncio.ensure_future, coro)
+
+
+def _check_concurrency(concurrency: int) -> None:
+    if concurrency < 1:
+        msg = f"concurrency must be positive, got {concurrency}"
+        raise ValueError(msg)
+
+
+def map_in_threads(
+    func: Callable[[Item], T], iterable: Iterable[Item], *, concurrency: int, ordered: bool = True
+) -> Iterator[T]:
+    """Call a sync function on each item of an iterable in a thread pool, streaming the results back.
+
+    At most `concurrency` calls are in flight at once, and the iterable is consumed lazily as calls complete.
+
+    Args:
+        func: The function to call on each item.
+        iterable: The items to call the function on.
+        concurrency: The maximum number of concurrent calls.
+        ordered: Whether to yield the results in the order of the items, or as soon as they are available.
+
+    Yields:
+        The result of each call.
+
+    Raises:
+        ValueError: If `concurrency` is not positive.
+    """
+    _check_concurrency(concurrency)
+    items = iter(iterable)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        pending: deque[Future[T]] = deque(executor.submit(func, item) for item in islice(items, concurrency))
+        try:
+            while pending:
+                if ordered:
+                    done = [pending.popleft()]
+                else:
+                    completed = wait(pending, return_when=FIRST_COMPLETED).done
+                    done = [future for future in pending if future in completed]
+                    pending = deque(future for future in pending if future not in completed)
+                for future in done:
+                    pending.extend(executor.submit(func, item) for item in islice(items, 1))
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+
+async def map_in_tasks(
+    func: Callable[[Item], Coroutine[Any, Any, T]], iterable: Iterable[Item], *, concurrency: int, ordered: bool = True
+) -> AsyncIterator[T]:
+    """Await an async function on each item of an iterable in concurrent tasks, streaming the results back.
+
+    At most `concurrency` calls are in flight at once, and the iterable is consumed lazily as calls complete.
+
+    Args:
+        func: The async function to call on each item.
+        iterable: The items to call the function on.
+        concurrency: The maximum number of concurrent calls.
+        ordered: Whether to yield the results in the order of the items, or as soon as they are available.
+
+    Yields:
+        The result of each call.
+
+    Raises:
+        ValueError: If `concurrency` is not positive.
+    """
+    _check_concurrency(concurrency)
+    items = iter(iterable)
+    pending: deque[asyncio.Task[T]] = deque(asyncio.create_task(func(item)) for item in islice(items, concurrency))
+    try:
+        while pending:
+            if ordered:
+                await asyncio.wait([pending[0]])
+                done = [pending.popleft()]
+            else:
+                completed, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                done = [task for task in pending if task in completed]
+                pending = deque(task for task in pending if task not in completed)
+            for task in done:
+                pending.extend(asyncio.create_task(func(item)) for item in islice(items, 1))
+                yield task.result()
+    finally:
+        for task in pending:
+            task.cancel()
@@ -1,10 +1,11 @@
 import inspect
-from collections.abc import Awaitable, Callable, Coroutine, Generator
-from functools import wraps
+from collections.abc import AsyncIterator, Awaitable, Callable, Coroutine, Generator, Iterable, Iterator
+from functools import partial, wraps
 from typing import TYPE_CHECKING, Any, ParamSpec, TypeVar, cast, overload
 
-from .concurrency import run_coroutine_sync
-from .main import resolve_dependencies
+from .concurrency import map_in_tasks, map_in_threads, run_coroutine_sync
+from .graph import dependency_graph_registry
+from .main import has_per_call_dependencies, resolve_dependencies, resolve_dependencies_sync
 
 T = TypeVar("T")
 P = ParamSpec("P")
@@ -13,11 +14,70 @@ if TYPE_CHECKING:
 
     def set_original_func(wrapper: Any, target: Any) -> None:  # noqa: ANN401
         pass
+
+    def set_map_func(wrapper: Any, map_func: Any) -> None:  # noqa: ANN401
+        pass
+
+    def set_amap_func(wrapper: Any, amap_func: Any) -> None:  # noqa: ANN401
+        pass
 else:
 
     def set_original_func(wrapper: Any, target: Any) -> None:  # noqa: ANN401
         wrapper.__original_func__ = target
 
+    def set_map_func(wrapper: Any, map_func: Any) -> None:  # noqa: ANN401
+        wrapper.map = map_func
+
+    def set_amap_func(wrapper: Any, amap_func: Any) -> None:  # noqa: ANN401
+        wrapper.amap = amap_func
+
+
+def _resolve_dependencies_in_thread(
+    target: Callable[..., Any], *, use_cache: bool, raise_exception: bool, concurrent: bool
+) -> dict[str, Any]:
+    dependencies = resolve_dependencies_sync(func=target, use_cache=use_cache)
+    if dependencies is not None:
+        return dependencies
+    return run_coroutine_sync(
+        resolve_dependencies(func=target, use_cache=use_cache, raise_exception=raise_exception, concurrent=concurrent)
+    )
+
+
+def _get_map_call(
+    target: Callable[..., T],
+    wrapper: Callable[..., T],
+    *,
+    use_cache: bool,
+    raise_exception: bool,
+    concurrent: bool,
+) -> Callable[..., T]:
+    if has_per_call_dependencies(target, use_cache=use_cache):
+        # Every item gets dependencies of its own, as with separate calls.
+        return wrapper
+    dependencies = _resolve_dependencies_in_thread(
+        target, use_cache=use_cache, raise_exception=raise_exception, concurrent=concurrent
+    )
+    return partial(target, **dependencies)
+
+
+async def _aget_map_call(
+    target: Callable[..., Coroutine[Any, Any, T]],
+    wrapper: Callable[..., Coroutine[Any, Any, T]],
+    *,
+    use_cache: bool,
+    raise_exception: bool,
+    concurrent: bool,
+) -> Callable[..., Coroutine[Any, Any, T]]:
+    if has_per_call_dependencies(target, use_cache=use_cache):
+        return wrapper
+    dependencies = await resolve_dependencies(
+        func=cast(Callable[..., Any], target),
+        use_cache=use_cache,
+        raise_exception=raise_exception,
+        concurrent=concurrent,
+    )
+    return partial(target, **dependencies)
+
 
 @overload
 def injectable(
@@ -25,6 +85,7 @@ def injectable(
     *,
     use_cache: bool = True,
     raise_exception: bool = False,
+    concurrent: bool = False,
 ) -> Callable[P, T]: ...
 
 
@@ -34,6 +95,7 @@ def injectable(
     *,
     use_cache: bool = True,
     raise_exception: bool = False,
+    concurrent: bool = False,
 ) -> Callable[P, T]: ...
 
 
@@ -42,6 +104,7 @@ def injectable(
     *,
     use_cache: bool = True,
     raise_exception: bool = False,
+    concurrent: bool = False,
 ) -> Callable[[Callable[P, T]], Callable[P, T]]: ...
 
 
@@ -50,35 +113,75 @@ def injectable(
     *,
     use_cache: bool = True,
     raise_exception: bool = False,
+    concurrent: bool = False,
 ) -> (
     Callable[P, T]
     | Callable[P, Awaitable[T]]
     | Callable[[Callable[P, T] | Callable[P, Awaitable[T]]], Callable[P, T] | Callable[P, Awaitable[T]]]
 ):
-    """Decorator to inject dependencies into any callable, sync or async."""
+    """Decorator to inject dependencies into any callable, sync or async.
+
+    Pass `concurrent=True` to resolve independent async branches of the dependency graph concurrently.
+
+    When a sync function only depends on sync functions and sync generators, its dependencies are resolved in the
+    calling thread, without going through the background event loop.
+
+    The decorated function also gets a `map(iterable, *, concurrency=8, ordered=True)` method when it is sync, or an
+    `amap(iterable, *, concurrency=8, ordered=True)` method when it is async. They resolve the dependencies once, then
+    call the function on each item of the iterable with at most `concurrency` calls in flight, in a thread pool or
+    in concurrent tasks respectively, and stream the results back in order or as they complete. If some dependencies
+    are resolved anew for every call, e.g. without `use_cache` or with `Scope.TRANSIENT`, they are resolved for each
+    item instead, as with separate calls.
+    """
 
     def decorator(
         target: Callable[P, T] | Callable[P, Awaitable[T]],
     ) -> Callable[P, T] | Callable[P, Awaitable[T]]:
         is_async = inspect.iscoroutinefunction(target)
+        dependency_graph_registry.track(target, use_cache=use_cache)
 
         @wraps(target)
         async def async_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            dependencies = await resolve_dependencies(func=target, use_cache=use_cache, raise_exception=raise_exception)
+            dependencies = await resolve_dependencies(
+                func=target, use_cache=use_cache, raise_exception=raise_exception, concurrent=concurrent
+            )
             return await cast(Callable[..., Coroutine[Any, Any, T]], target)(*args, **{**dependencies, **kwargs})
 
         @wraps(target)
         def sync_wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
-            dependencies = run_coroutine_sync(
-                resolve_dependencies(func=target, use_cache=use_cache, raise_exception=raise_exception)
+            dependencies = _resolve_dependencies_in_thread(
+                target, use_cache=use_cache, raise_exception=raise_exception, concurrent=concurrent
             )
             return cast(Callable[..., T], target)(*args, **{**dependencies, **kwargs})
 
+        def map_func(iterable: Iterable[Any], *, concurrency: int = 8, ordered: bool = True) -> Iterator[T]:
+            call = _get_map_call(
+                cast(Callable[..., T], target),
+                sync_wrapper,
+                use_cache=use_cache,
+                raise_exception=raise_exception,
+                concurrent=concurrent,
+            )
+            return map_in_threads(call, iterable, concurrency=concurrency, ordered=ordered)
+
+        async def amap_func(iterable: Iterable[Any], *, concurrency: int = 8, ordered: bool = True) -> AsyncIterator[T]:
+            call = await _aget_map_call(
+                cast(Callable[..., Coroutine[Any, Any, T]], target),
+                async_wrapper,
+                use_cache=use_cache,
+                raise_exception=raise_exception,
+                concurrent=concurrent,
+            )
+            async for result in map_in_tasks(call, iterable, concurrency=concurrency, ordered=ordered):
+                yield result
+
         if is_async:
             set_original_func(async_wrapper, target)
+            set_amap_func(async_wrapper, amap_func)
             return async_wrapper
 
         set_original_func(sync_wrapper, target)
+        set_map_func(sync_wrapper, map_func)
         return sync_wrapper
 
     if func is None:
@@ -8,3 +8,7 @@ class DependencyCleanupError(Exception):
 
 class RunCoroutineSyncMaxRetriesError(Exception):
     """Custom error for run coroutine sync max retries issues."""
+
+
+class RunCoroutineSyncInRunningLoopError(Exception):
+    """Custom error for run coroutine sync being called from a running event loop."""
@@ -0,0 +1,264 @@
+from collections.abc import Callable, Mapping
+from dataclasses import dataclass
+from typing import Any, cast
+from weakref import WeakKeyDictionary
+
+from fastapi import FastAPI
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import get_dependant
+
+from .plan import DependencyKind, ExecutionPlan, compile_plan, get_dependency_kind, requires_request
+from .policy import CachePolicy, get_cache_policy
+from .scope import Scope, get_scope
+
+
+def _apply_overrides(dependant: Dependant, overrides: Mapping[Callable[..., Any], Callable[..., Any]]) -> Dependant:
+    """Replace the overridden sub-dependants of the given graph in place, the same way `solve_dependencies` does.
+
+    Args:
+        dependant: The root of the graph to rewrite
+        overrides: The `dependency_overrides` of the registered app
+
+    Returns:
+        Dependant: The given root, with every overridden sub-dependant replaced
+    """
+    for index, sub_dependant in enumerate(dependant.dependencies):
+        original_call = cast(Callable[..., Any], sub_dependant.call)
+        call = overrides.get(original_call, original_call)
+        use_sub_dependant = sub_dependant
+        if call is not original_call:
+            use_sub_dependant = get_dependant(
+                path=cast(str, sub_dependant.path),
+                call=call,
+                name=sub_dependant.name,
+                security_scopes=sub_dependant.security_scopes,
+                use_cache=sub_dependant.use_cache,
+            )
+            # FastAPI keeps caching an overridden dependency under the key of the original one.
+            use_sub_dependant.cache_key = sub_dependant.cache_key
+            dependant.dependencies[index] = use_sub_dependant
+        _apply_overrides(use_sub_dependant, overrides)
+    return dependant
+
+
+@dataclass(frozen=True, slots=True)
+class DependencyNode:
+    call: Callable[..., Any]
+    kind: DependencyKind
+    use_cache: bool
+    scope: Scope
+    overridden_call: Callable[..., Any] | None
+    requires_request: bool
+    policy: CachePolicy | None
+
+
+@dataclass(frozen=True, slots=True)
+class DependencyEdge:
+    dependant: int | None
+    dependency: int
+    name: str
+
+
+@dataclass(frozen=True, slots=True)
+class DependencyGraph:
+    """A description of what resolving the dependencies of a function does.
+
+    Attributes:
+        nodes: The dependencies that get resolved, with the cached ones sharing a cache key appearing only once
+        edges: The dependency relations, from the index of the dependant node (None for the function itself) to the
+            index of the dependency node, along with the name of the argument it is passed as
+        depth: The length of the longest chain of dependencies
+        max_fan_out: The largest number of direct dependencies of the function or of any of its dependencies
+        generator_count: The number of generator dependencies, each of which has a teardown to run on cleanup
+        shared_count: The number of nodes that more than one dependant depends on
+    """
+
+    nodes: tuple[DependencyNode, ...]
+    edges: tuple[DependencyEdge, ...]
+    depth: int
+    max_fan_out: int
+    generator_count: int
+    shared_count: int
+
+
+def describe_graph(dependant: Dependant) -> DependencyGraph:
+    """Describe the given dependency graph along with its summary metrics.
+
+    Args:
+        dependant: The root of the dependency graph, with the dependency overrides already applied
+
+    Returns:
+        DependencyGraph: The nodes, the edges and the metrics of the graph
+    """
+    nodes: list[DependencyNode] = []
+    edges: list[DependencyEdge] = []
+    heights: list[int] = []
+    cached_indexes: dict[Any, int] = {}
+
+    def visit(dependant: Dependant, dependant_index: int | None) -> int:
+        height = 0
+        for sub_dependant in dependant.dependencies:
+            if sub_dependant.use_cache and sub_dependant.cache_key in cached_indexes:
+                index = cached_indexes[sub_dependant.cache_key]
+            else:
+                call = cast(Callable[..., Any], sub_dependant.call)
+                original_call = sub_dependant.cache_key[0]
+                index = len(nodes)
+                nodes.append(
+                    DependencyNode(
+                        call=call,
+                        kind=get_dependency_kind(call),
+                        use_cache=sub_dependant.use_cache,
+                        scope=get_scope(original_call),
+                        overridden_call=original_call if original_call is not call else None,
+                        requires_request=requires_request(sub_dependant),
+                        policy=get_cache_policy(original_call),
+                    )
+                )
+                heights.append(0)
+                if sub_dependant.use_cache:
+                    cached_indexes[sub_dependant.cache_key] = index
+                heights[index] = visit(sub_dependant, index)
+
+            edges.append(
+                DependencyEdge(dependant=dependant_index, dependency=index, name=cast(str, sub_dependant.name))
+            )
+            height = max(height, heights[index] + 1)
+        return height
+
+    depth = visit(dependant, None)
+    fan_outs: dict[int | None, int] = {}
+    fan_ins: dict[int, int] = {}
+    for edge in edges:
+        fan_outs[edge.dependant] = fan_outs.get(edge.dependant, 0) + 1
+        fan_ins[edge.dependency] = fan_ins.get(edge.dependency, 0) + 1
+
+    return DependencyGraph(
+        nodes=tuple(nodes),
+        edges=tuple(edges),
+        depth=depth,
+        max_fan_out=max(fan_outs.values(), default=0),
+        generator_count=sum(node.kind in (DependencyKind.GENERATOR, DependencyKind.ASYNC_GENERATOR) for node in nodes),
+        shared_count=sum(fan_in > 1 for fan_in in fan_ins.values()),
+    )
+
+
+class DependencyGraphRegistry:
+    def __init__(self) -> None:
+        self._graphs: WeakKeyDictionary[Callable[..., Any], Dependant] = WeakKeyDictionary()
+        self._plans: WeakKeyDictionary[Callable[..., Any], ExecutionPlan | None] = WeakKeyDictionary()
+        self._overrides: dict[Callable[..., Any], Callable[..., Any]] = {}
+        self._injectables: WeakKeyDictionary[Callable[..., Any], bool] = WeakKeyDictionary()
+        self._dependants: dict[Callable[..., Any] | None, set[Callable[..., Any] | None]] = {}
+
+    def track(self, func: Callable[..., Any], *, use_cache: bool) -> None:
+        """Remember the given injectable function, so that it can be warmed up later.
+
+        Args:
+            func: The function decorated with `injectable`
+            use_cache: Whether the function resolves its dependencies with the dependency cache
+        """
+        try:
+            self._injectables[func] = self._injectables.get(func, False) or use_cache
+        except TypeError:
+            return
+
+    def tracked(self) -> list[tuple[Callable[..., Any], bool]]:
+        """List the tracked injectable functions along with whether they use the dependency cache."""
+        return list(self._injectables.items())
+
+    def get(self, func: Callable[..., Any], app: FastAPI | None = None) -> Dependant:
+        """Retrieve the dependency graph of the given function, building it on first use.
+
+        The graph is built with the `dependency_overrides` of the given app already applied, so it can be solved
+        without an overrides provider. All the built graphs are dropped whenever those overrides change.
+
+        Args:
+            func: The function whose dependency graph should be returned
+            app: The registered app, if any
+
+        Returns:
+            Dependant: The root of the dependency graph of the given function
+        """
+        overrides = app.dependency_overrides if app is not None else {}
+        if overrides != self._overrides:
+            self.clear()
+            self._overrides = dict(overrides)
+
+        try:
+            dependant = self._graphs.get(func)
+        except TypeError:
+            # Not weakly referenceable, build it every time instead of keeping it alive forever.
+            return self._build(func)
+
+        if dependant is None:
+            dependant = self._build(func)
+            # The root's own call is never used to solve the graph, drop it so that the weak key can be collected.
+            dependant.call = None
+            dependant.cache_key = (None, dependant.cache_key[1])
+            self._graphs[func] = dependant
+        return dependant
+
+    def get_plan(self, func: Callable[..., Any], app: FastAPI | None = None) -> ExecutionPlan | None:
+        """Retrieve the compiled execution plan of the given function, compiling it on first use.
+
+        Args:
+            func: The function whose execution plan should be returned
+            app: The registered app, if any
+
+        Returns:
+            ExecutionPlan | None: The execution plan, or None if the graph must be solved by `solve_dependencies`
+        """
+        dependant = self.get(func, app)
+        try:
+            if func in self._plans:
+                return self._plans[func]
+        except TypeError:
+            return compile_plan(dependant)
+
+        plan = self._plans[func] = compile_plan(dependant)
+        return plan
+
+    def get_dependants(self, call: Callable[..., Any]) -> set[Callable[..., Any] | None]:
+        """Collect the given dependency along with every dependency that transitively depends on it.
+
+        Only the graphs built so far are known, which include every graph that has been resolved.
+
+        Args:
+            call: The dependency, as it is keyed in the dependency cache, i.e. the original one if it is overridden
+
+        Returns:
+            The given dependency and its transitive dependants, not including the injectable functions themselves.
+        """
+        found: set[Callable[..., Any] | None] = {call}
+        pending: list[Callable[..., Any] | None] = [call]
+        while pending:
+            for dependant_call in self._dependants.get(pending.pop(), ()):
+                if dependant_call not in found:
+                    found.add(dependant_call)
+                    pending.append(dependant_call)
+        return found
+
+    def clear(self) -> None:
+        """Drop all the built graphs and execution plans."""
+        # The reverse dependency index is kept, since the dependency cache may still hold values resolved with the
+        # dropped graphs. A stale relation can only make an invalidation evict more than needed.
+        self._graphs.clear()
+        self._plans.clear()
+
+    def _build(self, func: Callable[..., Any]) -> Dependant:
+        dependant = get_dependant(path="command", call=func)
+        if self._overrides:
+            _apply_overrides(dependant, self._overrides)
+        self._index(dependant, None)
+        return dependant
+
+    def _index(self, dependant: Dependant, dependant_call: Callable[..., Any] | None) -> None:
+        for sub_dependant in dependant.dependencies:
+            call = sub_dependant.cache_key[0]
+            if dependant_call is not None:
+                self._dependants.setdefault(call, set()).add(dependant_call)
+            self._index(sub_dependant, call)
+
+
+dependency_graph_registry = DependencyGraphRegistry()
@@ -1,27 +1,67 @@
-import asyncio
 import logging
-from collections.abc import Awaitable, Callable
+import threading
+from collections.abc import Awaitable, Callable, MutableMapping, Sequence
+from contextlib import AsyncExitStack
+from dataclasses import replace
 from typing import Any, ParamSpec, TypeVar, cast
 
 from fastapi import FastAPI, Request
-from fastapi.dependencies.utils import get_dependant, solve_dependencies
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import (
+    SolvedDependency,
+    is_async_gen_callable,
+    is_gen_callable,
+    solve_dependencies,
+    solve_generator,
+)
+from starlette.datastructures import State
 
 from .async_exit_stack import async_exit_stack_manager
-from .cache import dependency_cache
+from .backend import CacheBackend
+from .cache import MISSING, dependency_cache
 from .exception import DependencyResolveError
+from .graph import DependencyGraph, dependency_graph_registry, describe_graph
+from .plan import ExecutionPlan, compile_warmup_plan, requires_request
+from .request import get_current_request
+from .scope import InjectionScope, Scope, get_current_scope, get_scope
 
 logger = logging.getLogger(__name__)
 T = TypeVar("T")
 P = ParamSpec("P")
 _app: FastAPI | None = None
-_app_lock = asyncio.Lock()
+_app_lock = threading.Lock()
+_fake_request_scope: dict[str, Any] | None = None
 
 
-async def register_app(app: FastAPI) -> None:
-    """Register the given FastAPI app for constructing fake request later."""
+class _FakeRequest(Request):
+    """A fake request sharing the scope template of the registered app with all the other fake requests.
+
+    The scope is copied the first time a dependency uses the request state, so that the state is never shared.
+    """
+
+    @property
+    def state(self) -> State:
+        if not hasattr(self, "_state"):
+            self.scope = {**self.scope, "state": {}}
+            self._state = State(self.scope["state"])
+        return self._state
+
+
+async def register_app(app: FastAPI, *, cache_backend: CacheBackend | None = None) -> None:
+    """Register the given FastAPI app for constructing fake request later.
+
+    Args:
+        app: The FastAPI app, whose state and dependency overrides are used when resolving dependencies
+        cache_backend: The backend to keep the dependency cache in, e.g. a `WeakValueBackend` or a
+            `SizeAwareBackend` to tune the memory behaviour of the deployment. Keeps the current one if None, which
+            is a plain dict unless another one was set before.
+    """
     global _app  # noqa: PLW0603
-    async with _app_lock:
+    with _app_lock:
         _app = app
+        dependency_graph_registry.clear()
+        if cache_backend is not None:
+            dependency_cache.set_backend(cache_backend)
 
 
 def _get_app() -> FastAPI | None:
@@ -29,8 +69,27 @@ def _get_app() -> FastAPI | None:
     return _app
 
 
+def _get_fake_request_scope(app: FastAPI | None) -> dict[str, Any]:
+    """Get the scope template of the fake requests, building it once per registered app."""
+    global _fake_request_scope  # noqa: PLW0603
+    if _fake_request_scope is None or _fake_request_scope.get("app") is not app:
+        scope: dict[str, Any] = {
+            "type": "http",
+            "headers": [],
+            "query_string": "",
+        }
+        if app is not None:
+            scope["app"] = app
+        _fake_request_scope = scope
+    return _fake_request_scope
+
+
 async def resolve_dependencies(
-    func: Callable[P, T] | Callable[P, Awaitable[T]], *, use_cache: bool = True, raise_exception: bool = False
+    func: Callable[P, T] | Callable[P, Awaitable[T]],
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+    concurrent: bool = False,
 ) -> dict[str, Any]:
     """Resolve dependencies for the given function using FastAPI's dependency injection system.
 
@@ -43,6 +102,8 @@ async def resolve_dependencies(
         use_cache: Whether to use a cache for dependency resolution. Defaults to True.
         raise_exception: Whether to raise an exception when errors occur during dependency
             resolution. If False, errors are logged as warnings. Defaults to False.
+        concurrent: Whether to resolve independent branches of the dependency graph concurrently instead of one
+            after another. Defaults to False.
 
     Returns:
         A dictionary mapping argument names to resolved dependency values.
@@ -51,35 +112,285 @@ async def resolve_dependencies(
         DependencyResolveError: If `raise_exception` is True and errors occur during dependency resolution.
 
     Notes:
-        - A fake HTTP request is created to mimic FastAPI's request-based dependency resolution.
+        - The dependency graph of `func` is built once and reused, until the overrides of the registered app change.
+        - Graphs made only of `Depends()` are resolved by a compiled execution plan, the others by FastAPI's
+          `solve_dependencies`, which always resolves them one after another.
+        - A fake HTTP request is created to mimic FastAPI's request-based dependency resolution. It shares a scope
+          template built once per registered app, which is only copied when a dependency uses the request state.
+          Inside a route depending on `capture_request`, the live request is used instead.
         - Dependency resolution errors are either logged or raised as exceptions based on `raise_exception`.
+        - Dependencies declared with `Scope.SCOPED` are cached in the active `injection_scope()`, and the ones
+          declared with `Scope.TRANSIENT` only for this call. Without `use_cache`, nothing is cached beyond this call.
     """
-    root_dep = get_dependant(path="command", call=func)
-    fake_request_scope: dict[str, Any] = {
-        "type": "http",
-        "headers": [],
-        "query_string": "",
-    }
-    app = _get_app()
-    if app is not None:
-        fake_request_scope["app"] = app
-    fake_request = Request(fake_request_scope)
-    root_dep.call = cast(Callable[..., Any], root_dep.call)
-    async_exit_stack = await async_exit_stack_manager.get_stack(root_dep.call)
-    cache = dependency_cache.get() if use_cache else None
-    resolved = await solve_dependencies(
-        request=fake_request,
-        dependant=root_dep,
-        async_exit_stack=async_exit_stack,
-        embed_body_fields=False,
-        dependency_overrides_provider=app,
-        dependency_cache=cache,
+    return await _resolve_dependencies(
+        func,
+        dependency_cache.get() if use_cache else {},
+        get_current_scope() if use_cache else None,
+        raise_exception=raise_exception,
+        concurrent=concurrent,
     )
-    if cache is not None:
-        cache.update(resolved.dependency_cache)
+
+
+def resolve_dependencies_sync(
+    func: Callable[P, T] | Callable[P, Awaitable[T]], *, use_cache: bool = True
+) -> dict[str, Any] | None:
+    """Resolve dependencies for the given function in the calling thread, if its dependency graph allows it.
+
+    Args:
+        func: The function for which dependencies need to be resolved.
+        use_cache: Whether to use a cache for dependency resolution. Defaults to True.
+
+    Returns:
+        A dictionary mapping argument names to resolved dependency values, or None if the dependency graph has async
+        dependencies or needs request data, in which case `resolve_dependencies` must be used instead.
+
+    Notes:
+        - Only graphs made of sync functions and sync generators are resolved this way, without any event loop.
+        - Sync generators are cleaned up along with the exit stack of `func`, like with `resolve_dependencies`.
+    """
+    plan = dependency_graph_registry.get_plan(func, _get_app())
+    if plan is None or not plan.is_sync:
+        return None
+    return plan.run_sync(
+        dependency_cache.get() if use_cache else {},
+        async_exit_stack_manager.get_stack_sync(func),
+        get_current_scope() if use_cache else None,
+    )
+
+
+async def resolve_dependencies_many(
+    funcs: Sequence[Callable[..., Any]],
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+    concurrent: bool = False,
+) -> list[dict[str, Any]]:
+    """Resolve dependencies for each of the given functions in a single pass.
+
+    The functions share one dependency cache: with `use_cache=True` it is the global dependency cache, otherwise it
+    is a cache dedicated to this batch, so that a dependency shared by several functions of the batch is still
+    resolved only once.
+
+    Args:
+        funcs: The functions for which dependencies need to be resolved.
+        use_cache: Whether to use the global dependency cache. Defaults to True.
+        raise_exception: Whether to raise an exception when errors occur during dependency
+            resolution. If False, errors are logged as warnings. Defaults to False.
+        concurrent: Whether to resolve independent branches of each dependency graph concurrently. Defaults to False.
+
+    Returns:
+        A list holding, for each function, a dictionary mapping its argument names to resolved dependency values.
+
+    Raises:
+        DependencyResolveError: If `raise_exception` is True and errors occur during dependency resolution.
+    """
+    cache = dependency_cache.get() if use_cache else {}
+    scope = get_current_scope() if use_cache else None
+    return [
+        await _resolve_dependencies(func, cache, scope, raise_exception=raise_exception, concurrent=concurrent)
+        for func in funcs
+    ]
+
+
+async def _resolve_dependencies(
+    func: Callable[..., Any],
+    cache: MutableMapping[Any, Any],
+    scope: InjectionScope | None,
+    *,
+    raise_exception: bool,
+    concurrent: bool,
+) -> dict[str, Any]:
+    app = _get_app()
+    async_exit_stack = await async_exit_stack_manager.get_stack(func)
+    plan = dependency_graph_registry.get_plan(func, app)
+    if plan is not None:
+        run = plan.run_concurrently if concurrent else plan.run
+        return await run(cache, async_exit_stack, scope)
+
+    root_dep = dependency_graph_registry.get(func, app)
+    request = get_current_request() or _FakeRequest(_get_fake_request_scope(app))
+    resolved = await _solve_with_scopes(request, root_dep, cache, scope, async_exit_stack)
     if resolved.errors:
         if raise_exception:
             raise DependencyResolveError(resolved.errors)
         logger.warning(f"Something wrong when resolving dependencies of {func}, errors: {resolved.errors}")
 
     return resolved.values
+
+
+async def _solve_with_scopes(
+    request: Request,
+    dependant: Dependant,
+    cache: MutableMapping[Any, Any],
+    scope: InjectionScope | None,
+    async_exit_stack: AsyncExitStack,
+) -> SolvedDependency:
+    # `solve_dependencies` only knows of one cache, which it updates with itself for every sub-dependency, so it
+    # gets a plain dict holding the reusable values of its own graph, rather than the caches themselves, and the new
+    # values are sorted out afterwards.
+    reusable_values: dict[Any, Any] = {}
+    caches = (scope.cache, cache) if scope is not None else (cache,)
+    for key in _collect_cache_keys(dependant, set()):
+        for reusable_cache in caches:
+            value = reusable_cache.get(key, MISSING)
+            if value is not MISSING:
+                reusable_values[key] = value
+                break
+
+    # The values read from a live request only live as long as the request.
+    request_keys: set[Any] = set()
+    if not isinstance(request, _FakeRequest):
+        _collect_request_dependent_keys(dependant, request_keys)
+
+    def get_lifetime(key: Any) -> Scope:  # noqa: ANN401
+        return Scope.SCOPED if key in request_keys else get_scope(key[0])
+
+    # It only knows of one exit stack too, so each generator is entered into the stack of its own lifetime by a
+    # wrapper, as in execution plans.
+    stacks = {
+        Scope.SINGLETON: async_exit_stack,
+        Scope.SCOPED: scope.stack if scope is not None else async_exit_stack,
+        Scope.TRANSIENT: async_exit_stack,
+    }
+    resolved = await solve_dependencies(
+        request=request,
+        dependant=_with_generators_entered_into(dependant, lambda key: stacks[get_lifetime(key)]),
+        async_exit_stack=async_exit_stack,
+        embed_body_fields=False,
+        dependency_cache=dict(reusable_values),
+    )
+
+    for key, value in resolved.dependency_cache.items():
+        if key in reusable_values:
+            continue
+        lifetime = get_lifetime(key)
+        if lifetime is Scope.SINGLETON:
+            cache.setdefault(key, value)
+        elif lifetime is Scope.SCOPED and scope is not None:
+            scope.cache.setdefault(key, value)
+    return resolved
+
+
+def _with_generators_entered_into(dependant: Dependant, get_stack: Callable[[Any], AsyncExitStack]) -> Dependant:
+    """Copy the given dependant, with every generator entered into the exit stack given for its cache key."""
+    dependencies = [_with_generators_entered_into(sub_dependant, get_stack) for sub_dependant in dependant.dependencies]
+    call = dependant.call
+    is_generator = call is not None and (is_gen_callable(call) or is_async_gen_callable(call))
+    copy = dependant
+    if is_generator or any(a is not b for a, b in zip(dependencies, dependant.dependencies, strict=True)):
+        copy = replace(dependant, dependencies=dependencies)
+        if is_generator:
+            generator, stack = cast(Callable[..., Any], call), get_stack(dependant.cache_key)
+
+            async def enter_generator(**kwargs: Any) -> Any:  # noqa: ANN401
+                return await solve_generator(call=generator, stack=stack, sub_values=kwargs)
+
+            copy.call = enter_generator
+        copy.cache_key = dependant.cache_key
+    return copy
+
+
+def _collect_request_dependent_keys(dependant: Dependant, keys: set[Any]) -> bool:
+    depends_on_request = requires_request(dependant)
+    for sub_dependant in dependant.dependencies:
+        if _collect_request_dependent_keys(sub_dependant, keys):
+            keys.add(sub_dependant.cache_key)
+            depends_on_request = True
+    return depends_on_request
+
+
+def _collect_cache_keys(dependant: Dependant, keys: set[Any]) -> set[Any]:
+    for sub_dependant in dependant.dependencies:
+        if sub_dependant.cache_key not in keys:
+            keys.add(sub_dependant.cache_key)
+            _collect_cache_keys(sub_dependant, keys)
+    return keys
+
+
+def has_per_call_dependencies(func: Callable[..., Any], *, use_cache: bool = True) -> bool:
+    """Check whether any dependency of the given function is resolved anew for every call.
+
+    Those are all of them without `use_cache`, and otherwise the dependencies declared with `use_cache=False` or
+    `Scope.TRANSIENT`, plus the `Scope.SCOPED` ones outside of an injection scope.
+
+    Args:
+        func: The function whose dependencies should be checked.
+        use_cache: Whether the dependencies are resolved with the cache. Defaults to True.
+
+    Returns:
+        True if a call of `func` cannot share all of its dependencies with another call.
+    """
+    dependant = dependency_graph_registry.get(func, _get_app())
+    if not use_cache:
+        return bool(dependant.dependencies)
+    per_call_scopes = {Scope.TRANSIENT} if get_current_scope() is not None else {Scope.SCOPED, Scope.TRANSIENT}
+    return _has_per_call_dependencies(dependant, per_call_scopes)
+
+
+def _has_per_call_dependencies(dependant: Dependant, per_call_scopes: set[Scope]) -> bool:
+    return any(
+        not sub_dependant.use_cache
+        or get_scope(sub_dependant.cache_key[0]) in per_call_scopes
+        or _has_per_call_dependencies(sub_dependant, per_call_scopes)
+        for sub_dependant in dependant.dependencies
+    )
+
+
+def get_dependency_graph(func: Callable[..., Any]) -> DependencyGraph:
+    """Describe the dependency graph that resolving the dependencies of the given function goes through.
+
+    Args:
+        func: The function whose dependency graph should be described, decorated with `injectable` or not.
+
+    Returns:
+        The nodes and edges of the graph, with the dependency overrides of the registered app applied, along with
+        summary metrics such as its depth, its largest fan-out, its number of generator teardowns and its number of
+        shared nodes.
+    """
+    func = getattr(func, "__original_func__", func)
+    return describe_graph(dependency_graph_registry.get(func, _get_app()))
+
+
+async def warmup(*, preload: bool = False, raise_exception: bool = False) -> None:
+    """Build the dependency graph of every function decorated with `injectable` ahead of their first call.
+
+    Args:
+        preload: Whether to also resolve, in parallel, every dependency that the decorated functions would cache,
+            so that their first calls are served from the dependency cache. Defaults to False.
+        raise_exception: Whether to raise an exception when a dependency graph cannot be built or a dependency
+            cannot be resolved. If False, errors are logged as warnings. Defaults to False.
+
+    Raises:
+        DependencyResolveError: If `raise_exception` is True and a dependency graph cannot be built or a
+            dependency cannot be resolved.
+
+    Notes:
+        - Call it after `register_app`, since registering an app drops the built graphs.
+        - Generator dependencies resolved by `preload` are cleaned up along with all the other exit stacks, or with
+          `cleanup_exit_stack_of_func(warmup)`.
+    """
+    app = _get_app()
+    plans: list[ExecutionPlan] = []
+    for func, use_cache in dependency_graph_registry.tracked():
+        try:
+            plan = dependency_graph_registry.get_plan(func, app)
+        except Exception as e:
+            if raise_exception:
+                msg = f"Failed to build the dependency graph of {func}"
+                raise DependencyResolveError(msg) from e
+            logger.warning(f"Something wrong when building the dependency graph of {func}, error: {e!r}")
+            continue
+        if use_cache and plan is not None:
+            plans.append(plan)
+
+    if not preload or not plans:
+        return
+
+    async_exit_stack = await async_exit_stack_manager.get_stack(warmup)
+    try:
+        await compile_warmup_plan(plans).run_concurrently(dependency_cache.get(), async_exit_stack)
+    except Exception as e:
+        if raise_exception:
+            msg = "Failed to preload the cached dependencies"
+            raise DependencyResolveError(msg) from e
+        logger.warning(f"Something wrong when preloading the cached dependencies, error: {e!r}")
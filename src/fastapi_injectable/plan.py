@@ -0,0 +1,419 @@
+import asyncio
+import logging
+import os
+from collections.abc import Callable, Iterable, MutableMapping
+from contextlib import AsyncExitStack, asynccontextmanager, contextmanager
+from dataclasses import dataclass, replace
+from enum import Enum
+from typing import Any, cast
+
+from fastapi.concurrency import contextmanager_in_threadpool, run_in_threadpool
+from fastapi.dependencies.models import Dependant
+from fastapi.dependencies.utils import is_async_gen_callable, is_coroutine_callable, is_gen_callable
+
+from .cache import MISSING, RETRY, BoundedCache, Flight, dependency_cache, single_flight
+from .concurrency import loop_manager
+from .policy import CachePolicy, get_cache_policy
+from .scope import InjectionScope, Scope, get_scope
+
+logger = logging.getLogger(__name__)
+CacheKey = tuple[Callable[..., Any] | None, tuple[str, ...]]
+
+
+class DependencyKind(str, Enum):
+    SYNC = "sync"
+    ASYNC = "async"
+    GENERATOR = "generator"
+    ASYNC_GENERATOR = "async_generator"
+
+
+@dataclass(frozen=True, slots=True)
+class PlanNode:
+    call: Callable[..., Any]
+    kind: DependencyKind
+    cache_key: CacheKey
+    use_cache: bool
+    scope: Scope
+    policy: CachePolicy | None
+    arguments: tuple[tuple[str, int], ...]
+
+
+def get_dependency_kind(call: Callable[..., Any]) -> DependencyKind:
+    """Classify the given dependency callable the same way `solve_dependencies` does."""
+    if is_gen_callable(call):
+        return DependencyKind.GENERATOR
+    if is_async_gen_callable(call):
+        return DependencyKind.ASYNC_GENERATOR
+    if is_coroutine_callable(call):
+        return DependencyKind.ASYNC
+    return DependencyKind.SYNC
+
+
+def requires_request(dependant: Dependant, *, own_params: bool = True) -> bool:
+    """Check whether the given dependant reads anything from the request, the response or the security scopes.
+
+    Args:
+        dependant: The dependant to check
+        own_params: Whether its path, query, header, cookie and body params count. They do not for the root of an
+            injectable function, whose own arguments are passed by its caller rather than read from a request.
+    """
+    return bool(
+        (
+            own_params
+            and (
+                dependant.path_params
+                or dependant.query_params
+                or dependant.header_params
+                or dependant.cookie_params
+                or dependant.body_params
+            )
+        )
+        or dependant.request_param_name
+        or dependant.websocket_param_name
+        or dependant.http_connection_param_name
+        or dependant.response_param_name
+        or dependant.background_tasks_param_name
+        or dependant.security_scopes_param_name
+    )
+
+
+class ExecutionPlan:
+    def __init__(self, nodes: tuple[PlanNode, ...], arguments: tuple[tuple[str, int], ...]) -> None:
+        self.nodes = nodes
+        self.arguments = arguments
+        self.is_sync = all(node.kind in (DependencyKind.SYNC, DependencyKind.GENERATOR) for node in nodes)
+
+    async def run(
+        self, cache: MutableMapping[Any, Any], stack: AsyncExitStack, scope: InjectionScope | None = None
+    ) -> dict[str, Any]:
+        """Resolve every node of the plan in order.
+
+        Args:
+            cache: The dependency cache to read from and write to, for the singleton nodes
+            stack: The exit stack that generator dependencies are entered into, unless they are scoped
+            scope: The active injection scope, holding the cache and the exit stack of the scoped nodes
+
+        Returns:
+            A dictionary mapping the argument names of the root function to their resolved values.
+        """
+        caches, stacks = _get_caches_and_stacks(cache, stack, scope)
+        values: list[Any] = [None] * len(self.nodes)
+        for index, node in enumerate(self.nodes):
+            kwargs = {name: values[argument_index] for name, argument_index in node.arguments}
+            values[index] = await _resolve_node(node, kwargs, caches[node.scope], stacks[node.scope])
+
+        return {name: values[argument_index] for name, argument_index in self.arguments}
+
+    def run_sync(
+        self, cache: MutableMapping[Any, Any], stack: AsyncExitStack, scope: InjectionScope | None = None
+    ) -> dict[str, Any]:
+        """Resolve every node of a fully synchronous plan in order, in the calling thread and without an event loop.
+
+        Args:
+            cache: The dependency cache to read from and write to, for the singleton nodes
+            stack: The exit stack that generator dependencies are entered into, which will close them on `aclose()`
+            scope: The active injection scope, holding the cache and the exit stack of the scoped nodes
+
+        Returns:
+            A dictionary mapping the argument names of the root function to their resolved values.
+        """
+        caches, stacks = _get_caches_and_stacks(cache, stack, scope)
+        values: list[Any] = [None] * len(self.nodes)
+        for index, node in enumerate(self.nodes):
+            kwargs = {name: values[argument_index] for name, argument_index in node.arguments}
+            values[index] = _resolve_node_sync(node, kwargs, caches[node.scope], stacks[node.scope])
+
+        return {name: values[argument_index] for name, argument_index in self.arguments}
+
+    async def run_concurrently(
+        self, cache: MutableMapping[Any, Any], stack: AsyncExitStack, scope: InjectionScope | None = None
+    ) -> dict[str, Any]:
+        """Resolve every node of the plan as soon as all of its own dependencies are resolved.
+
+        Independent branches of the graph are resolved concurrently, so the latency of the whole resolution is the
+        one of its critical path. A generator dependency is only entered once its own dependencies are, so the exit
+        stack still tears dependants down before their dependencies.
+
+        Args:
+            cache: The dependency cache to read from and write to, for the singleton nodes
+            stack: The exit stack that generator dependencies are entered into, unless they are scoped
+            scope: The active injection scope, holding the cache and the exit stack of the scoped nodes
+
+        Returns:
+            A dictionary mapping the argument names of the root function to their resolved values.
+        """
+        caches, stacks = _get_caches_and_stacks(cache, stack, scope)
+        tasks: list[asyncio.Task[Any]] = []
+
+        async def resolve(node: PlanNode) -> Any:  # noqa: ANN401
+            kwargs = {name: await tasks[argument_index] for name, argument_index in node.arguments}
+            return await _resolve_node(node, kwargs, caches[node.scope], stacks[node.scope])
+
+        tasks.extend(asyncio.create_task(resolve(node)) for node in self.nodes)
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+
+        return {name: tasks[argument_index].result() for name, argument_index in self.arguments}
+
+
+def _get_caches_and_stacks(
+    cache: MutableMapping[Any, Any], stack: AsyncExitStack, scope: InjectionScope | None
+) -> tuple[dict[Scope, MutableMapping[Any, Any]], dict[Scope, AsyncExitStack]]:
+    call_cache: MutableMapping[Any, Any] = {}
+    return (
+        {Scope.SINGLETON: cache, Scope.SCOPED: scope.cache if scope else call_cache, Scope.TRANSIENT: call_cache},
+        {Scope.SINGLETON: stack, Scope.SCOPED: scope.stack if scope else stack, Scope.TRANSIENT: stack},
+    )
+
+
+async def _resolve_node(
+    node: PlanNode, kwargs: dict[str, Any], cache: MutableMapping[Any, Any], stack: AsyncExitStack
+) -> Any:  # noqa: ANN401
+    if not node.use_cache:
+        value = await _call_node(node, kwargs, stack)
+        if node.cache_key not in cache:
+            cache[node.cache_key] = value
+            dependency_cache.record_insert(cache)
+        return value
+
+    cache_key: tuple[Any, ...] = node.cache_key
+    policy = _get_policy(node, cache)
+    if policy is not None:
+        cache, cache_key = _get_policy_cache(node, policy, kwargs)
+
+    while True:
+        value, pending = single_flight.join(cache, cache_key)
+        if pending is None:
+            if policy is not None:
+                _revalidate_if_stale(node, kwargs, cache, cache_key, stack)
+            return value
+        if isinstance(pending, Flight):
+            break
+        # Shielded, so that cancelling this resolver does not cancel the resolution the others are waiting for.
+        value = await asyncio.shield(asyncio.wrap_future(pending))
+        if value is not RETRY:
+            return value
+
+    try:
+        value = await _call_node(node, kwargs, stack)
+    except BaseException as e:
+        pending.fail(e)
+        raise
+    pending.resolve(cache, cache_key, value)
+    return value
+
+
+async def _call_node(node: PlanNode, kwargs: dict[str, Any], stack: AsyncExitStack) -> Any:  # noqa: ANN401
+    if node.kind is DependencyKind.SYNC:
+        return await run_in_threadpool(node.call, **kwargs)
+    if node.kind is DependencyKind.ASYNC:
+        return await node.call(**kwargs)
+    if node.kind is DependencyKind.GENERATOR:
+        return await stack.enter_async_context(contextmanager_in_threadpool(contextmanager(node.call)(**kwargs)))
+    return await stack.enter_async_context(asynccontextmanager(node.call)(**kwargs))
+
+
+def _resolve_node_sync(
+    node: PlanNode, kwargs: dict[str, Any], cache: MutableMapping[Any, Any], stack: AsyncExitStack
+) -> Any:  # noqa: ANN401
+    pending: Flight | None = None
+    cache_key: tuple[Any, ...] = node.cache_key
+    if node.use_cache:
+        policy = _get_policy(node, cache)
+        if policy is not None:
+            cache, cache_key = _get_policy_cache(node, policy, kwargs)
+        value, pending = _join_sync(cache, cache_key)
+        if value is not MISSING:
+            if policy is not None:
+                _revalidate_if_stale(node, kwargs, cache, cache_key, stack)
+            return value
+
+    try:
+        if node.kind is DependencyKind.SYNC:
+            value = node.call(**kwargs)
+        else:
+            value = stack.enter_context(contextmanager(node.call)(**kwargs))
+    except BaseException as e:
+        if pending is not None:
+            pending.fail(e)
+        raise
+
+    if pending is not None:
+        pending.resolve(cache, cache_key, value)
+    elif cache_key not in cache:
+        cache[cache_key] = value
+        dependency_cache.record_insert(cache)
+    return value
+
+
+def _get_policy(node: PlanNode, cache: MutableMapping[Any, Any]) -> CachePolicy | None:
+    # The policy only applies to the global cache, not to the cache of a call made without `use_cache`, nor to the
+    # cache of an injection scope.
+    return node.policy if cache is dependency_cache.get() else None
+
+
+def _get_policy_cache(
+    node: PlanNode, policy: CachePolicy, kwargs: dict[str, Any]
+) -> tuple[BoundedCache, tuple[Any, ...]]:
+    cache = dependency_cache.get_policy_cache(
+        node.cache_key[0], max_size=policy.max_size, ttl=policy.ttl, stale_ttl=policy.stale_while_revalidate
+    )
+    # Keyed like in the global cache, so that the security scopes still tell the values apart, plus the policy key.
+    return cache, (*node.cache_key, policy.get_key(kwargs))
+
+
+_revalidations: dict[tuple[int, tuple[Any, ...]], object] = {}
+if hasattr(os, "register_at_fork"):  # pragma: no branch
+    # The refreshes in flight are not carried over to a forked process, so they must not keep blocking new ones.
+    os.register_at_fork(after_in_child=_revalidations.clear)
+
+
+def _revalidate_if_stale(
+    node: PlanNode,
+    kwargs: dict[str, Any],
+    cache: MutableMapping[Any, Any],
+    cache_key: tuple[Any, ...],
+    stack: AsyncExitStack,
+) -> None:
+    if not cast(BoundedCache, cache).is_stale(cache_key):
+        return
+
+    # Only one refresh of a stale value at a time, the next lookups keep getting the stale value meanwhile.
+    key = (id(cache), cache_key)
+    token = object()
+    if _revalidations.setdefault(key, token) is not token:
+        return
+    asyncio.run_coroutine_threadsafe(_revalidate(node, kwargs, cache, cache_key, stack), loop_manager.get_loop())
+
+
+async def _revalidate(
+    node: PlanNode,
+    kwargs: dict[str, Any],
+    cache: MutableMapping[Any, Any],
+    cache_key: tuple[Any, ...],
+    stack: AsyncExitStack,
+) -> None:
+    try:
+        cache[cache_key] = await _call_node(node, kwargs, stack)
+    except Exception:
+        logger.exception(f"Failed to refresh the stale value of {node.call}, it is served until it expires")
+    finally:
+        _revalidations.pop((id(cache), cache_key), None)
+
+
+def _join_sync(cache: MutableMapping[Any, Any], cache_key: tuple[Any, ...]) -> tuple[Any, Flight | None]:
+    while True:
+        value, pending = single_flight.join(cache, cache_key)
+        if pending is None or isinstance(pending, Flight):
+            return value, pending
+        if _in_event_loop():
+            # Blocking the event loop could prevent the resolution in flight from ever completing.
+            return MISSING, None
+        value = pending.result()
+        if value is not RETRY:
+            return value, None
+
+
+def _in_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def compile_warmup_plan(plans: Iterable[ExecutionPlan]) -> ExecutionPlan:
+    """Merge the cached dependencies of the given plans into a single plan that resolves all of them.
+
+    Only the singleton nodes using the cache, and the nodes they depend on, are kept. Nodes sharing a cache key
+    across plans are resolved only once.
+
+    Args:
+        plans: The execution plans to merge
+
+    Returns:
+        The merged execution plan, which has no arguments of its own.
+    """
+    nodes: list[PlanNode] = []
+    cached_indexes: dict[CacheKey, int] = {}
+    for plan in plans:
+        needed = {index for index, node in enumerate(plan.nodes) if node.use_cache and node.scope is Scope.SINGLETON}
+        for index in range(len(plan.nodes) - 1, -1, -1):
+            if index in needed:
+                needed.update(argument_index for _, argument_index in plan.nodes[index].arguments)
+
+        new_indexes: dict[int, int] = {}
+        for index in sorted(needed):
+            node = plan.nodes[index]
+            if node.use_cache and node.cache_key in cached_indexes:
+                new_indexes[index] = cached_indexes[node.cache_key]
+                continue
+
+            new_indexes[index] = len(nodes)
+            nodes.append(
+                replace(node, arguments=tuple((name, new_indexes[argument]) for name, argument in node.arguments))
+            )
+            if node.use_cache:
+                cached_indexes[node.cache_key] = new_indexes[index]
+
+    return ExecutionPlan(tuple(nodes), ())
+
+
+def compile_plan(dependant: Dependant) -> ExecutionPlan | None:
+    """Flatten the given dependency graph into a topologically ordered execution plan.
+
+    Dependencies sharing a cache key are resolved only once, as they would be with FastAPI's per-request cache.
+
+    Args:
+        dependant: The root of the dependency graph, with the dependency overrides already applied
+
+    Returns:
+        The execution plan, or None if any dependency of the graph needs request data, in which case the graph
+        must be solved by `solve_dependencies` instead. The own path, query, header, cookie and body params of the
+        root are left out, since they are the arguments its caller passes.
+    """
+    nodes: list[PlanNode] = []
+    cached_indexes: dict[CacheKey, int] = {}
+
+    def visit(dependant: Dependant, *, is_root: bool = False) -> tuple[tuple[str, int], ...] | None:
+        if requires_request(dependant, own_params=not is_root):
+            return None
+
+        arguments: list[tuple[str, int]] = []
+        for sub_dependant in dependant.dependencies:
+            if sub_dependant.use_cache and sub_dependant.cache_key in cached_indexes:
+                index = cached_indexes[sub_dependant.cache_key]
+            else:
+                sub_arguments = visit(sub_dependant)
+                if sub_arguments is None:
+                    return None
+
+                call = cast(Callable[..., Any], sub_dependant.call)
+                index = len(nodes)
+                nodes.append(
+                    PlanNode(
+                        call=call,
+                        kind=get_dependency_kind(call),
+                        cache_key=sub_dependant.cache_key,
+                        use_cache=sub_dependant.use_cache,
+                        scope=get_scope(sub_dependant.cache_key[0]),
+                        policy=get_cache_policy(sub_dependant.cache_key[0]),
+                        arguments=sub_arguments,
+                    )
+                )
+                if sub_dependant.use_cache:
+                    cached_indexes[sub_dependant.cache_key] = index
+
+            arguments.append((cast(str, sub_dependant.name), index))
+        return tuple(arguments)
+
+    arguments = visit(dependant, is_root=True)
+    if arguments is None:
+        return None
+    return ExecutionPlan(tuple(nodes), arguments)
@@ -0,0 +1,108 @@
+from collections.abc import Callable, Hashable
+from dataclasses import dataclass
+from typing import Any, TypeVar, cast
+
+from fastapi.dependencies.utils import is_async_gen_callable, is_gen_callable
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+@dataclass(frozen=True, slots=True)
+class CachePolicy:
+    """How the values of a dependency are cached, as declared on the dependency itself with `cached()`.
+
+    Attributes:
+        ttl: The number of seconds after which a cached value expires. Never expires if None.
+        max_size: The maximum number of cached values, the least recently used ones being evicted first. Unbounded
+            if None.
+        key: A callable receiving the resolved arguments of the dependency as keyword arguments, and returning the
+            key its value is cached under. If None, the resolved arguments themselves are the key.
+        stale_while_revalidate: The number of seconds an expired value is still served for, while it is refreshed in
+            the background. Never served once expired if None.
+    """
+
+    ttl: float | None
+    max_size: int | None
+    key: Callable[..., Hashable] | None
+    stale_while_revalidate: float | None = None
+
+    def get_key(self, kwargs: dict[str, Any]) -> Hashable:
+        """Get the key that the value resolved from the given arguments is cached under."""
+        if self.key is None:
+            return tuple(kwargs.items())
+        return self.key(**kwargs)
+
+
+def cached(
+    *,
+    ttl: float | None = None,
+    maxsize: int | None = None,
+    key: Callable[..., Hashable] | None = None,
+    stale_while_revalidate: float | None = None,
+) -> Callable[[F], F]:
+    """Declare how the decorated dependency is cached, for all of its dependants.
+
+    The dependency gets a cache of its own, holding one value per key computed from its resolved arguments, so that
+    it is only resolved again when its arguments change. Like a singleton, this cache is shared by the whole
+    process, and it is cleared by `clear_dependency_cache()` and `invalidate_dependency_cache()`. Dependants opting
+    out of the cache with `Depends(use_cache=False)` still get a fresh value, and so do the functions resolved with
+    `use_cache=False`. In dependency graphs that need request data, which FastAPI solves itself, the dependency is
+    cached like any other one.
+
+    Args:
+        ttl: The number of seconds after which a cached value expires. Never expires if None.
+        maxsize: The maximum number of cached values, the least recently used ones being evicted first. Unbounded if
+            None.
+        key: A callable receiving the resolved arguments of the dependency as keyword arguments, and returning the
+            key its value is cached under. If None, the resolved arguments themselves are the key, so they must be
+            hashable.
+        stale_while_revalidate: The number of seconds an expired value is still served for. The first lookup of
+            an expired value returns it right away and refreshes it on the background event loop, swapping the new
+            value in once it is resolved. If the refresh fails, the expired value keeps being served until this
+            window is over too. Never served once expired if None. Not supported by generator dependencies, whose
+            replaced values would never be cleaned up.
+
+    Returns:
+        A decorator returning the dependency itself, marked with the given cache policy.
+
+    Raises:
+        ValueError: If `ttl`, `maxsize` or `stale_while_revalidate` is not positive, or if `stale_while_revalidate`
+            is given without `ttl`, or for a generator dependency.
+
+    Example:
+        ```python
+        @cached(ttl=60, maxsize=1024, key=lambda settings, user_id: (settings.region, user_id))
+        def get_quota(
+            settings: Annotated[Settings, Depends(get_settings)], user_id: Annotated[int, Depends(get_user_id)]
+        ) -> Quota:
+            return fetch_quota(settings.region, user_id)
+        ```
+    """
+    if ttl is not None and ttl <= 0:
+        msg = f"ttl must be positive, got {ttl}"
+        raise ValueError(msg)
+    if maxsize is not None and maxsize <= 0:
+        msg = f"maxsize must be positive, got {maxsize}"
+        raise ValueError(msg)
+    if stale_while_revalidate is not None and stale_while_revalidate <= 0:
+        msg = f"stale_while_revalidate must be positive, got {stale_while_revalidate}"
+        raise ValueError(msg)
+    if stale_while_revalidate is not None and ttl is None:
+        msg = "stale_while_revalidate requires a ttl"
+        raise ValueError(msg)
+
+    policy = CachePolicy(ttl=ttl, max_size=maxsize, key=key, stale_while_revalidate=stale_while_revalidate)
+
+    def decorator(func: F) -> F:
+        if stale_while_revalidate is not None and (is_gen_callable(func) or is_async_gen_callable(func)):
+            msg = f"stale_while_revalidate is not supported by generator dependencies, such as {func}"
+            raise ValueError(msg)
+        cast(Any, func).__injectable_cache_policy__ = policy
+        return func
+
+    return decorator
+
+
+def get_cache_policy(call: Callable[..., Any] | None) -> CachePolicy | None:
+    """Get the cache policy declared for the given dependency, if any."""
+    return cast(CachePolicy | None, getattr(call, "__injectable_cache_policy__", None))
@@ -0,0 +1,108 @@
+import inspect
+import multiprocessing.util
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import partial
+from multiprocessing.context import BaseContext
+from typing import Any, ParamSpec, TypeVar, cast
+
+from fastapi import FastAPI
+
+from .async_exit_stack import async_exit_stack_manager
+from .cache import dependency_cache
+from .concurrency import loop_manager, run_coroutine_sync
+from .main import register_app
+from .util import cleanup_all_exit_stacks
+
+T = TypeVar("T")
+P = ParamSpec("P")
+
+
+def _bootstrap_worker(
+    app_factory: Callable[[], FastAPI] | None,
+    initializer: Callable[..., object] | None,
+    initargs: tuple[Any, ...],
+) -> None:
+    # A forked worker inherits the cache and the exit stacks of its parent, whose resources it does not own.
+    dependency_cache.reset()
+    async_exit_stack_manager.reset()
+    if app_factory is not None:
+        run_coroutine_sync(register_app(app_factory()))
+    multiprocessing.util.Finalize(None, _shutdown_worker, exitpriority=0)
+    if initializer is not None:
+        initializer(*initargs)
+
+
+def _shutdown_worker() -> None:
+    run_coroutine_sync(cleanup_all_exit_stacks())
+    loop_manager.shutdown()
+
+
+def _call_in_worker(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:  # noqa: ANN401
+    result = fn(*args, **kwargs)
+    if inspect.iscoroutine(result):
+        return run_coroutine_sync(result)
+    return result
+
+
+class InjectableProcessPoolExecutor(ProcessPoolExecutor):
+    """A process pool that calls injectable functions with their dependencies resolved in the worker processes.
+
+    Each worker bootstraps its own injection context once: it starts with an empty dependency cache and no exit
+    stacks, registers the app built by `app_factory` if one is given, and cleans up its exit stacks when it exits.
+    The functions are pickled by reference, so they must be importable module-level `injectable` functions, and only
+    their arguments and return values cross the process boundary. Async functions are awaited in the worker.
+
+    Args:
+        max_workers: The maximum number of worker processes, defaults to the number of CPUs.
+        mp_context: The multiprocessing context used to start the workers.
+        app_factory: A picklable callable building the FastAPI app to register in each worker.
+        initializer: A picklable callable run in each worker once its injection context is bootstrapped.
+        initargs: The arguments passed to `initializer`.
+
+    Example:
+        ```python
+        @injectable
+        def score(document: str, model: Annotated[Model, Depends(get_model)]) -> float:
+            return model.score(document)
+
+        with InjectableProcessPoolExecutor(app_factory=create_app) as executor:
+            scores = list(executor.map(score, documents))
+        ```
+    """
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        mp_context: BaseContext | None = None,
+        *,
+        app_factory: Callable[[], FastAPI] | None = None,
+        initializer: Callable[..., object] | None = None,
+        initargs: tuple[Any, ...] = (),
+    ) -> None:
+        super().__init__(
+            max_workers,
+            mp_context,
+            initializer=_bootstrap_worker,
+            initargs=(app_factory, initializer, initargs),
+        )
+
+    def submit(
+        self,
+        fn: Callable[P, Awaitable[T]] | Callable[P, T],
+        /,
+        *args: P.args,
+        **kwargs: P.kwargs,
+    ) -> Future[T]:
+        """Schedule the given injectable function to be called in a worker process."""
+        return cast(Future[T], super().submit(_call_in_worker, fn, *args, **kwargs))
+
+    def map(
+        self,
+        fn: Callable[..., Awaitable[T]] | Callable[..., T],
+        *iterables: Iterable[Any],
+        timeout: float | None = None,
+        chunksize: int = 1,
+    ) -> Iterator[T]:
+        """Call the given injectable function on the items of the iterables in the worker processes."""
+        return super().map(partial(_call_in_worker, fn), *iterables, timeout=timeout, chunksize=chunksize)
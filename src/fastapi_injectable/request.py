@@ -0,0 +1,34 @@
+from collections.abc import AsyncGenerator
+from contextvars import ContextVar
+
+from fastapi import Request
+
+from .scope import injection_scope
+
+_current_request: ContextVar[Request | None] = ContextVar("fastapi_injectable_request", default=None)
+
+
+async def capture_request(request: Request) -> AsyncGenerator[None, None]:
+    """Let the injectable functions called while handling a request reuse that request, instead of faking one.
+
+    Declare it as a dependency of the app or of a router. For the whole request, it opens an `injection_scope()`, so
+    that the dependencies declared with `Scope.SCOPED`, e.g. a DB session, are shared by all the injectable functions
+    called by the route, and are cleaned up along with the request. The dependencies reading request data, such as
+    headers or the request state, are resolved from the live request.
+
+    Example:
+        ```python
+        app = FastAPI(dependencies=[Depends(capture_request)])
+        ```
+    """
+    async with injection_scope():
+        token = _current_request.set(request)
+        try:
+            yield
+        finally:
+            _current_request.reset(token)
+
+
+def get_current_request() -> Request | None:
+    """Get the request being handled, if `capture_request` is a dependency of its route."""
+    return _current_request.get()
@@ -0,0 +1,118 @@
+from collections.abc import Callable
+from contextlib import AsyncExitStack
+from contextvars import ContextVar, Token
+from enum import Enum
+from types import TracebackType
+from typing import Any, TypeVar, cast
+
+from .concurrency import run_coroutine_sync
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+class Scope(str, Enum):
+    """The lifetime of a cached dependency.
+
+    Attributes:
+        SINGLETON: Cached in the global dependency cache, for the whole process. This is the default.
+        SCOPED: Cached in the innermost `injection_scope()`, and cleaned up when it exits. Outside of any scope, it
+            is resolved once per call, like a transient dependency.
+        TRANSIENT: Resolved once per call, shared only by the dependants of that call.
+    """
+
+    SINGLETON = "singleton"
+    SCOPED = "scoped"
+    TRANSIENT = "transient"
+
+
+def dependency_scope(scope: Scope) -> Callable[[F], F]:
+    """Declare the lifetime of the decorated dependency.
+
+    Overrides keep the lifetime of the dependency they override.
+
+    Args:
+        scope: The lifetime of the dependency
+
+    Returns:
+        A decorator returning the dependency itself, marked with the given lifetime.
+
+    Example:
+        ```python
+        @dependency_scope(Scope.SCOPED)
+        def get_session(pool: Annotated[Pool, Depends(get_pool)]) -> Generator[Session, None, None]:
+            with pool.session() as session:
+                yield session
+        ```
+    """
+
+    def decorator(func: F) -> F:
+        cast(Any, func).__injectable_scope__ = scope
+        return func
+
+    return decorator
+
+
+def get_scope(call: Callable[..., Any] | None) -> Scope:
+    """Get the lifetime declared for the given dependency, defaulting to a singleton."""
+    return cast(Scope, getattr(call, "__injectable_scope__", Scope.SINGLETON))
+
+
+class InjectionScope:
+    """A cache and an exit stack for the scoped dependencies resolved while it is active.
+
+    It can be used both as a sync and as an async context manager. On exit, the scoped generator dependencies are
+    cleaned up and the scoped cache is dropped, while the singletons are kept.
+    """
+
+    def __init__(self) -> None:
+        self.cache: dict[Any, Any] = {}
+        self.stack = AsyncExitStack()
+        self._token: Token[InjectionScope | None] | None = None
+
+    def __enter__(self) -> "InjectionScope":
+        self._token = _current_scope.set(self)
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self._deactivate()
+        run_coroutine_sync(self.stack.aclose())
+
+    async def __aenter__(self) -> "InjectionScope":
+        return self.__enter__()
+
+    async def __aexit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self._deactivate()
+        await self.stack.aclose()
+
+    def _deactivate(self) -> None:
+        _current_scope.reset(cast("Token[InjectionScope | None]", self._token))
+        self._token = None
+        self.cache.clear()
+
+
+_current_scope: ContextVar[InjectionScope | None] = ContextVar("fastapi_injectable_scope", default=None)
+
+
+def injection_scope() -> InjectionScope:
+    """Create a scope for the dependencies declared with `Scope.SCOPED`, e.g. one per processed message.
+
+    Returns:
+        InjectionScope: The scope, to be entered with `with` or `async with`
+
+    Example:
+        ```python
+        async def handle(message: Message) -> None:
+            async with injection_scope():
+                await process(message)  # Scoped dependencies are shared until the scope exits
+        ```
+    """
+    return InjectionScope()
+
+
+def get_current_scope() -> InjectionScope | None:
+    """Get the innermost active injection scope, if any."""
+    return _current_scope.get()
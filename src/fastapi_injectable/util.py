@@ -1,13 +1,15 @@
 import atexit
 import inspect
 import signal
-from collections.abc import AsyncGenerator, Awaitable, Callable, Coroutine, Generator
+from collections.abc import AsyncGenerator, Awaitable, Callable, Coroutine, Generator, Sequence
 from typing import Any, ParamSpec, TypeVar, cast, overload
 
 from .async_exit_stack import async_exit_stack_manager
-from .cache import dependency_cache
-from .concurrency import run_coroutine_sync
+from .cache import CacheStats, dependency_cache
+from .concurrency import LoopFactory, RunningLoopStrategy, Sharding, loop_manager, run_coroutine_sync
 from .decorator import injectable
+from .graph import dependency_graph_registry
+from .main import resolve_dependencies, resolve_dependencies_many
 
 T = TypeVar("T")
 P = ParamSpec("P")
@@ -144,6 +146,154 @@ def get_injected_obj(
     return cast(T, injectable_func(*args, **kwargs))
 
 
+@overload
+async def aget_injected_obj(
+    func: Callable[..., Awaitable[T]],
+    args: list[Any] | None = None,
+    kwargs: dict[str, Any] | None = None,
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+) -> T: ...
+
+
+@overload
+async def aget_injected_obj(
+    func: Callable[..., Generator[T, Any, Any]],
+    args: list[Any] | None = None,
+    kwargs: dict[str, Any] | None = None,
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+) -> T: ...
+
+
+@overload
+async def aget_injected_obj(
+    func: Callable[..., AsyncGenerator[T, Any]],
+    args: list[Any] | None = None,
+    kwargs: dict[str, Any] | None = None,
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+) -> T: ...
+
+
+@overload
+async def aget_injected_obj(
+    func: Callable[..., T],
+    args: list[Any] | None = None,
+    kwargs: dict[str, Any] | None = None,
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+) -> T: ...
+
+
+async def aget_injected_obj(
+    func: (
+        Callable[P, T]
+        | Callable[P, Awaitable[T]]
+        | Callable[P, Generator[T, Any, Any]]
+        | Callable[P, AsyncGenerator[T, Any]]
+    ),
+    args: list[Any] | None = None,
+    kwargs: dict[str, Any] | None = None,
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+) -> T:
+    """Get an injected object from a dependency function, from async code.
+
+    The awaitable counterpart of `get_injected_obj`: the dependencies are resolved, and the function is called, on
+    the caller's event loop, without going through a background loop nor blocking the caller.
+
+    Args:
+        func: The dependency function to inject. Can be a regular function, an async function, a synchronous
+            generator or an async generator.
+        args: Positional arguments to pass to the dependency function.
+        kwargs: Keyword arguments to pass to the dependency function.
+        use_cache: Whether to cache resolved dependencies. Defaults to True.
+        raise_exception: Whether to raise exceptions during dependency resolution.
+            If False, exceptions are logged as warnings. Defaults to False.
+
+    Returns:
+        The first value yielded/returned by the dependency function after injection.
+
+    Examples:
+        ```python
+        db = await aget_injected_obj(get_db)
+        ```
+
+    Notes:
+        - Regular functions and synchronous generators are called in the caller's thread, so they should not block
+    """
+    target = getattr(func, "__original_func__", func)
+    dependency_graph_registry.track(target, use_cache=use_cache)
+    dependencies = await resolve_dependencies(func=target, use_cache=use_cache, raise_exception=raise_exception)
+    result = target(*(args or []), **{**dependencies, **(kwargs or {})})
+
+    if inspect.isasyncgenfunction(target):
+        return await anext(cast(AsyncGenerator[T, Any], result))
+    if inspect.isgeneratorfunction(target):
+        return next(cast(Generator[T, Any, Any], result))
+    if inspect.iscoroutinefunction(target):
+        return await cast(Coroutine[Any, Any, T], result)
+    return cast(T, result)
+
+
+def get_injected_objs(
+    funcs: Sequence[Callable[..., Any]],
+    *,
+    use_cache: bool = True,
+    raise_exception: bool = False,
+) -> list[Any]:
+    """Get the injected objects of several dependency functions at once.
+
+    All the dependencies are resolved in a single round-trip to the background event loop, sharing one dependency
+    cache pass, instead of one round-trip per function as with `get_injected_obj`.
+
+    Args:
+        funcs: The dependency functions to inject. Each of them can be a regular function, an async function,
+            a synchronous generator or an async generator.
+        use_cache: Whether to cache resolved dependencies. Defaults to True.
+        raise_exception: Whether to raise exceptions during dependency resolution.
+            If False, exceptions are logged as warnings. Defaults to False.
+
+    Returns:
+        The first value yielded/returned by each dependency function after injection, in the same order as `funcs`.
+
+    Examples:
+        ```python
+        db, cache, client = get_injected_objs([get_db, get_cache, get_client])
+        ```
+
+    Notes:
+        - A dependency shared by several functions is resolved only once, even with `use_cache=False`
+        - Async functions and async generators are run on the background event loop, the others in the calling thread
+    """
+    targets = [getattr(func, "__original_func__", func) for func in funcs]
+
+    async def resolve_all() -> list[Any]:
+        results: list[Any] = await resolve_dependencies_many(
+            targets, use_cache=use_cache, raise_exception=raise_exception
+        )
+        for index, target in enumerate(targets):
+            if inspect.isasyncgenfunction(target):
+                results[index] = await anext(target(**results[index]))
+            elif inspect.iscoroutinefunction(target):
+                results[index] = await target(**results[index])
+        return results
+
+    results = run_coroutine_sync(resolve_all())
+    for index, target in enumerate(targets):
+        if inspect.isgeneratorfunction(target):
+            results[index] = next(target(**results[index]))
+        elif not inspect.isasyncgenfunction(target) and not inspect.iscoroutinefunction(target):
+            results[index] = target(**results[index])
+    return results
+
+
 async def cleanup_exit_stack_of_func(func: Callable[..., Any], *, raise_exception: bool = False) -> None:
     """Clean up the exit stack associated with a specific function.
 
@@ -189,6 +339,98 @@ async def clear_dependency_cache() -> None:
     await dependency_cache.clear()
 
 
+async def invalidate_dependency_cache(func: Callable[..., Any]) -> int:
+    """Evict the given dependency and its transitive dependants from the dependency resolution cache.
+
+    Unrelated dependencies stay cached, unlike with `clear_dependency_cache()`, so expensive singletons such as
+    connection pools are not rebuilt when, say, only the settings they do not depend on change.
+
+    Args:
+        func: The dependency to evict. For an overridden dependency, the original one, not its override.
+
+    Returns:
+        The number of evicted cached values.
+
+    Notes:
+        - The dependants are found in the dependency graphs built so far, which include every resolved graph.
+        - Only the global cache is invalidated. Scoped dependencies are dropped when their injection scope exits.
+        - Evicting a generator dependency does not clean it up, it is still cleaned up along with its exit stack.
+    """
+    return dependency_cache.invalidate(dependency_graph_registry.get_dependants(func))
+
+
+def configure_dependency_cache(*, max_size: int | None = None, ttl: float | None = None) -> None:
+    """Bound the dependency resolution cache, or make it unbounded again when called without arguments.
+
+    Args:
+        max_size: The maximum number of cached dependencies, the least recently used ones being evicted first.
+            Unbounded if None.
+        ttl: The number of seconds after which a cached dependency expires and gets resolved again. Never expires if
+            None.
+
+    Raises:
+        ValueError: If `max_size` or `ttl` is not positive.
+
+    Notes:
+        - Evicting a generator dependency does not clean it up, it is still cleaned up along with its exit stack.
+    """
+    dependency_cache.configure(max_size=max_size, ttl=ttl)
+
+
+def configure_loop_pool(
+    size: int = 1,
+    *,
+    sharding: Sharding = "thread",
+    inline: bool = False,
+    on_running_loop: RunningLoopStrategy = "offload",
+    loop_factory: LoopFactory | None = None,
+) -> None:
+    """Run the coroutines of sync callers, e.g. sync injectable functions, on a pool of event loop threads.
+
+    By default, a single background loop runs them all, which caps the throughput of processes making many sync calls
+    from many threads. Call it at startup, since the loops that are removed are shut down.
+
+    Args:
+        size: The number of event loop threads
+        sharding: `"thread"` to keep each calling thread on one loop, or `"round-robin"` to send every call to the
+            next loop.
+        inline: Whether a calling thread that is not running a loop of its own runs the coroutines in place instead,
+            on a loop kept per thread, which saves the hops to and from the pool.
+        on_running_loop: What to do with the calls made by a thread that is running a loop, e.g. a sync injectable
+            function called from async code, which would block that loop while waiting. `"offload"` runs them on a
+            helper thread, which at least never deadlocks, and `"raise"` refuses them with a
+            `RunCoroutineSyncInRunningLoopError`, to find such calls.
+        loop_factory: The callable creating the event loops, both the background ones and the ones kept per thread
+            in the inline mode, e.g. `uvloop.new_event_loop`. Defaults to `asyncio.new_event_loop`.
+
+    Raises:
+        ValueError: If `size` is not positive, or `sharding` or `on_running_loop` is unknown.
+
+    Notes:
+        - The dependency cache and the exit stacks are shared by all the loops. With the `"round-robin"` sharding, a
+          generator dependency may be cleaned up by another loop than the one that entered it, so prefer the
+          `"thread"` sharding for resources bound to a loop.
+        - In the inline mode, the generator dependencies entered by a thread are driven by the loop of that thread.
+    """
+    loop_manager.configure(
+        size, sharding=sharding, inline=inline, on_running_loop=on_running_loop, loop_factory=loop_factory
+    )
+
+
+def get_dependency_cache_stats() -> CacheStats:
+    """Take a snapshot of the counters of the dependency resolution cache.
+
+    Returns:
+        The overall hits, misses, coalesced lookups, inserts and evictions of the cache, its current size, and the
+        hits, misses and coalesced lookups of each dependency.
+
+    Notes:
+        - Dependencies that are never hit are resolved every time they are needed, so caching them does not help.
+        - Only the global cache is counted, not the caches of injection scopes nor the ones of `cached()` dependencies.
+    """
+    return dependency_cache.stats()
+
+
 def setup_graceful_shutdown(signals: list[signal.Signals] | None = None, *, raise_exception: bool = False) -> None:
     """Register handlers to perform cleanup during application shutdown.
 
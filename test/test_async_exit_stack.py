@@ -1,4 +1,5 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import AsyncExitStack
 from unittest.mock import AsyncMock, Mock, patch
 
@@ -46,6 +47,14 @@ async def test_get_stack_returns_existing_stack(manager: AsyncExitStackManager,
     assert stack1 is stack2
 
 
+def test_get_stack_sync(manager: AsyncExitStackManager, mock_func: Mock) -> None:
+    stack1 = manager.get_stack_sync(mock_func)
+    stack2 = manager.get_stack_sync(mock_func)
+    assert isinstance(stack1, AsyncExitStack)
+    assert stack1 is stack2
+    assert manager._stacks[mock_func] is stack1
+
+
 @patch(
     "fastapi_injectable.async_exit_stack.loop_manager",
     new_callable=create_mocked_loop_manager,
@@ -224,6 +233,14 @@ async def test_concurrent_get_stack_access(manager: AsyncExitStackManager, mock_
     assert len(manager._stacks) == 1
 
 
+def test_get_stack_from_many_threads_and_event_loops(manager: AsyncExitStackManager, mock_func: Mock) -> None:
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        stacks = list(executor.map(lambda _: asyncio.run(manager.get_stack(mock_func)), range(32)))
+
+    assert all(stack is stacks[0] for stack in stacks)
+    assert len(manager._stacks) == 1
+
+
 async def test_weakref_cleanup(manager: AsyncExitStackManager) -> None:
     class Temporary:
         def __call__(self) -> None:
@@ -240,3 +257,11 @@ async def test_weakref_cleanup(manager: AsyncExitStackManager) -> None:
     gc.collect()
 
     assert len(manager._stacks) == 0
+
+
+async def test_reset(manager: AsyncExitStackManager, mock_func: Mock) -> None:
+    stack = await manager.get_stack(mock_func)
+    manager.reset()
+
+    assert mock_func not in manager._stacks
+    assert await manager.get_stack(mock_func) is not stack
@@ -0,0 +1,233 @@
+import asyncio
+import contextvars
+import gc
+import weakref
+from contextlib import AsyncExitStack
+from typing import Annotated, Any, cast
+from unittest.mock import patch
+
+import pytest
+from fastapi import Depends
+from fastapi.dependencies.utils import get_dependant
+
+from src.fastapi_injectable.backend import CacheBackend, ContextVarBackend, SizeAwareBackend, WeakValueBackend
+from src.fastapi_injectable.cache import DependencyCache
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.plan import compile_plan
+
+
+class Service:
+    pass
+
+
+class DictBackend(CacheBackend):
+    def __init__(self) -> None:
+        self.data: dict[Any, Any] = {}
+
+    def __getitem__(self, key: Any) -> Any:  # noqa: ANN401
+        return self.data[key]
+
+    def __setitem__(self, key: Any, value: Any) -> None:  # noqa: ANN401
+        self.data[key] = value
+
+    def __delitem__(self, key: Any) -> None:  # noqa: ANN401
+        del self.data[key]
+
+    def __iter__(self) -> Any:  # noqa: ANN401
+        return iter(self.data)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+
+def test_cache_backend() -> None:
+    backend = DictBackend()
+    backend.set_many({"a": 1, "b": 2})
+
+    assert backend.get_many(["a", "c", "b"]) == {"a": 1, "b": 2}
+    assert backend.get_partition() is backend
+    assert backend.evictions == 0
+
+
+def test_weak_value_backend() -> None:
+    backend = WeakValueBackend()
+    service = Service()
+    backend["service"] = service
+    backend["number"] = 1
+    backend["none"] = None
+
+    assert backend["service"] is service
+    assert backend["number"] == 1
+    assert backend["none"] is None
+    assert list(backend) == ["service", "number", "none"]
+
+    del service
+    gc.collect()
+
+    assert "service" not in backend
+    assert len(backend) == 2
+    assert backend.evictions == 1
+
+    del backend["number"]
+    assert list(backend) == ["none"]
+    backend.clear()
+    assert len(backend) == 0
+
+
+def test_weak_value_backend_ignores_collection_of_replaced_value() -> None:
+    backend = WeakValueBackend()
+    replaced = Service()
+    backend["service"] = replaced
+    backend["service"] = service = Service()
+    del replaced
+    gc.collect()
+
+    assert backend["service"] is service
+    backend._collect("service", weakref.ref(service))
+    assert backend["service"] is service
+    assert backend.evictions == 0
+
+
+def test_weak_value_backend_dead_reference() -> None:
+    # A reference may die in another thread between its lookup and the removal of its entry.
+    backend = WeakValueBackend()
+    service = Service()
+    backend._refs["service"] = weakref.ref(service)
+    del service
+    gc.collect()
+
+    assert "service" not in backend
+
+
+def test_size_aware_backend() -> None:
+    backend = SizeAwareBackend(10, sizeof=len)
+    backend["a"] = "aaaa"
+    backend["b"] = "bbbb"
+    assert backend["a"] == "aaaa"
+
+    backend["c"] = "ccc"
+
+    assert list(backend) == ["a", "c"]
+    assert backend.size_bytes == 7
+    assert backend.evictions == 1
+
+    backend["a"] = "a"
+    assert backend.size_bytes == 4
+
+    backend["d"] = "d" * 11
+    assert "d" not in backend
+    assert list(backend) == ["c", "a"]
+    assert backend.size_bytes == 4
+    assert backend.evictions == 1
+
+    backend["a"] = "a" * 11
+    assert list(backend) == ["c"]
+    assert backend.size_bytes == 3
+    assert backend.evictions == 1
+
+    backend["e"] = "e"
+    del backend["e"]
+    backend["f"] = "f"
+    backend.clear()
+    assert len(backend) == 0
+    assert backend.size_bytes == 0
+
+
+def test_size_aware_backend_invalid() -> None:
+    with pytest.raises(ValueError, match="max_bytes must be positive"):
+        SizeAwareBackend(0)
+
+
+def test_context_var_backend() -> None:
+    backend = ContextVarBackend()
+
+    def fill() -> dict[str, Any]:
+        assert "a" not in backend
+        backend["a"] = 1
+        return dict(backend)
+
+    # Bypassed outside of any partition.
+    assert fill() == {}
+    assert len(backend) == 0
+    assert list(backend) == []
+    backend.clear()
+    with pytest.raises(KeyError):
+        del backend["a"]
+
+    with backend.partition():
+        assert fill() == {"a": 1}
+        assert contextvars.copy_context().run(lambda: backend["a"]) == 1
+        with backend.partition():
+            assert fill() == {"a": 1}
+            del backend["a"]
+            assert len(backend) == 0
+        assert backend.get_partition() == {"a": 1}
+        backend.clear()
+        assert len(backend) == 0
+
+    assert "a" not in backend
+
+
+async def test_context_var_backend_does_not_coalesce_across_partitions() -> None:
+    backend = ContextVarBackend()
+
+    async def get_service() -> Service:
+        await asyncio.sleep(0.01)
+        return Service()
+
+    def func(service: Annotated[Service, Depends(get_service)]) -> None:
+        return None
+
+    plan = compile_plan(get_dependant(path="command", call=func))
+    assert plan is not None
+
+    async def resolve(*, partition: bool) -> Service:
+        if not partition:
+            return cast(Service, (await plan.run(backend, AsyncExitStack()))["service"])
+        with backend.partition():
+            return cast(Service, (await plan.run(backend, AsyncExitStack()))["service"])
+
+    services = await asyncio.gather(*(resolve(partition=partition) for partition in (True, True, False, False)))
+
+    assert len({id(service) for service in services}) == 4
+    assert backend.get_partition() is None
+    assert len(backend) == 0
+
+
+async def test_context_var_backend_partition_is_shared_by_sync_and_concurrent_calls() -> None:
+    backend = ContextVarBackend()
+    cache = DependencyCache()
+    cache.set_backend(backend)
+    calls: list[str] = []
+
+    async def get_service() -> Service:
+        calls.append("service")
+        return Service()
+
+    def get_other() -> str:
+        return "other"
+
+    @injectable
+    def func(service: Annotated[Service, Depends(get_service)]) -> Service:
+        return service
+
+    @injectable(concurrent=True)
+    async def afunc(
+        service: Annotated[Service, Depends(get_service)], other: Annotated[str, Depends(get_other)]
+    ) -> Service:
+        return service
+
+    with (
+        patch("src.fastapi_injectable.main.dependency_cache", cache),
+        patch("src.fastapi_injectable.plan.dependency_cache", cache),
+    ):
+        with backend.partition():
+            service = await asyncio.to_thread(func)
+            assert await asyncio.to_thread(func) is service
+            assert await afunc() is service
+            assert await afunc() is service
+        assert calls == ["service"]
+
+        assert await afunc() is not service
+        assert await afunc() is not service
+        assert calls == ["service"] * 3
@@ -1,8 +1,31 @@
 import asyncio
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from typing import Annotated, Any
+from unittest.mock import Mock, patch
 
 import pytest
+from fastapi import Depends
+from fastapi.dependencies.utils import get_dependant
 
-from src.fastapi_injectable.cache import DependencyCache
+from src.fastapi_injectable.backend import ContextVarBackend, SizeAwareBackend
+from src.fastapi_injectable.cache import (
+    MISSING,
+    RETRY,
+    BoundedCache,
+    CacheStats,
+    DependencyCache,
+    DependencyStats,
+    Flight,
+    SingleFlight,
+    dependency_cache,
+    single_flight,
+)
+from src.fastapi_injectable.concurrency import run_coroutine_sync
+from src.fastapi_injectable.plan import _revalidations, compile_plan
 
 
 @pytest.fixture
@@ -29,14 +52,388 @@ async def test_clear_non_empty_cache(cache: DependencyCache) -> None:
     assert cache.get() == {}
 
 
-async def test_clear_lock(cache: DependencyCache) -> None:
+def test_clear_lock(cache: DependencyCache) -> None:
     # Test that clear acquires the lock properly
     cache._cache = {(lambda: None, ("key",)): "value"}
 
-    async with cache._lock:
-        # Try to clear while lock is held; should not deadlock
-        clear_task = asyncio.create_task(cache.clear())
-        await asyncio.sleep(0.1)  # Allow clear to attempt
-        assert not clear_task.done()
-    await clear_task
+    with cache._lock:
+        # Try to clear from another thread while lock is held; should wait for it
+        thread = threading.Thread(target=asyncio.run, args=(cache.clear(),))
+        thread.start()
+        thread.join(0.1)  # Allow clear to attempt
+        assert thread.is_alive()
+    thread.join()
     assert cache.get() == {}
+
+
+def test_clear_from_many_event_loops(cache: DependencyCache) -> None:
+    def clear() -> None:
+        cache._cache[(clear, ())] = "value"
+        asyncio.run(cache.clear())
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(lambda _: clear(), range(20)))
+
+    assert cache.get() == {}
+
+
+def test_bounded_cache_is_thread_safe() -> None:
+    cache = BoundedCache(max_size=10)
+
+    def fill(offset: int) -> None:
+        for i in range(1000):
+            cache[offset, i] = i
+            cache.get((offset, i - 1))
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(fill, range(8)))
+
+    assert len(cache) == 10
+    assert cache.evictions == 8 * 1000 - 10
+
+
+def test_bounded_cache_evicts_least_recently_used() -> None:
+    cache = BoundedCache(max_size=2)
+    cache["a"] = 1
+    cache["b"] = 2
+    assert cache["a"] == 1
+
+    cache["c"] = 3
+
+    assert "b" not in cache
+    assert list(cache) == ["a", "c"]
+    assert len(cache) == 2
+
+
+def test_bounded_cache_expires_entries() -> None:
+    cache = BoundedCache(ttl=10)
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=100):
+        cache["a"] = 1
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=105):
+        cache["b"] = 2
+        assert "a" in cache
+
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=110):
+        assert "a" not in cache
+        assert cache.get("a") is None
+        assert cache["b"] == 2
+        assert len(cache) == 1
+
+
+def test_bounded_cache_drops_expired_entries_on_insert() -> None:
+    cache = BoundedCache(ttl=10)
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=100):
+        cache["a"] = 1
+        cache["b"] = 2
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=110):
+        cache["c"] = 3
+
+    assert list(cache) == ["c"]
+
+
+def test_bounded_cache_insert_expiring_right_away() -> None:
+    cache = BoundedCache(ttl=10)
+    with patch("src.fastapi_injectable.cache.time.monotonic", side_effect=[100, 110]):
+        cache["a"] = 1
+
+    assert len(cache) == 0
+    assert cache.evictions == 1
+
+
+def test_bounded_cache_is_stale() -> None:
+    cache = BoundedCache(ttl=10, stale_ttl=20)
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=100.0) as mock_monotonic:
+        cache["a"] = 1
+        assert not cache.is_stale("a")
+        assert not cache.is_stale("b")
+
+        mock_monotonic.return_value = 110.0
+        assert cache.is_stale("a")
+        assert cache["a"] == 1
+
+        mock_monotonic.return_value = 130.0
+        assert "a" not in cache
+
+    assert not BoundedCache(stale_ttl=20).is_stale("a")
+    unbounded = BoundedCache(max_size=1)
+    unbounded["a"] = 1
+    assert not unbounded.is_stale("a")
+
+
+def test_bounded_cache_delete_and_clear() -> None:
+    cache = BoundedCache()
+    cache["a"] = 1
+    cache["b"] = 2
+    del cache["a"]
+    assert dict(cache) == {"b": 2}
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_configure(cache: DependencyCache) -> None:
+    cache._cache["a"] = 1  # type: ignore[index]
+    cache._cache["b"] = 2  # type: ignore[index]
+
+    cache.configure(max_size=1, ttl=60)
+    bounded = cache.get()
+    assert isinstance(bounded, BoundedCache)
+    assert dict(bounded) == {"b": 2}
+
+    cache.configure()
+    assert type(cache.get()) is dict
+    assert cache.get() == {"b": 2}
+
+
+def test_set_backend(cache: DependencyCache) -> None:
+    cache._cache["a"] = 1  # type: ignore[index]
+    backend = SizeAwareBackend(100, sizeof=lambda _: 60)
+
+    cache.set_backend(backend)
+    assert cache.get() is backend
+    assert dict(backend) == {"a": 1}
+
+    backend["b"] = 2
+    assert cache.stats().evictions == 1
+
+    cache.set_backend(None)
+    assert type(cache.get()) is dict
+    assert cache.get() == {"b": 2}
+    assert cache.stats().evictions == 1
+
+
+def test_configure_invalid(cache: DependencyCache) -> None:
+    with pytest.raises(ValueError, match="max_size must be positive"):
+        cache.configure(max_size=0)
+    with pytest.raises(ValueError, match="ttl must be positive"):
+        cache.configure(ttl=-1)
+
+
+async def test_clear_bounded_cache(cache: DependencyCache) -> None:
+    cache.configure(max_size=10)
+    cache._cache["a"] = 1  # type: ignore[index]
+    await cache.clear()
+    assert len(cache.get()) == 0
+
+
+def test_invalidate(cache: DependencyCache) -> None:
+    def get_a() -> None:
+        return None
+
+    def get_b() -> None:
+        return None
+
+    def get_c() -> None:
+        return None
+
+    cache._cache[(get_a, ())] = 1
+    cache._cache[(get_a, ("scope",))] = 2  # type: ignore[index]
+    cache._cache[(get_b, ())] = 3
+    cache._cache[(get_c, ())] = 4
+
+    assert cache.invalidate({get_a, get_b}) == 3
+    assert cache.get() == {(get_c, ()): 4}
+    assert cache.invalidate({get_a}) == 0
+
+
+async def test_policy_caches(cache: DependencyCache) -> None:
+    def get_a() -> None:
+        return None
+
+    def get_b() -> None:
+        return None
+
+    policy_cache_a = cache.get_policy_cache(get_a, max_size=2, ttl=None)
+    policy_cache_b = cache.get_policy_cache(get_b, max_size=None, ttl=60)
+
+    assert cache.get_policy_cache(get_a, max_size=None, ttl=None) is policy_cache_a
+    assert isinstance(policy_cache_a, BoundedCache)
+    assert policy_cache_a.max_size == 2
+
+    policy_cache_a[(get_a, (), 1)] = 1
+    policy_cache_a[(get_a, (), 2)] = 2
+    policy_cache_b[(get_b, (), 1)] = 3
+    cache._cache[(get_a, ())] = 4
+
+    assert cache.invalidate({get_a}) == 3
+    assert len(policy_cache_a) == 0
+    assert len(policy_cache_b) == 1
+
+    await cache.clear()
+    assert len(policy_cache_b) == 0
+
+
+def test_single_flight_join() -> None:
+    flights = SingleFlight(DependencyCache())
+    cache: dict[Any, Any] = {"cached": 1}
+
+    assert flights.join(cache, "cached") == (1, None)
+
+    value, flight = flights.join(cache, "key")
+    assert value is MISSING
+    assert isinstance(flight, Flight)
+
+    value, future = flights.join(cache, "key")
+    assert value is MISSING
+    assert future is flight.future
+
+    value, other_flight = flights.join({}, "key")
+    assert isinstance(other_flight, Flight)
+    other_flight.fail(ValueError("broken"))
+
+    flight.resolve(cache, "key", 2)
+    assert cache["key"] == 2
+    assert flight.future.result() == 2
+    assert flights.join(cache, "key") == (2, None)
+    assert flights.flights == {}
+
+
+def test_single_flight_join_without_partition() -> None:
+    flights = SingleFlight(DependencyCache())
+    backend = ContextVarBackend()
+
+    _, flight = flights.join(backend, "key")
+    _, other_flight = flights.join(backend, "key")
+    assert isinstance(flight, Flight)
+    assert isinstance(other_flight, Flight)
+    assert flights.flights == {}
+
+    flight.resolve(backend, "key", 1)
+    other_flight.fail(ValueError("broken"))
+    assert flight.future.result() == 1
+    assert "key" not in backend
+
+
+async def test_single_flight_is_not_joined_from_the_loop_it_blocks() -> None:
+    started = asyncio.Event()
+
+    async def get_slow() -> object:
+        started.set()
+        await asyncio.sleep(0.1)
+        return object()
+
+    def func(slow: Annotated[object, Depends(get_slow)]) -> None:
+        return None
+
+    plan = compile_plan(get_dependant(path="command", call=func))
+    assert plan is not None
+    cache: dict[Any, Any] = {}
+    task = asyncio.create_task(plan.run(cache, AsyncExitStack()))
+    await started.wait()
+
+    # Blocks the loop of the task in flight, which would never complete if the offloaded call waited for it.
+    offloaded = run_coroutine_sync(plan.run(cache, AsyncExitStack()), timeout=5)
+
+    assert offloaded["slow"] is cache[(get_slow, ())]
+    assert (await task)["slow"] is not offloaded["slow"]
+    assert single_flight.flights == {}
+
+
+def test_single_flight_reset() -> None:
+    flights = SingleFlight(DependencyCache())
+    flights.join({}, "key")
+    flights.reset()
+
+    assert flights.flights == {}
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_resolutions_in_flight_are_forgotten_in_forked_child() -> None:
+    def get_pool() -> str:
+        return "pool"
+
+    def func(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    plan = compile_plan(get_dependant(path="command", call=func))
+    assert plan is not None
+    _, flight = single_flight.join(dependency_cache.get(), (get_pool, ()))
+    assert isinstance(flight, Flight)
+    _revalidations[(0, ())] = object()
+
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        signal.alarm(5)
+        values = plan.run_sync(dependency_cache.get(), AsyncExitStack())
+        os._exit(0 if values == {"pool": "pool"} and not _revalidations else 1)
+
+    _, status = os.waitpid(pid, 0)
+    flight.fail(asyncio.CancelledError())
+    _revalidations.pop((0, ()))
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_single_flight_fail() -> None:
+    flights = SingleFlight(DependencyCache())
+    _, flight = flights.join({}, "key")
+    assert isinstance(flight, Flight)
+    flight.fail(ValueError("broken"))
+
+    with pytest.raises(ValueError, match="broken"):
+        flight.future.result()
+
+    _, flight = flights.join({}, "key")
+    assert isinstance(flight, Flight)
+    flight.fail(asyncio.CancelledError())
+
+    assert flight.future.result() is RETRY
+    assert flights.flights == {}
+
+
+def test_single_flight_join_resolved_while_claiming() -> None:
+    flights = SingleFlight(DependencyCache())
+    cache = Mock(get=Mock(side_effect=[MISSING, 1]))
+
+    assert flights.join(cache, "key") == (1, None)
+    assert flights.flights == {}
+
+
+def test_stats(cache: DependencyCache) -> None:
+    def get_pool() -> None:
+        return None
+
+    def get_session() -> None:
+        return None
+
+    flights = SingleFlight(cache)
+    _, flight = flights.join(cache.get(), (get_pool, ()))
+    assert isinstance(flight, Flight)
+    flights.join(cache.get(), (get_pool, ()))
+    flight.resolve(cache.get(), (get_pool, ()), "pool")
+    flights.join(cache.get(), (get_pool, ()))
+    flights.join(cache.get(), (get_pool, ()))
+    _, flight = flights.join(cache.get(), (get_session, ()))
+    assert isinstance(flight, Flight)
+    flight.fail(ValueError("broken"))
+    flights.join({}, (get_session, ()))
+
+    assert cache.stats() == CacheStats(
+        hits=2,
+        misses=2,
+        coalesced=1,
+        inserts=1,
+        evictions=0,
+        size=1,
+        dependencies={
+            get_pool: DependencyStats(hits=2, misses=1, coalesced=1),
+            get_session: DependencyStats(hits=0, misses=1, coalesced=0),
+        },
+    )
+
+
+def test_stats_evictions(cache: DependencyCache) -> None:
+    cache.configure(max_size=1)
+    cache.get()["a"] = 1
+    cache.get()["b"] = 2
+    assert cache.stats().evictions == 1
+
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=100):
+        cache.configure(ttl=10)
+        cache.get()["c"] = 3
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=110):
+        assert "c" not in cache.get()
+        assert "b" not in cache.get()
+
+    stats = cache.stats()
+    assert stats.evictions == 3
+    assert stats.size == 0
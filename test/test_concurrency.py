@@ -1,12 +1,26 @@
 import asyncio
+import contextvars
+import gc
+import os
 import threading
 import time
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
 from unittest.mock import MagicMock, Mock, patch
 
 import pytest
 
-from fastapi_injectable.exception import RunCoroutineSyncMaxRetriesError
-from src.fastapi_injectable.concurrency import LoopManager, run_coroutine_sync
+from fastapi_injectable.exception import RunCoroutineSyncInRunningLoopError, RunCoroutineSyncMaxRetriesError
+from src.fastapi_injectable.concurrency import (
+    LoopManager,
+    LoopPool,
+    _inherited_loops,
+    _InlineLoop,
+    is_blocked_loop,
+    map_in_tasks,
+    map_in_threads,
+    run_coroutine_sync,
+)
 
 
 async def test_loop_manager_shutdown() -> None:
@@ -90,8 +104,344 @@ def test_loop_manager_shutdown_with_running_loop_no_thread() -> None:
     manager._loop.close.assert_called_once()
 
 
+def test_loop_manager_reset() -> None:
+    manager = LoopManager()
+    loop = manager.get_loop()
+    manager.reset()
+
+    assert manager.get_loop() is not loop
+
+    manager.shutdown()
+    loop.call_soon_threadsafe(loop.stop)
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_loop_manager_is_reset_in_forked_child() -> None:
+    async def get_pid() -> int:
+        return os.getpid()
+
+    run_coroutine_sync(get_pid())
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        os._exit(0 if run_coroutine_sync(get_pid(), timeout=5) == os.getpid() else 1)
+
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0
+
+
+def test_loop_pool_thread_sharding() -> None:
+    pool = LoopPool(2)
+
+    def get_loops() -> list[asyncio.AbstractEventLoop]:
+        return [pool.get_loop(), pool.get_loop()]
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        other_loops = executor.submit(get_loops).result()
+    loops = get_loops()
+
+    assert pool.size == 2
+    assert other_loops[0] is other_loops[1]
+    assert loops[0] is loops[1]
+    assert loops[0] is not other_loops[0]
+    assert pool.get_manager() is pool._managers[1]
+
+    pool.shutdown()
+    assert all(loop.is_closed() for loop in loops + other_loops)
+
+
+def test_loop_pool_round_robin_sharding() -> None:
+    pool = LoopPool(2, sharding="round-robin")
+
+    managers = [pool.get_manager() for _ in range(4)]
+
+    assert managers == pool._managers * 2
+
+
+def test_loop_pool_configure() -> None:
+    pool = LoopPool(3)
+    managers = pool._managers
+    loop = managers[2].get_loop()
+
+    pool.configure(2)
+    assert pool._managers == managers[:2]
+    assert loop.is_closed()
+
+    pool.configure(4, sharding="round-robin")
+    assert pool._managers[:2] == managers[:2]
+    assert pool.size == 4
+    assert pool.sharding == "round-robin"
+
+    with pytest.raises(ValueError, match="size must be positive"):
+        pool.configure(0)
+    with pytest.raises(ValueError, match="sharding must be 'thread' or 'round-robin'"):
+        pool.configure(2, sharding="random")  # type: ignore[arg-type]
+
+
+async def test_loop_pool_start_reset_and_run_in_loop() -> None:
+    pool = LoopPool(2)
+    pool.start()
+    loops = [manager._loop for manager in pool._managers]
+    pool.reset()
+
+    assert all(manager._loop is None for manager in pool._managers)
+    assert await pool.run_in_loop(asyncio.sleep(0, "done")) == "done"
+
+    pool.shutdown()
+    for loop in loops:
+        assert loop is not None
+        loop.call_soon_threadsafe(loop.stop)
+
+
+def test_run_coroutine_sync_on_loop_pool() -> None:
+    pool = LoopPool(2, sharding="round-robin")
+
+    async def get_thread_id() -> int:
+        return threading.get_ident()
+
+    with patch("src.fastapi_injectable.concurrency.loop_manager", pool):
+        thread_ids = {run_coroutine_sync(get_thread_id()) for _ in range(4)}
+
+    assert len(thread_ids) == 2
+    pool.shutdown()
+
+
+def test_run_coroutine_sync_inline() -> None:
+    pool = LoopPool(inline=True)
+    variable: contextvars.ContextVar[str] = contextvars.ContextVar("variable", default="default")
+
+    async def get_thread_and_loop() -> tuple[int, asyncio.AbstractEventLoop, str]:
+        return threading.get_ident(), asyncio.get_running_loop(), variable.get()
+
+    token = variable.set("caller")
+    try:
+        with patch("src.fastapi_injectable.concurrency.loop_manager", pool):
+            thread_id_1, loop_1, value = run_coroutine_sync(get_thread_and_loop())
+            thread_id_2, loop_2, _ = run_coroutine_sync(get_thread_and_loop())
+            loop_1.close()
+            _, loop_3, _ = run_coroutine_sync(get_thread_and_loop())
+    finally:
+        variable.reset(token)
+
+    assert thread_id_1 == thread_id_2 == threading.get_ident()
+    assert value == "caller"
+    assert loop_1 is loop_2
+    assert loop_3 is not loop_1
+
+    pool.shutdown()
+    assert loop_3.is_closed()
+
+
+async def test_run_coroutine_sync_inline_with_running_loop() -> None:
+    pool = LoopPool(inline=True)
+
+    async def get_thread_id() -> int:
+        return threading.get_ident()
+
+    with patch("src.fastapi_injectable.concurrency.loop_manager", pool):
+        assert run_coroutine_sync(get_thread_id()) != threading.get_ident()
+
+    pool.shutdown()
+
+
+def test_run_coroutine_sync_inline_timeout() -> None:
+    pool = LoopPool(inline=True)
+    cancelled = threading.Event()
+
+    async def sleep() -> None:
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with patch("src.fastapi_injectable.concurrency.loop_manager", pool), pytest.raises(asyncio.TimeoutError):
+        run_coroutine_sync(sleep(), timeout=0.01)
+
+    assert cancelled.is_set()
+    pool.shutdown()
+
+
+def test_inline_loop_is_closed_with_its_thread() -> None:
+    pool = LoopPool(inline=True)
+
+    async def get_loop() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        loop = executor.submit(pool.run_inline, get_loop(), 5).result()
+    gc.collect()
+
+    assert loop.is_closed()
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+def test_inline_loop_is_kept_open_in_forked_child() -> None:
+    pool = LoopPool(inline=True)
+
+    async def wait_for_thread() -> float:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def set_result() -> None:
+            time.sleep(0.1)
+            loop.call_soon_threadsafe(future.set_result, None)
+
+        started = time.monotonic()
+        threading.Thread(target=set_result).start()
+        await future
+        return time.monotonic() - started
+
+    pool.run_inline(wait_for_thread(), 5)
+    pid = os.fork()
+    if pid == 0:  # pragma: no cover
+        pool.reset()
+        gc.collect()
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    # Woken up by the thread right away, rather than by the timeout, only if the loop still listens to its wakeup pipe.
+    assert pool.run_inline(wait_for_thread(), 5) < 2
+    pool.shutdown()
+
+
+def test_inline_loop_dropped_in_forked_child_is_not_closed() -> None:
+    loop = asyncio.new_event_loop()
+    inline_loop = _InlineLoop(loop)
+    inline_loop.pid = -1
+    del inline_loop
+
+    assert not loop.is_closed()
+    _inherited_loops.remove(loop)
+    loop.close()
+
+
+def test_loop_pool_shutdown_keeps_running_inline_loop() -> None:
+    pool = LoopPool(inline=True)
+
+    async def shutdown() -> asyncio.AbstractEventLoop:
+        pool.shutdown()
+        return asyncio.get_running_loop()
+
+    loop = pool.run_inline(shutdown(), 5)
+
+    assert not loop.is_closed()
+    loop.close()
+
+
+def test_run_coroutine_sync_from_managed_loop() -> None:
+    pool = LoopPool()
+    variable: contextvars.ContextVar[str] = contextvars.ContextVar("variable", default="default")
+
+    async def get_thread_name() -> tuple[str, str]:
+        return threading.current_thread().name, variable.get()
+
+    async def call_sync() -> tuple[str, str]:
+        # Waiting for the managed loop from the managed loop itself would deadlock.
+        return run_coroutine_sync(get_thread_name(), timeout=5)
+
+    token = variable.set("caller")
+    try:
+        with patch("src.fastapi_injectable.concurrency.loop_manager", pool):
+            name, value = run_coroutine_sync(call_sync(), timeout=5)
+    finally:
+        variable.reset(token)
+
+    assert name.startswith("async-util-helper")
+    assert value == "caller"
+
+    pool.shutdown()
+    assert pool._helpers is None
+    pool.shutdown()
+
+
+async def test_run_coroutine_sync_from_running_loop_raises() -> None:
+    pool = LoopPool(on_running_loop="raise")
+
+    async def get_value() -> int:
+        return 1  # pragma: no cover
+
+    with (
+        patch("src.fastapi_injectable.concurrency.loop_manager", pool),
+        pytest.raises(RunCoroutineSyncInRunningLoopError, match="Await the coroutine instead"),
+    ):
+        run_coroutine_sync(get_value())
+
+
+def test_loop_pool_invalid_running_loop_strategy() -> None:
+    with pytest.raises(ValueError, match="on_running_loop must be 'offload' or 'raise'"):
+        LoopPool(on_running_loop="block")  # type: ignore[arg-type]
+
+
+async def test_loop_pool_reset_forgets_helpers() -> None:
+    pool = LoopPool()
+
+    async def get_value() -> int:
+        return 1
+
+    with patch("src.fastapi_injectable.concurrency.loop_manager", pool):
+        assert run_coroutine_sync(get_value()) == 1
+
+    helpers = pool._helpers
+    assert helpers is not None
+    pool.reset()
+
+    assert pool._helpers is None
+    helpers.shutdown()
+
+
+async def test_run_offloaded_marks_the_caller_loop_as_blocked() -> None:
+    pool = LoopPool()
+    loop = asyncio.get_running_loop()
+
+    async def get_blocked() -> tuple[bool, bool]:
+        return is_blocked_loop(loop), is_blocked_loop(asyncio.get_running_loop())
+
+    with patch("src.fastapi_injectable.concurrency.loop_manager", pool):
+        assert run_coroutine_sync(get_blocked()) == (True, False)
+    assert not is_blocked_loop(loop)
+    pool.shutdown()
+
+
+def test_loop_pool_loop_factory() -> None:
+    created: list[asyncio.AbstractEventLoop] = []
+
+    def loop_factory() -> asyncio.AbstractEventLoop:
+        loop = asyncio.new_event_loop()
+        created.append(loop)
+        return loop
+
+    pool = LoopPool(2, sharding="round-robin", inline=True, loop_factory=loop_factory)
+
+    async def get_loop() -> asyncio.AbstractEventLoop:
+        return asyncio.get_running_loop()
+
+    loops = [pool.get_loop(), pool.get_loop()]
+    inline_loop = pool.run_inline(get_loop(), 5)
+    pool.configure(3)
+    default_loop = pool._managers[0].get_loop()
+
+    assert created == [*loops, inline_loop]
+    assert default_loop is loops[0]
+    assert pool._managers[2].loop_factory is None
+
+    pool.shutdown()
+
+
+def test_run_coroutine_sync_propagates_context() -> None:
+    variable: contextvars.ContextVar[str] = contextvars.ContextVar("variable", default="default")
+
+    async def get_variable() -> str:
+        return variable.get()
+
+    token = variable.set("caller")
+    try:
+        assert run_coroutine_sync(get_variable()) == "caller"
+    finally:
+        variable.reset(token)
+
+
 @patch("fastapi_injectable.concurrency.asyncio.run_coroutine_threadsafe")
-async def test_run_coroutine_sync_max_retries(mock_run_coroutine_threadsafe: Mock) -> None:
+def test_run_coroutine_sync_max_retries(mock_run_coroutine_threadsafe: Mock) -> None:
     # Mock coroutine that creates a new coroutine each time
     async def mock_coro() -> None:
         pass
@@ -104,7 +454,7 @@ async def test_run_coroutine_sync_max_retries(mock_run_coroutine_threadsafe: Moc
         run_coroutine_sync(mock_coro(), max_retries=2)
 
 
-async def test_run_coroutine_sync_other_runtime_error() -> None:
+def test_run_coroutine_sync_other_runtime_error() -> None:
     async def mock_coro() -> None:
         msg = "Some other error"
         raise RuntimeError(msg)
@@ -112,3 +462,106 @@ async def test_run_coroutine_sync_other_runtime_error() -> None:
     # Test that other RuntimeErrors are re-raised
     with pytest.raises(RuntimeError, match="Some other error"):
         run_coroutine_sync(mock_coro())
+
+
+def test_map_in_threads_ordered() -> None:
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    def func(item: int) -> int:
+        nonlocal in_flight, max_in_flight
+        with lock:
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+        time.sleep(0.01 * (item % 3))
+        with lock:
+            in_flight -= 1
+        return item * 2
+
+    results = list(map_in_threads(func, range(20), concurrency=4))
+
+    assert results == [item * 2 for item in range(20)]
+    assert 1 < max_in_flight <= 4
+
+
+def test_map_in_threads_unordered() -> None:
+    def func(item: float) -> float:
+        time.sleep(item)
+        return item
+
+    results = list(map_in_threads(func, [0.2, 0.0, 0.1], concurrency=3, ordered=False))
+
+    assert results == [0.0, 0.1, 0.2]
+
+
+def test_map_in_threads_consumes_iterable_lazily() -> None:
+    consumed: list[int] = []
+
+    def items() -> Iterator[int]:
+        for item in range(100):
+            consumed.append(item)
+            yield item
+
+    results = map_in_threads(lambda item: item, items(), concurrency=2)
+    assert next(results) == 0
+    results.close()
+
+    assert len(consumed) <= 4
+
+
+async def test_map_in_tasks_ordered() -> None:
+    in_flight = 0
+    max_in_flight = 0
+
+    async def func(item: int) -> int:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(0.01 * (item % 3))
+        in_flight -= 1
+        return item * 2
+
+    results = [result async for result in map_in_tasks(func, range(20), concurrency=4)]
+
+    assert results == [item * 2 for item in range(20)]
+    assert max_in_flight == 4
+
+
+async def test_map_in_tasks_unordered() -> None:
+    async def func(item: float) -> float:
+        await asyncio.sleep(item)
+        return item
+
+    results = [result async for result in map_in_tasks(func, [0.2, 0.0, 0.1], concurrency=3, ordered=False)]
+
+    assert results == [0.0, 0.1, 0.2]
+
+
+async def test_map_in_tasks_cancels_pending_tasks_on_close() -> None:
+    cancelled: list[int] = []
+
+    async def func(item: int) -> int:
+        try:
+            await asyncio.sleep(item)
+        except asyncio.CancelledError:
+            cancelled.append(item)
+            raise
+        return item
+
+    results = map_in_tasks(func, [0, 10, 10], concurrency=3)
+    assert await anext(results) == 0
+    await results.aclose()
+    await asyncio.sleep(0)
+
+    assert cancelled == [10, 10]
+
+
+async def test_map_invalid_concurrency() -> None:
+    async def double(item: int) -> int:
+        return item * 2  # pragma: no cover
+
+    with pytest.raises(ValueError, match="concurrency must be positive"):
+        list(map_in_threads(str, [1], concurrency=0))
+    with pytest.raises(ValueError, match="concurrency must be positive"):
+        [result async for result in map_in_tasks(double, [1], concurrency=0)]
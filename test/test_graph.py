@@ -0,0 +1,303 @@
+import gc
+from collections.abc import AsyncGenerator, Generator
+from typing import Annotated
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import Depends, FastAPI, Request
+from fastapi.dependencies.utils import get_dependant
+
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.graph import (
+    DependencyEdge,
+    DependencyGraphRegistry,
+    DependencyNode,
+    dependency_graph_registry,
+    describe_graph,
+)
+from src.fastapi_injectable.plan import DependencyKind, compile_plan
+from src.fastapi_injectable.policy import CachePolicy, cached
+from src.fastapi_injectable.scope import Scope
+
+
+class Mayor:
+    pass
+
+
+class Capital:
+    def __init__(self, mayor: Mayor) -> None:
+        self.mayor = mayor
+
+
+def get_mayor() -> Mayor:
+    return Mayor()
+
+
+def get_another_mayor() -> Mayor:
+    return Mayor()
+
+
+def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+    return Capital(mayor)
+
+
+def get_country(capital: Annotated[Capital, Depends(get_capital)]) -> None:
+    return None
+
+
+@pytest.fixture
+def registry() -> DependencyGraphRegistry:
+    return DependencyGraphRegistry()
+
+
+def test_get_builds_graph_once(registry: DependencyGraphRegistry) -> None:
+    with patch("src.fastapi_injectable.graph.get_dependant", wraps=get_dependant) as mock:
+        dependant_1 = registry.get(get_country)
+        dependant_2 = registry.get(get_country)
+
+    mock.assert_called_once_with(path="command", call=get_country)
+    assert dependant_1 is dependant_2
+    assert dependant_1.call is None
+    assert dependant_1.dependencies[0].call is get_capital
+
+
+def test_get_rebuilds_graph_when_overrides_change(registry: DependencyGraphRegistry) -> None:
+    app = FastAPI()
+    dependant_1 = registry.get(get_country, app)
+
+    app.dependency_overrides[get_mayor] = get_another_mayor
+    dependant_2 = registry.get(get_country, app)
+
+    assert dependant_1 is not dependant_2
+    mayor_dependant = dependant_2.dependencies[0].dependencies[0]
+    assert mayor_dependant.call is get_another_mayor
+    assert mayor_dependant.cache_key == (get_mayor, ())
+    assert registry.get(get_country, app) is dependant_2
+
+    app.dependency_overrides.clear()
+    dependant_3 = registry.get(get_country, app)
+
+    assert dependant_3 is not dependant_2
+    assert dependant_3.dependencies[0].dependencies[0].call is get_mayor
+
+
+def test_get_not_weakly_referenceable(registry: DependencyGraphRegistry) -> None:
+    with patch.object(registry, "_graphs", Mock(get=Mock(side_effect=TypeError))):
+        dependant_1 = registry.get(get_country)
+        dependant_2 = registry.get(get_country)
+
+    assert dependant_1 is not dependant_2
+
+
+def test_get_plan_compiles_plan_once(registry: DependencyGraphRegistry) -> None:
+    with patch("src.fastapi_injectable.graph.compile_plan", wraps=compile_plan) as mock:
+        plan_1 = registry.get_plan(get_country)
+        plan_2 = registry.get_plan(get_country)
+
+    mock.assert_called_once_with(registry.get(get_country))
+    assert plan_1 is plan_2
+    assert plan_1 is not None
+    assert [node.call for node in plan_1.nodes] == [get_mayor, get_capital]
+
+
+def test_get_plan_not_weakly_referenceable(registry: DependencyGraphRegistry) -> None:
+    with patch.object(registry, "_plans", Mock(__contains__=Mock(side_effect=TypeError))):
+        plan_1 = registry.get_plan(get_country)
+        plan_2 = registry.get_plan(get_country)
+
+    assert plan_1 is not plan_2
+
+
+def test_clear(registry: DependencyGraphRegistry) -> None:
+    dependant = registry.get(get_country)
+    plan = registry.get_plan(get_country)
+    registry.clear()
+
+    assert registry.get(get_country) is not dependant
+    assert registry.get_plan(get_country) is not plan
+
+
+def test_get_dependants(registry: DependencyGraphRegistry) -> None:
+    def get_region(
+        capital: Annotated[Capital, Depends(get_capital)], mayor: Annotated[Mayor, Depends(get_mayor)]
+    ) -> None:
+        return None
+
+    def get_continent(
+        capital: Annotated[Capital, Depends(get_capital)], region: Annotated[None, Depends(get_region)]
+    ) -> None:
+        return None
+
+    assert registry.get_dependants(get_mayor) == {get_mayor}
+
+    registry.get(get_continent)
+
+    # The injectable function itself is never cached, so it is not a dependant.
+    assert registry.get_dependants(get_mayor) == {get_mayor, get_capital, get_region}
+    assert registry.get_dependants(get_region) == {get_region}
+
+
+def test_get_dependants_of_overridden_dependency(registry: DependencyGraphRegistry) -> None:
+    def get_deputy() -> Mayor:
+        return Mayor()
+
+    def get_overridden_mayor(deputy: Annotated[Mayor, Depends(get_deputy)]) -> Mayor:
+        return deputy
+
+    app = FastAPI()
+    app.dependency_overrides[get_mayor] = get_overridden_mayor
+    registry.get(get_country, app)
+    registry.clear()
+
+    # Kept after the graphs are dropped, since the cache may still hold what they resolved.
+    assert registry.get_dependants(get_deputy) == {get_deputy, get_mayor, get_capital}
+
+
+def test_weakref_cleanup(registry: DependencyGraphRegistry) -> None:
+    def temporary(capital: Annotated[Capital, Depends(get_capital)]) -> None:
+        return None
+
+    registry.get_plan(temporary)
+    assert len(registry._graphs) == 1
+    assert len(registry._plans) == 1
+
+    del temporary
+    gc.collect()
+
+    assert len(registry._graphs) == 0
+    assert len(registry._plans) == 0
+
+
+def test_track(registry: DependencyGraphRegistry) -> None:
+    registry.track(get_country, use_cache=False)
+    assert registry.tracked() == [(get_country, False)]
+
+    registry.track(get_country, use_cache=True)
+    registry.track(get_country, use_cache=False)
+    assert registry.tracked() == [(get_country, True)]
+
+
+def test_track_not_weakly_referenceable(registry: DependencyGraphRegistry) -> None:
+    class Callable:
+        __slots__ = ()
+
+        def __call__(self) -> None:
+            return None
+
+    registry.track(Callable(), use_cache=True)
+    assert registry.tracked() == []
+
+
+def test_injectable_tracks_decorated_function() -> None:
+    def func(capital: Annotated[Capital, Depends(get_capital)]) -> None:
+        return None
+
+    injectable(func, use_cache=False)
+
+    assert (func, False) in dependency_graph_registry.tracked()
+
+
+def test_describe_graph(registry: DependencyGraphRegistry) -> None:
+    @cached(ttl=60)
+    def get_session(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Generator[str, None, None]:
+        yield "session"
+
+    async def get_path(request: Request) -> AsyncGenerator[str, None]:
+        yield request.url.path
+
+    def func(
+        capital: Annotated[Capital, Depends(get_capital)],
+        session: Annotated[str, Depends(get_session)],
+        mayor: Annotated[Mayor, Depends(get_mayor, use_cache=False)],
+        path: Annotated[str, Depends(get_path)],
+    ) -> None:
+        return None
+
+    app = FastAPI()
+    app.dependency_overrides[get_capital] = get_capital
+    app.dependency_overrides[get_session] = lambda: "session"
+    graph = describe_graph(registry.get(func, app))
+
+    assert graph.nodes == (
+        DependencyNode(
+            call=get_capital,
+            kind=DependencyKind.SYNC,
+            use_cache=True,
+            scope=Scope.SINGLETON,
+            overridden_call=None,
+            requires_request=False,
+            policy=None,
+        ),
+        DependencyNode(
+            call=get_mayor,
+            kind=DependencyKind.SYNC,
+            use_cache=True,
+            scope=Scope.SINGLETON,
+            overridden_call=None,
+            requires_request=False,
+            policy=None,
+        ),
+        DependencyNode(
+            call=app.dependency_overrides[get_session],
+            kind=DependencyKind.SYNC,
+            use_cache=True,
+            scope=Scope.SINGLETON,
+            overridden_call=get_session,
+            requires_request=False,
+            policy=CachePolicy(ttl=60, max_size=None, key=None),
+        ),
+        DependencyNode(
+            call=get_mayor,
+            kind=DependencyKind.SYNC,
+            use_cache=False,
+            scope=Scope.SINGLETON,
+            overridden_call=None,
+            requires_request=False,
+            policy=None,
+        ),
+        DependencyNode(
+            call=get_path,
+            kind=DependencyKind.ASYNC_GENERATOR,
+            use_cache=True,
+            scope=Scope.SINGLETON,
+            overridden_call=None,
+            requires_request=True,
+            policy=None,
+        ),
+    )
+    assert graph.edges == (
+        DependencyEdge(dependant=0, dependency=1, name="mayor"),
+        DependencyEdge(dependant=None, dependency=0, name="capital"),
+        DependencyEdge(dependant=None, dependency=2, name="session"),
+        DependencyEdge(dependant=None, dependency=3, name="mayor"),
+        DependencyEdge(dependant=None, dependency=4, name="path"),
+    )
+    assert graph.depth == 2
+    assert graph.max_fan_out == 4
+    assert graph.generator_count == 1
+    assert graph.shared_count == 0
+
+
+def test_describe_graph_metrics(registry: DependencyGraphRegistry) -> None:
+    def get_session(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Generator[str, None, None]:
+        yield "session"
+
+    def func(capital: Annotated[Capital, Depends(get_capital)], session: Annotated[str, Depends(get_session)]) -> None:
+        return None
+
+    graph = describe_graph(registry.get(func))
+
+    assert [node.call for node in graph.nodes] == [get_capital, get_mayor, get_session]
+    assert graph.depth == 2
+    assert graph.max_fan_out == 2
+    assert graph.generator_count == 1
+    assert graph.shared_count == 1
+
+
+def test_describe_graph_without_dependencies(registry: DependencyGraphRegistry) -> None:
+    graph = describe_graph(registry.get(get_mayor))
+
+    assert graph.nodes == ()
+    assert graph.edges == ()
+    assert graph.depth == 0
+    assert graph.max_fan_out == 0
@@ -1,10 +1,14 @@
 # type: ignore  # noqa: PGH003
 
+import asyncio
 from typing import Annotated
+from unittest.mock import patch
 
 from fastapi import Depends
 
+from src.fastapi_injectable.concurrency import run_coroutine_sync
 from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.scope import Scope, dependency_scope
 
 
 class Mayor:
@@ -307,3 +311,189 @@ def test_injectable_sync_with_async_wrap_function_without_cache() -> None:
     country_3 = injectable_get_country()
     assert country_1.capital is not country_2.capital is not country_3.capital
     assert country_1.capital.mayor is not country_2.capital.mayor is not country_3.capital.mayor
+
+
+async def test_injectable_async_concurrent_decorator_with_cache() -> None:
+    async def get_mayor() -> Mayor:
+        return Mayor()
+
+    async def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+        return Capital(mayor)
+
+    @injectable(concurrent=True)
+    async def get_country(
+        capital: Annotated[Capital, Depends(get_capital)], mayor: Annotated[Mayor, Depends(get_mayor)]
+    ) -> Country:
+        assert capital.mayor is mayor
+        return Country(capital)
+
+    country_1 = await get_country()
+    country_2 = await get_country()
+    assert country_1.capital is country_2.capital
+    assert country_1.capital.mayor is country_2.capital.mayor
+
+
+def test_injectable_sync_concurrent_decorator_without_cache() -> None:
+    async def get_mayor() -> Mayor:
+        return Mayor()
+
+    async def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+        return Capital(mayor)
+
+    @injectable(use_cache=False, concurrent=True)
+    def get_country(
+        capital: Annotated[Capital, Depends(get_capital)], mayor: Annotated[Mayor, Depends(get_mayor)]
+    ) -> Country:
+        assert capital.mayor is mayor
+        return Country(capital)
+
+    country_1 = get_country()
+    country_2 = get_country()
+    assert country_1.capital is not country_2.capital
+    assert country_1.capital.mayor is not country_2.capital.mayor
+
+
+def test_injectable_sync_only_resolves_in_calling_thread() -> None:
+    def get_mayor() -> Mayor:
+        return Mayor()
+
+    async def get_async_mayor() -> Mayor:
+        return Mayor()
+
+    @injectable
+    def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+        return Capital(mayor)
+
+    @injectable
+    def get_async_capital(mayor: Annotated[Mayor, Depends(get_async_mayor)]) -> Capital:
+        return Capital(mayor)
+
+    with patch("src.fastapi_injectable.decorator.run_coroutine_sync", wraps=run_coroutine_sync) as mock:
+        assert isinstance(get_capital().mayor, Mayor)
+        mock.assert_not_called()
+
+        assert isinstance(get_async_capital().mayor, Mayor)
+        mock.assert_called_once()
+
+
+def test_injectable_with_own_arguments_resolves_in_calling_thread() -> None:
+    def get_mayor() -> Mayor:
+        return Mayor()
+
+    @injectable
+    def get_capital(name: str, mayor: Annotated[Mayor, Depends(get_mayor)]) -> tuple[str, Capital]:
+        return name, Capital(mayor)
+
+    with patch("src.fastapi_injectable.decorator.run_coroutine_sync", wraps=run_coroutine_sync) as mock:
+        name, capital = get_capital("Paris")
+        mock.assert_not_called()
+
+    assert name == "Paris"
+    assert isinstance(capital.mayor, Mayor)
+
+
+async def test_injectable_with_own_arguments_coalesces_concurrent_resolutions() -> None:
+    calls: list[str] = []
+
+    async def get_mayor() -> Mayor:
+        calls.append("mayor")
+        await asyncio.sleep(0.05)
+        return Mayor()
+
+    @injectable
+    async def handle(name: str, mayor: Annotated[Mayor, Depends(get_mayor)]) -> tuple[str, Mayor]:
+        return name, mayor
+
+    results = await asyncio.gather(*(handle("m") for _ in range(200)))
+
+    assert calls == ["mayor"]
+    assert len({id(mayor) for _, mayor in results}) == 1
+    assert all(name == "m" for name, _ in results)
+
+
+def test_injectable_sync_map() -> None:
+    calls: list[str] = []
+
+    def get_mayor() -> Mayor:
+        calls.append("mayor")
+        return Mayor()
+
+    def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+        return Capital(mayor)
+
+    @injectable
+    def get_country(name: str, capital: Annotated[Capital, Depends(get_capital)]) -> tuple[str, Capital]:
+        return name, capital
+
+    results = list(get_country.map(["a", "b", "c"], concurrency=2))
+
+    assert [name for name, _ in results] == ["a", "b", "c"]
+    assert results[0][1] is results[1][1] is results[2][1]
+    assert calls == ["mayor"]
+
+
+async def test_injectable_async_amap() -> None:
+    calls: list[str] = []
+
+    async def get_mayor() -> Mayor:
+        calls.append("mayor")
+        return Mayor()
+
+    async def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+        return Capital(mayor)
+
+    @injectable
+    async def get_country(name: str, capital: Annotated[Capital, Depends(get_capital)]) -> tuple[str, Capital]:
+        return name, capital
+
+    results = [result async for result in get_country.amap(["a", "b", "c"], concurrency=2, ordered=False)]
+
+    assert sorted(name for name, _ in results) == ["a", "b", "c"]
+    assert results[0][1] is results[1][1] is results[2][1]
+    assert calls == ["mayor"]
+
+
+def test_injectable_sync_map_resolves_per_call_dependencies_per_item() -> None:
+    def get_mayor() -> Mayor:
+        return Mayor()
+
+    @dependency_scope(Scope.TRANSIENT)
+    def get_transient_mayor() -> Mayor:
+        return Mayor()
+
+    def get_capital(mayor: Annotated[Mayor, Depends(get_mayor, use_cache=False)]) -> Capital:
+        return Capital(mayor)
+
+    @injectable
+    def get_transient(name: int, mayor: Annotated[Mayor, Depends(get_transient_mayor)]) -> Mayor:
+        return mayor
+
+    @injectable
+    def get_uncached(name: int, capital: Annotated[Capital, Depends(get_capital, use_cache=False)]) -> Mayor:
+        return capital.mayor
+
+    @injectable(use_cache=False)
+    def get_without_cache(name: int, mayor: Annotated[Mayor, Depends(get_mayor)]) -> Mayor:
+        return mayor
+
+    for func in (get_transient, get_uncached, get_without_cache):
+        results = list(func.map(range(4), concurrency=4))
+        assert len({id(result) for result in results}) == 4
+
+
+async def test_injectable_async_amap_resolves_per_call_dependencies_per_item() -> None:
+    calls: list[str] = []
+
+    async def get_mayor() -> Mayor:
+        calls.append("mayor")
+        return Mayor()
+
+    @injectable(use_cache=False)
+    async def get_country(name: str, mayor: Annotated[Mayor, Depends(get_mayor)]) -> tuple[str, Mayor]:
+        return name, mayor
+
+    results = [result async for result in get_country.amap(["a", "b", "c"], concurrency=2)]
+
+    assert [name for name, _ in results] == ["a", "b", "c"]
+    assert len({id(mayor) for _, mayor in results}) == 3
+    assert calls == ["mayor"] * 3
@@ -1,10 +1,27 @@
-from collections.abc import Generator
+import asyncio
+from collections.abc import AsyncGenerator, Generator
+from typing import Annotated
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
-from fastapi import FastAPI
-
-from src.fastapi_injectable.main import DependencyResolveError, register_app, resolve_dependencies
+from fastapi import Depends, FastAPI, Request
+
+from src.fastapi_injectable import main
+from src.fastapi_injectable.backend import WeakValueBackend
+from src.fastapi_injectable.cache import DependencyCache
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.graph import DependencyGraphRegistry
+from src.fastapi_injectable.main import (
+    DependencyResolveError,
+    get_dependency_graph,
+    has_per_call_dependencies,
+    register_app,
+    resolve_dependencies,
+    resolve_dependencies_many,
+    resolve_dependencies_sync,
+    warmup,
+)
+from src.fastapi_injectable.scope import Scope, dependency_scope, injection_scope
 
 
 class DummyDependency:
@@ -19,7 +36,7 @@ def mock_solve_dependencies() -> Generator[Mock, None, None]:
 
 @pytest.fixture
 def mock_get_dependant() -> Generator[Mock, None, None]:
-    with patch("src.fastapi_injectable.main.get_dependant") as mock:
+    with patch("src.fastapi_injectable.graph.get_dependant") as mock:
         yield mock
 
 
@@ -40,25 +57,35 @@ def mock_async_exit_stack_manager() -> Generator[Mock, None, None]:
 @pytest.fixture
 def mock_app_lock() -> Generator[Mock, None, None]:
     with patch("src.fastapi_injectable.main._app_lock") as mock:
-        mock.__aenter__ = AsyncMock()
-        mock.__aexit__ = AsyncMock()
         yield mock
 
 
 @pytest.fixture
 def mock_get_app() -> Generator[Mock, None, None]:
     with patch("src.fastapi_injectable.main._get_app") as mock:
-        mock.return_value = Mock(spec=FastAPI)
+        mock.return_value = Mock(spec=FastAPI, dependency_overrides={})
         yield mock
 
 
+@patch("src.fastapi_injectable.main._app", None)
 async def test_register_app(mock_app_lock: Mock) -> None:
     app = Mock(spec=FastAPI)
 
     await register_app(app)
 
-    mock_app_lock.__aenter__.assert_awaited_once()
-    mock_app_lock.__aexit__.assert_awaited_once()
+    mock_app_lock.__enter__.assert_called_once()
+    mock_app_lock.__exit__.assert_called_once()
+
+
+@patch("src.fastapi_injectable.main._app", None)
+async def test_register_app_with_cache_backend(mock_dependency_cache: Mock) -> None:
+    backend = WeakValueBackend()
+
+    await register_app(Mock(spec=FastAPI))
+    mock_dependency_cache.set_backend.assert_not_called()
+
+    await register_app(Mock(spec=FastAPI), cache_backend=backend)
+    mock_dependency_cache.set_backend.assert_called_once_with(backend)
 
 
 async def test_resolve_dependencies_no_dependencies(
@@ -113,7 +140,7 @@ async def test_resolve_dependencies_with_cache(
     mock_dependency_cache.get.assert_called_once()
     mock_solve_dependencies.assert_awaited_once()
     assert dependencies == {"dep": mock_solve_dependencies.return_value.values["dep"]}
-    mock_dependency_cache.get.return_value.update.assert_called_once_with({"dep": dep_obj})
+    mock_dependency_cache.get.return_value.setdefault.assert_called_once_with("dep", dep_obj)
 
 
 async def test_resolve_dependencies_without_cache(
@@ -187,3 +214,354 @@ async def test_resolve_dependencies_log_warning_on_error(
             f"Something wrong when resolving dependencies of {func}, errors: {mock_solve_dependencies.return_value.errors}"  # noqa: E501
         )
         assert dependencies == {}
+
+
+@patch("src.fastapi_injectable.main._app", None)
+async def test_register_app_clears_dependency_graphs() -> None:
+    with patch("src.fastapi_injectable.main.dependency_graph_registry") as mock_registry:
+        await register_app(FastAPI())
+
+    mock_registry.clear.assert_called_once()
+
+
+@patch("src.fastapi_injectable.main._app", None)
+async def test_resolve_dependencies_with_dependency_overrides() -> None:
+    def get_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def get_overridden_dependency() -> DummyDependency:
+        return overridden
+
+    def func(dep: Annotated[DummyDependency, Depends(get_dependency)]) -> None:
+        return None
+
+    overridden = DummyDependency()
+    app = FastAPI()
+    await register_app(app)
+
+    dependencies = await resolve_dependencies(func, use_cache=False)
+    assert dependencies["dep"] is not overridden
+
+    app.dependency_overrides[get_dependency] = get_overridden_dependency
+    dependencies = await resolve_dependencies(func, use_cache=False)
+    assert dependencies["dep"] is overridden
+
+    app.dependency_overrides.clear()
+    dependencies = await resolve_dependencies(func, use_cache=False)
+    assert dependencies["dep"] is not overridden
+
+
+async def test_resolve_dependencies_with_request_dependency() -> None:
+    def get_scope_type(request: Request) -> str:
+        return str(request.scope["type"])
+
+    def func(scope_type: Annotated[str, Depends(get_scope_type)]) -> None:
+        return None
+
+    dependencies = await resolve_dependencies(func, raise_exception=True)
+
+    assert dependencies == {"scope_type": "http"}
+
+
+@pytest.fixture
+def registry() -> Generator[DependencyGraphRegistry, None, None]:
+    registry = DependencyGraphRegistry()
+    with patch("src.fastapi_injectable.main.dependency_graph_registry", registry):
+        yield registry
+
+
+@pytest.fixture
+def cache() -> Generator[DependencyCache, None, None]:
+    cache = DependencyCache()
+    with patch("src.fastapi_injectable.main.dependency_cache", cache):
+        yield cache
+
+
+async def test_warmup_builds_plans(registry: DependencyGraphRegistry, cache: DependencyCache) -> None:
+    def get_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def func(dep: Annotated[DummyDependency, Depends(get_dependency)]) -> None:
+        return None
+
+    registry.track(func, use_cache=True)
+    await warmup()
+
+    assert func in registry._plans
+    assert cache.get() == {}
+
+
+async def test_warmup_preload(registry: DependencyGraphRegistry, cache: DependencyCache) -> None:
+    calls: list[str] = []
+
+    async def get_pool() -> AsyncGenerator[str, None]:
+        calls.append("pool")
+        yield "pool"
+
+    def get_session(pool: Annotated[str, Depends(get_pool)]) -> str:
+        calls.append("session")
+        return f"session of {pool}"
+
+    def get_transient() -> str:
+        calls.append("transient")
+        return "transient"
+
+    def func_1(
+        session: Annotated[str, Depends(get_session)],
+        transient: Annotated[str, Depends(get_transient, use_cache=False)],
+    ) -> None:
+        return None
+
+    def func_2(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    def func_3(transient: Annotated[str, Depends(get_transient)]) -> None:
+        return None
+
+    registry.track(func_1, use_cache=True)
+    registry.track(func_2, use_cache=True)
+    registry.track(func_3, use_cache=False)
+    await warmup(preload=True)
+
+    assert sorted(calls) == ["pool", "session"]
+    assert cache.get() == {(get_pool, ()): "pool", (get_session, ()): "session of pool"}
+    assert await resolve_dependencies(func_1) == {"session": "session of pool", "transient": "transient"}
+    assert sorted(calls) == ["pool", "session", "transient"]
+
+
+async def test_warmup_log_warning_on_build_error(registry: DependencyGraphRegistry) -> None:
+    def func() -> None:
+        return None
+
+    registry.track(func, use_cache=True)
+    with (
+        patch.object(registry, "get_plan", side_effect=ValueError("broken")),
+        patch("src.fastapi_injectable.main.logger") as mock_logger,
+    ):
+        await warmup(preload=True)
+
+    mock_logger.warning.assert_called_once_with(
+        f"Something wrong when building the dependency graph of {func}, error: ValueError('broken')"
+    )
+
+
+async def test_warmup_raise_exception_on_build_error(registry: DependencyGraphRegistry) -> None:
+    def func() -> None:
+        return None
+
+    registry.track(func, use_cache=True)
+    with (
+        patch.object(registry, "get_plan", side_effect=ValueError("broken")),
+        pytest.raises(DependencyResolveError, match="Failed to build the dependency graph"),
+    ):
+        await warmup(raise_exception=True)
+
+
+async def test_warmup_preload_errors(registry: DependencyGraphRegistry, cache: DependencyCache) -> None:
+    def get_broken() -> None:
+        msg = "broken"
+        raise ValueError(msg)
+
+    def func(broken: Annotated[None, Depends(get_broken)]) -> None:
+        return None
+
+    registry.track(func, use_cache=True)
+    with patch("src.fastapi_injectable.main.logger") as mock_logger:
+        await warmup(preload=True)
+
+    mock_logger.warning.assert_called_once_with(
+        "Something wrong when preloading the cached dependencies, error: ValueError('broken')"
+    )
+    with pytest.raises(DependencyResolveError, match="Failed to preload the cached dependencies"):
+        await warmup(preload=True, raise_exception=True)
+
+
+async def test_resolve_dependencies_shares_fake_request_scope(
+    mock_solve_dependencies: AsyncMock,
+    mock_get_dependant: Mock,
+    mock_dependency_cache: Mock,
+    mock_async_exit_stack_manager: Mock,
+    mock_get_app: Mock,
+) -> None:
+    mock_solve_dependencies.return_value = AsyncMock(values={}, dependency_cache={})
+
+    def func() -> None:
+        return None
+
+    await resolve_dependencies(func)
+    await resolve_dependencies(func)
+    request_1, request_2 = (call[1]["request"] for call in mock_solve_dependencies.call_args_list)
+    assert request_1 is not request_2
+    assert request_1.scope is request_2.scope
+
+    mock_get_app.return_value = Mock(spec=FastAPI, dependency_overrides={})
+    await resolve_dependencies(func)
+    request_3 = mock_solve_dependencies.call_args[1]["request"]
+    assert request_3.scope is not request_1.scope
+    assert request_3.scope["app"] is mock_get_app.return_value
+
+
+async def test_resolve_dependencies_copies_fake_request_scope_on_state_use() -> None:
+    def get_visits(request: Request) -> int:
+        request.state.visits = getattr(request.state, "visits", 0) + 1
+        return int(request.state.visits)
+
+    def func(visits: Annotated[int, Depends(get_visits)]) -> None:
+        return None
+
+    assert await resolve_dependencies(func, use_cache=False) == {"visits": 1}
+    assert await resolve_dependencies(func, use_cache=False) == {"visits": 1}
+    assert "state" not in main._get_fake_request_scope(main._get_app())
+
+
+async def test_resolve_dependencies_many_shares_cache(cache: DependencyCache) -> None:
+    def get_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def get_query(q: str = "query") -> str:
+        return q
+
+    def func_1(dep: Annotated[DummyDependency, Depends(get_dependency)]) -> None:
+        return None
+
+    def func_2(dep: Annotated[DummyDependency, Depends(get_dependency)], q: Annotated[str, Depends(get_query)]) -> None:
+        return None
+
+    values_1, values_2 = await resolve_dependencies_many([func_1, func_2], use_cache=False)
+    assert values_1["dep"] is values_2["dep"]
+    assert values_2["q"] == "query"
+    assert cache.get() == {}
+
+    values_3, values_4 = await resolve_dependencies_many([func_1, func_2])
+    assert values_3["dep"] is values_4["dep"] is not values_1["dep"]
+    assert cache.get()[(get_dependency, ())] is values_3["dep"]
+
+
+def test_resolve_dependencies_sync(registry: DependencyGraphRegistry, cache: DependencyCache) -> None:
+    def get_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def get_resource(dep: Annotated[DummyDependency, Depends(get_dependency)]) -> Generator[str, None, None]:
+        yield "resource"
+
+    def func(
+        dep: Annotated[DummyDependency, Depends(get_dependency)], resource: Annotated[str, Depends(get_resource)]
+    ) -> None:
+        return None
+
+    values_1 = resolve_dependencies_sync(func)
+    values_2 = resolve_dependencies_sync(func)
+    values_3 = resolve_dependencies_sync(func, use_cache=False)
+
+    assert values_1 is not None
+    assert values_2 is not None
+    assert values_3 is not None
+    assert values_1["dep"] is values_2["dep"] is not values_3["dep"]
+    assert values_1["resource"] == "resource"
+    assert cache.get()[(get_dependency, ())] is values_1["dep"]
+
+
+def test_resolve_dependencies_sync_unsupported_graphs(registry: DependencyGraphRegistry) -> None:
+    async def get_async_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def with_async_dependency(dep: Annotated[DummyDependency, Depends(get_async_dependency)]) -> None:
+        return None
+
+    def with_request(request: Request) -> None:
+        return None
+
+    assert resolve_dependencies_sync(with_async_dependency) is None
+    assert resolve_dependencies_sync(with_request) is None
+
+
+async def test_has_per_call_dependencies(registry: DependencyGraphRegistry) -> None:
+    def get_singleton() -> DummyDependency:
+        return DummyDependency()
+
+    @dependency_scope(Scope.SCOPED)
+    def get_scoped(singleton: Annotated[DummyDependency, Depends(get_singleton)]) -> DummyDependency:
+        return singleton
+
+    def no_dependencies(name: str) -> None:
+        return None
+
+    def with_singleton(dep: Annotated[DummyDependency, Depends(get_singleton)]) -> None:
+        return None
+
+    def with_uncached(dep: Annotated[DummyDependency, Depends(get_singleton, use_cache=False)]) -> None:
+        return None
+
+    def with_scoped(dep: Annotated[DummyDependency, Depends(get_scoped)]) -> None:
+        return None
+
+    assert not has_per_call_dependencies(no_dependencies, use_cache=False)
+    assert has_per_call_dependencies(with_singleton, use_cache=False)
+    assert not has_per_call_dependencies(with_singleton)
+    assert has_per_call_dependencies(with_uncached)
+    assert has_per_call_dependencies(with_scoped)
+    async with injection_scope():
+        assert not has_per_call_dependencies(with_scoped)
+
+
+def test_get_dependency_graph(registry: DependencyGraphRegistry) -> None:
+    def get_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def get_another_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def func(dep: Annotated[DummyDependency, Depends(get_dependency)]) -> None:
+        return None
+
+    app = FastAPI()
+    app.dependency_overrides[get_dependency] = get_another_dependency
+
+    with patch("src.fastapi_injectable.main._app", app):
+        graph = get_dependency_graph(injectable(func))
+
+    assert [(node.call, node.overridden_call) for node in graph.nodes] == [(get_another_dependency, get_dependency)]
+    assert graph.depth == 1
+
+
+async def test_resolve_dependencies_with_request_and_scoped_dependency_on_empty_cache(cache: DependencyCache) -> None:
+    @dependency_scope(Scope.SCOPED)
+    def get_path(request: Request) -> str:
+        return str(request.scope["type"])
+
+    def get_dependency() -> DummyDependency:
+        return DummyDependency()
+
+    def func(path: Annotated[str, Depends(get_path)], dep: Annotated[DummyDependency, Depends(get_dependency)]) -> None:
+        return None
+
+    values = await resolve_dependencies(func)
+
+    assert values["path"] == "http"
+    assert cache.get() == {(get_dependency, ()): values["dep"]}
+
+
+async def test_resolve_dependencies_with_request_expires_bounded_cache(cache: DependencyCache) -> None:
+    calls: list[str] = []
+
+    def get_config() -> DummyDependency:
+        calls.append("config")
+        return DummyDependency()
+
+    def get_path(request: Request, config: Annotated[DummyDependency, Depends(get_config)]) -> str:
+        return str(request.scope["type"])
+
+    def func(config: Annotated[DummyDependency, Depends(get_config)], path: Annotated[str, Depends(get_path)]) -> None:
+        return None
+
+    cache.configure(ttl=0.1)
+    first = await resolve_dependencies(func)
+    assert (await resolve_dependencies(func))["config"] is first["config"]
+    # Resolving the graph again must not refresh the age of the cached values.
+    for _ in range(5):
+        await asyncio.sleep(0.03)
+        await resolve_dependencies(func)
+
+    assert len(calls) >= 2
+    await asyncio.sleep(0.11)
+    assert (await resolve_dependencies(func))["config"] is not first["config"]
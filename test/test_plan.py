@@ -0,0 +1,596 @@
+import asyncio
+import time
+from collections.abc import AsyncGenerator, Generator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from typing import Annotated, Any
+
+import pytest
+from fastapi import Depends, Request
+from fastapi.dependencies.utils import get_dependant
+
+from src.fastapi_injectable.cache import Flight, single_flight
+from src.fastapi_injectable.plan import (
+    DependencyKind,
+    ExecutionPlan,
+    compile_plan,
+    compile_warmup_plan,
+    get_dependency_kind,
+)
+from src.fastapi_injectable.scope import InjectionScope, Scope, dependency_scope
+
+
+class Mayor:
+    pass
+
+
+class Capital:
+    def __init__(self, mayor: Mayor) -> None:
+        self.mayor = mayor
+
+
+def get_mayor() -> Mayor:
+    return Mayor()
+
+
+async def get_capital(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Capital:
+    return Capital(mayor)
+
+
+def get_country(capital: Annotated[Capital, Depends(get_capital)], mayor: Annotated[Mayor, Depends(get_mayor)]) -> None:
+    return None
+
+
+def compile_func(func: Any) -> ExecutionPlan:  # noqa: ANN401
+    plan = compile_plan(get_dependant(path="command", call=func))
+    assert plan is not None
+    return plan
+
+
+def test_get_dependency_kind() -> None:
+    def sync_gen() -> Generator[None, None, None]:
+        yield
+
+    async def async_gen() -> AsyncGenerator[None, None]:
+        yield
+
+    class AsyncCallable:
+        async def __call__(self) -> None:
+            return None
+
+    assert get_dependency_kind(get_mayor) is DependencyKind.SYNC
+    assert get_dependency_kind(get_capital) is DependencyKind.ASYNC
+    assert get_dependency_kind(AsyncCallable()) is DependencyKind.ASYNC
+    assert get_dependency_kind(sync_gen) is DependencyKind.GENERATOR
+    assert get_dependency_kind(async_gen) is DependencyKind.ASYNC_GENERATOR
+
+
+def test_compile_plan_orders_and_shares_nodes() -> None:
+    plan = compile_func(get_country)
+
+    assert [node.call for node in plan.nodes] == [get_mayor, get_capital]
+    assert plan.nodes[1].arguments == (("mayor", 0),)
+    assert plan.arguments == (("capital", 1), ("mayor", 0))
+
+
+def test_compile_plan_does_not_share_uncached_nodes() -> None:
+    def func(
+        mayor_1: Annotated[Mayor, Depends(get_mayor, use_cache=False)],
+        mayor_2: Annotated[Mayor, Depends(get_mayor, use_cache=False)],
+    ) -> None:
+        return None
+
+    plan = compile_func(func)
+
+    assert len(plan.nodes) == 2
+    assert plan.arguments == (("mayor_1", 0), ("mayor_2", 1))
+
+
+def test_compile_plan_returns_none_when_request_data_is_needed() -> None:
+    def get_path(request: Request) -> str:
+        return request.url.path
+
+    def get_query(q: str) -> str:
+        return q
+
+    def with_request(path: Annotated[str, Depends(get_path)]) -> None:
+        return None
+
+    def with_nested_query(
+        capital: Annotated[Capital, Depends(get_capital)], q: Annotated[str, Depends(get_query)]
+    ) -> None:
+        return None
+
+    def with_root_request(request: Request, capital: Annotated[Capital, Depends(get_capital)]) -> None:
+        return None
+
+    assert compile_plan(get_dependant(path="command", call=with_request)) is None
+    assert compile_plan(get_dependant(path="command", call=with_nested_query)) is None
+    assert compile_plan(get_dependant(path="command", call=with_root_request)) is None
+
+
+def test_compile_plan_leaves_out_the_own_arguments_of_the_root() -> None:
+    def with_root_arguments(msg: str, count: int, capital: Annotated[Capital, Depends(get_capital)]) -> None:
+        return None
+
+    plan = compile_plan(get_dependant(path="command", call=with_root_arguments))
+
+    assert plan is not None
+    assert [node.call for node in plan.nodes] == [get_mayor, get_capital]
+    assert plan.arguments == (("capital", 1),)
+
+
+async def test_execution_plan_run_with_cache() -> None:
+    plan = compile_func(get_country)
+    cache: dict[Any, Any] = {}
+
+    values_1 = await plan.run(cache, AsyncExitStack())
+    values_2 = await plan.run(cache, AsyncExitStack())
+
+    assert values_1["capital"].mayor is values_1["mayor"]
+    assert values_1["capital"] is values_2["capital"]
+    assert cache == {(get_mayor, ()): values_1["mayor"], (get_capital, ()): values_1["capital"]}
+
+
+async def test_execution_plan_run_without_cache() -> None:
+    plan = compile_func(get_country)
+
+    values_1 = await plan.run({}, AsyncExitStack())
+    values_2 = await plan.run({}, AsyncExitStack())
+
+    assert values_1["capital"].mayor is values_1["mayor"]
+    assert values_1["capital"] is not values_2["capital"]
+
+
+async def test_execution_plan_run_uncached_node_keeps_cached_value() -> None:
+    def func(mayor: Annotated[Mayor, Depends(get_mayor, use_cache=False)]) -> None:
+        return None
+
+    cached_mayor = Mayor()
+    cache: dict[Any, Any] = {(get_mayor, ()): cached_mayor}
+
+    values = await compile_func(func).run(cache, AsyncExitStack())
+
+    assert values["mayor"] is not cached_mayor
+    assert cache[(get_mayor, ())] is cached_mayor
+
+
+async def test_execution_plan_run_generators_teardown_in_reverse_order() -> None:
+    events: list[str] = []
+
+    def get_sync_resource() -> Generator[str, None, None]:
+        events.append("enter sync")
+        yield "sync"
+        events.append("exit sync")
+
+    async def get_async_resource(
+        sync_resource: Annotated[str, Depends(get_sync_resource)],
+    ) -> AsyncGenerator[str, None]:
+        events.append("enter async")
+        yield f"async of {sync_resource}"
+        events.append("exit async")
+
+    def func(resource: Annotated[str, Depends(get_async_resource)]) -> None:
+        return None
+
+    async with AsyncExitStack() as stack:
+        values = await compile_func(func).run({}, stack)
+        assert values == {"resource": "async of sync"}
+        assert events == ["enter sync", "enter async"]
+
+    assert events == ["enter sync", "enter async", "exit async", "exit sync"]
+
+
+async def test_execution_plan_run_propagates_errors() -> None:
+    def get_broken() -> None:
+        msg = "broken"
+        raise ValueError(msg)
+
+    def func(broken: Annotated[None, Depends(get_broken)]) -> None:
+        return None
+
+    with pytest.raises(ValueError, match="broken"):
+        await compile_func(func).run({}, AsyncExitStack())
+
+
+def test_execution_plan_is_sync() -> None:
+    def get_resource() -> Generator[str, None, None]:
+        yield "resource"
+
+    def func(mayor: Annotated[Mayor, Depends(get_mayor)], resource: Annotated[str, Depends(get_resource)]) -> None:
+        return None
+
+    assert compile_func(func).is_sync
+    assert not compile_func(get_country).is_sync
+
+
+async def test_execution_plan_run_sync() -> None:
+    events: list[str] = []
+
+    def get_resource(mayor: Annotated[Mayor, Depends(get_mayor)]) -> Generator[Mayor, None, None]:
+        events.append("enter")
+        yield mayor
+        events.append("exit")
+
+    def func(
+        resource: Annotated[Mayor, Depends(get_resource)],
+        mayor: Annotated[Mayor, Depends(get_mayor)],
+        transient: Annotated[Mayor, Depends(get_mayor, use_cache=False)],
+    ) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+
+    async with AsyncExitStack() as stack:
+        values_1 = plan.run_sync(cache, stack)
+        values_2 = plan.run_sync(cache, stack)
+        assert events == ["enter"]
+
+    assert values_1["resource"] is values_1["mayor"] is values_2["mayor"]
+    assert values_1["transient"] is not values_1["mayor"]
+    assert values_1["transient"] is not values_2["transient"]
+    assert cache[(get_mayor, ())] is values_1["mayor"]
+    assert events == ["enter", "exit"]
+
+
+async def test_execution_plan_run_concurrently_resolves_independent_branches_concurrently() -> None:
+    calls: list[str] = []
+
+    async def get_shared() -> str:
+        calls.append("shared")
+        await asyncio.sleep(0.1)
+        return "shared"
+
+    async def get_redis(shared: Annotated[str, Depends(get_shared)]) -> str:
+        await asyncio.sleep(0.1)
+        return f"redis of {shared}"
+
+    async def get_postgres(shared: Annotated[str, Depends(get_shared)]) -> str:
+        await asyncio.sleep(0.1)
+        return f"postgres of {shared}"
+
+    def get_s3_config() -> str:
+        time.sleep(0.1)
+        return "s3"
+
+    def func(
+        redis: Annotated[str, Depends(get_redis)],
+        postgres: Annotated[str, Depends(get_postgres)],
+        s3_config: Annotated[str, Depends(get_s3_config)],
+    ) -> None:
+        return None
+
+    start = time.perf_counter()
+    values = await compile_func(func).run_concurrently({}, AsyncExitStack())
+    elapsed = time.perf_counter() - start
+
+    assert values == {"redis": "redis of shared", "postgres": "postgres of shared", "s3_config": "s3"}
+    assert calls == ["shared"]
+    assert elapsed < 0.3
+
+
+async def test_execution_plan_run_concurrently_uses_cache() -> None:
+    plan = compile_func(get_country)
+    cache: dict[Any, Any] = {}
+
+    values_1 = await plan.run_concurrently(cache, AsyncExitStack())
+    values_2 = await plan.run_concurrently(cache, AsyncExitStack())
+
+    assert values_1["capital"].mayor is values_1["mayor"]
+    assert values_1["capital"] is values_2["capital"]
+
+
+async def test_execution_plan_run_concurrently_generators_teardown_in_reverse_order() -> None:
+    events: list[str] = []
+
+    async def get_pool() -> AsyncGenerator[str, None]:
+        await asyncio.sleep(0.05)
+        events.append("enter pool")
+        yield "pool"
+        events.append("exit pool")
+
+    async def get_session(pool: Annotated[str, Depends(get_pool)]) -> AsyncGenerator[str, None]:
+        events.append("enter session")
+        yield f"session of {pool}"
+        events.append("exit session")
+
+    def get_client() -> Generator[str, None, None]:
+        events.append("enter client")
+        yield "client"
+        events.append("exit client")
+
+    def func(session: Annotated[str, Depends(get_session)], client: Annotated[str, Depends(get_client)]) -> None:
+        return None
+
+    async with AsyncExitStack() as stack:
+        values = await compile_func(func).run_concurrently({}, stack)
+        assert values == {"session": "session of pool", "client": "client"}
+
+    assert events.index("enter pool") < events.index("enter session")
+    assert events.index("exit session") < events.index("exit pool")
+    assert sorted(events) == sorted(
+        ["enter pool", "enter session", "enter client", "exit client", "exit session", "exit pool"]
+    )
+
+
+async def test_execution_plan_run_concurrently_cancels_pending_nodes_on_error() -> None:
+    cancelled = asyncio.Event()
+
+    async def get_slow() -> None:
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def get_broken() -> None:
+        msg = "broken"
+        raise ValueError(msg)
+
+    def func(slow: Annotated[None, Depends(get_slow)], broken: Annotated[None, Depends(get_broken)]) -> None:
+        return None
+
+    with pytest.raises(ValueError, match="broken"):
+        await compile_func(func).run_concurrently({}, AsyncExitStack())
+
+    assert cancelled.is_set()
+
+
+async def test_compile_warmup_plan() -> None:
+    def get_transient() -> str:
+        return "transient"
+
+    def get_session(
+        mayor: Annotated[Mayor, Depends(get_mayor)], transient: Annotated[str, Depends(get_transient, use_cache=False)]
+    ) -> str:
+        return transient
+
+    def get_unused(mayor: Annotated[Mayor, Depends(get_mayor)]) -> str:
+        return "unused"
+
+    @dependency_scope(Scope.SCOPED)
+    def get_scoped(mayor: Annotated[Mayor, Depends(get_mayor)]) -> str:
+        return "scoped"
+
+    def func_1(
+        session: Annotated[str, Depends(get_session)],
+        unused: Annotated[str, Depends(get_unused, use_cache=False)],
+        scoped: Annotated[str, Depends(get_scoped)],
+    ) -> None:
+        return None
+
+    plan = compile_warmup_plan([compile_func(func_1), compile_func(get_country)])
+
+    assert [node.call for node in plan.nodes] == [get_mayor, get_transient, get_session, get_capital]
+    assert plan.nodes[2].arguments == (("mayor", 0), ("transient", 1))
+    assert plan.nodes[3].arguments == (("mayor", 0),)
+    assert plan.arguments == ()
+
+    cache: dict[Any, Any] = {}
+    assert await plan.run(cache, AsyncExitStack()) == {}
+    assert set(cache) == {(get_mayor, ()), (get_transient, ()), (get_session, ()), (get_capital, ())}
+
+
+async def test_execution_plan_run_with_scopes() -> None:
+    events: list[str] = []
+
+    @dependency_scope(Scope.SCOPED)
+    def get_scoped() -> Generator[Mayor, None, None]:
+        yield Mayor()
+        events.append("exit scoped")
+
+    @dependency_scope(Scope.TRANSIENT)
+    async def get_transient() -> Mayor:
+        return Mayor()
+
+    def func(
+        mayor: Annotated[Mayor, Depends(get_mayor)],
+        scoped: Annotated[Mayor, Depends(get_scoped)],
+        transient: Annotated[Mayor, Depends(get_transient)],
+    ) -> None:
+        return None
+
+    plan = compile_func(func)
+    assert [node.scope for node in plan.nodes] == [Scope.SINGLETON, Scope.SCOPED, Scope.TRANSIENT]
+
+    for run in (plan.run, plan.run_concurrently):
+        cache: dict[Any, Any] = {}
+        scope = InjectionScope()
+        async with AsyncExitStack() as stack:
+            values_1 = await run(cache, stack, scope)
+            values_2 = await run(cache, stack, scope)
+            values_3 = await run(cache, stack)
+
+        assert values_1["mayor"] is values_2["mayor"] is values_3["mayor"]
+        assert values_1["scoped"] is values_2["scoped"] is not values_3["scoped"]
+        assert values_1["transient"] is not values_2["transient"]
+        assert cache == {(get_mayor, ()): values_1["mayor"]}
+        assert scope.cache == {(get_scoped, ()): values_1["scoped"]}
+        assert events == ["exit scoped"]
+        await scope.stack.aclose()
+        assert events == ["exit scoped", "exit scoped"]
+        events.clear()
+
+
+async def test_execution_plan_run_sync_with_scopes() -> None:
+    @dependency_scope(Scope.SCOPED)
+    def get_scoped() -> Generator[Mayor, None, None]:
+        yield Mayor()
+
+    def func(scoped: Annotated[Mayor, Depends(get_scoped)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+    scope = InjectionScope()
+
+    values_1 = plan.run_sync(cache, AsyncExitStack(), scope)
+    values_2 = plan.run_sync(cache, AsyncExitStack(), scope)
+
+    assert values_1["scoped"] is values_2["scoped"]
+    assert cache == {}
+
+
+async def test_execution_plan_run_coalesces_concurrent_resolutions() -> None:
+    calls: list[str] = []
+
+    async def get_pool() -> str:
+        calls.append("pool")
+        await asyncio.sleep(0.05)
+        return "pool"
+
+    def func(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+
+    results = await asyncio.gather(*(plan.run(cache, AsyncExitStack()) for _ in range(50)))
+
+    assert calls == ["pool"]
+    assert all(values == {"pool": "pool"} for values in results)
+
+
+async def test_execution_plan_run_coalesced_resolutions_share_errors() -> None:
+    calls: list[str] = []
+
+    async def get_broken() -> None:
+        calls.append("broken")
+        await asyncio.sleep(0.05)
+        msg = "broken"
+        raise ValueError(msg)
+
+    def func(broken: Annotated[None, Depends(get_broken)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    results = await asyncio.gather(*(plan.run({}, AsyncExitStack()) for _ in range(2)), return_exceptions=True)
+
+    assert calls == ["broken"] * 2
+    assert all(isinstance(result, ValueError) for result in results)
+
+    cache: dict[Any, Any] = {}
+    results = await asyncio.gather(*(plan.run(cache, AsyncExitStack()) for _ in range(5)), return_exceptions=True)
+
+    assert calls == ["broken"] * 3
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+async def test_execution_plan_run_retries_when_coalesced_resolution_is_cancelled() -> None:
+    calls: list[str] = []
+
+    async def get_pool() -> str:
+        calls.append("pool")
+        await asyncio.sleep(0.05)
+        return "pool"
+
+    def func(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+    leader = asyncio.create_task(plan.run(cache, AsyncExitStack()))
+    await asyncio.sleep(0.01)
+    follower = asyncio.create_task(plan.run(cache, AsyncExitStack()))
+    await asyncio.sleep(0.01)
+    leader.cancel()
+
+    assert await follower == {"pool": "pool"}
+    assert calls == ["pool", "pool"]
+    assert leader.cancelled()
+
+
+def test_execution_plan_run_sync_coalesces_concurrent_resolutions() -> None:
+    calls: list[str] = []
+
+    def get_pool() -> str:
+        calls.append("pool")
+        time.sleep(0.05)
+        return "pool"
+
+    def func(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: plan.run_sync(cache, AsyncExitStack()), range(8)))
+
+    assert calls == ["pool"]
+    assert all(values == {"pool": "pool"} for values in results)
+
+
+def test_execution_plan_run_sync_coalesced_resolutions_share_errors() -> None:
+    def get_broken() -> None:
+        time.sleep(0.05)
+        msg = "broken"
+        raise ValueError(msg)
+
+    def func(broken: Annotated[None, Depends(get_broken)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        futures = [executor.submit(plan.run_sync, cache, AsyncExitStack()) for _ in range(2)]
+
+    for future in futures:
+        with pytest.raises(ValueError, match="broken"):
+            future.result()
+
+
+async def test_execution_plan_run_sync_does_not_wait_in_event_loop() -> None:
+    calls: list[str] = []
+
+    def get_pool() -> str:
+        calls.append("pool")
+        return "pool"
+
+    def func(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+    _, flight = single_flight.join(cache, (get_pool, ()))
+    assert isinstance(flight, Flight)
+
+    assert plan.run_sync(cache, AsyncExitStack()) == {"pool": "pool"}
+    assert calls == ["pool"]
+
+    flight.resolve(cache, (get_pool, ()), "pool")
+
+
+def test_execution_plan_run_sync_retries_when_coalesced_resolution_is_cancelled() -> None:
+    def get_pool() -> str:
+        return "pool"
+
+    def func(pool: Annotated[str, Depends(get_pool)]) -> None:
+        return None
+
+    plan = compile_func(func)
+    cache: dict[Any, Any] = {}
+    _, flight = single_flight.join(cache, (get_pool, ()))
+    assert isinstance(flight, Flight)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(plan.run_sync, cache, AsyncExitStack())
+        time.sleep(0.05)
+        assert not future.done()
+        flight.fail(asyncio.CancelledError())
+
+        assert future.result() == {"pool": "pool"}
+
+
+def test_execution_plan_run_sync_propagates_errors_of_uncached_nodes() -> None:
+    def get_broken() -> None:
+        msg = "broken"
+        raise ValueError(msg)
+
+    def func(broken: Annotated[None, Depends(get_broken, use_cache=False)]) -> None:
+        return None
+
+    with pytest.raises(ValueError, match="broken"):
+        compile_func(func).run_sync({}, AsyncExitStack())
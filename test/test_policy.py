@@ -0,0 +1,250 @@
+import threading
+import time
+from collections.abc import AsyncGenerator, Callable, Generator
+from contextlib import AsyncExitStack
+from typing import Annotated
+from unittest.mock import patch
+
+import pytest
+from fastapi import Depends
+from fastapi.dependencies.utils import get_dependant
+
+from src.fastapi_injectable.cache import DependencyCache, Flight, single_flight
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.plan import compile_plan
+from src.fastapi_injectable.policy import CachePolicy, cached, get_cache_policy
+
+
+class Settings:
+    def __init__(self, region: str) -> None:
+        self.region = region
+
+
+class Rates:
+    def __init__(self, region: str) -> None:
+        self.region = region
+
+
+@pytest.fixture(autouse=True)
+def cache() -> Generator[DependencyCache, None, None]:
+    cache = DependencyCache()
+    with (
+        patch("src.fastapi_injectable.main.dependency_cache", cache),
+        patch("src.fastapi_injectable.plan.dependency_cache", cache),
+    ):
+        yield cache
+
+
+def test_cached() -> None:
+    def key(region: str) -> str:
+        return region
+
+    @cached(ttl=60, maxsize=10, key=key)
+    def get_rates(region: str) -> Rates:
+        return Rates(region)
+
+    def get_settings() -> None:
+        return None
+
+    assert get_cache_policy(get_rates) == CachePolicy(ttl=60, max_size=10, key=key)
+    assert get_cache_policy(get_settings) is None
+
+
+def test_cached_invalid() -> None:
+    with pytest.raises(ValueError, match="ttl must be positive"):
+        cached(ttl=0)
+    with pytest.raises(ValueError, match="maxsize must be positive"):
+        cached(maxsize=-1)
+    with pytest.raises(ValueError, match="stale_while_revalidate must be positive"):
+        cached(ttl=1, stale_while_revalidate=0)
+    with pytest.raises(ValueError, match="stale_while_revalidate requires a ttl"):
+        cached(stale_while_revalidate=1)
+
+
+def test_cached_stale_while_revalidate_generator() -> None:
+    def get_connection() -> Generator[str, None, None]:
+        yield "connection"  # pragma: no cover
+
+    async def aget_connection() -> AsyncGenerator[str, None]:
+        yield "connection"  # pragma: no cover
+
+    for func in (get_connection, aget_connection):
+        with pytest.raises(ValueError, match="not supported by generator dependencies"):
+            cached(ttl=1, stale_while_revalidate=1)(func)
+        assert get_cache_policy(cached(ttl=1)(func)) is not None
+
+
+def test_cache_policy_get_key() -> None:
+    settings = Settings("eu")
+
+    assert CachePolicy(ttl=None, max_size=None, key=None).get_key({"settings": settings}) == (("settings", settings),)
+    assert (
+        CachePolicy(ttl=None, max_size=None, key=lambda settings: settings.region).get_key({"settings": settings})
+        == "eu"
+    )
+
+
+def test_cached_dependency_is_keyed_on_its_resolved_arguments() -> None:
+    settings = Settings("eu")
+    calls: list[str] = []
+
+    def get_settings() -> Settings:
+        return settings
+
+    @cached(key=lambda settings: settings.region)
+    def get_rates(settings: Annotated[Settings, Depends(get_settings)]) -> Rates:
+        calls.append(settings.region)
+        return Rates(settings.region)
+
+    @injectable
+    def func(rates: Annotated[Rates, Depends(get_rates)]) -> Rates:
+        return rates
+
+    rates_1 = func()
+    rates_2 = func()
+    settings.region = "us"
+    rates_3 = func()
+    settings.region = "eu"
+
+    assert rates_1 is rates_2
+    assert rates_3.region == "us"
+    assert func() is rates_1
+    assert calls == ["eu", "us"]
+
+
+async def test_cached_async_dependency_expires(cache: DependencyCache) -> None:
+    @cached(ttl=10, maxsize=1)
+    async def get_rates() -> Rates:
+        return Rates("eu")
+
+    @injectable
+    async def func(rates: Annotated[Rates, Depends(get_rates)]) -> Rates:
+        return rates
+
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=time.monotonic()) as mock_monotonic:
+        rates_1 = await func()
+        assert await func() is rates_1
+        mock_monotonic.return_value += 10
+        rates_2 = await func()
+
+    assert rates_2 is not rates_1
+    assert cache.get() == {}
+
+
+def test_cached_dependency_without_cache() -> None:
+    @cached()
+    def get_rates() -> Rates:
+        return Rates("eu")
+
+    @injectable
+    def func(rates: Annotated[Rates, Depends(get_rates, use_cache=False)]) -> Rates:
+        return rates
+
+    assert func() is not func()
+
+
+def test_cached_dependency_is_not_cached_without_use_cache(cache: DependencyCache) -> None:
+    calls: list[str] = []
+
+    @cached()
+    def get_rates() -> Rates:
+        calls.append("eu")
+        return Rates("eu")
+
+    @injectable(use_cache=False)
+    def func(rates: Annotated[Rates, Depends(get_rates)]) -> Rates:
+        return rates
+
+    assert func() is not func()
+    assert calls == ["eu", "eu"]
+    assert len(cache.get_policy_cache(get_rates, max_size=None, ttl=None)) == 0
+
+
+async def test_cached_dependency_resolved_in_event_loop_while_in_flight(cache: DependencyCache) -> None:
+    @cached()
+    def get_rates() -> Rates:
+        return Rates("eu")
+
+    def func(rates: Annotated[Rates, Depends(get_rates)]) -> None:
+        return None
+
+    plan = compile_plan(get_dependant(path="command", call=func))
+    assert plan is not None
+    policy_cache = cache.get_policy_cache(get_rates, max_size=None, ttl=None)
+    cache_key = (get_rates, (), ())
+    _, flight = single_flight.join(policy_cache, cache_key)
+    assert isinstance(flight, Flight)
+
+    # Waiting for the resolution in flight would block the event loop, so the value is resolved again.
+    rates = plan.run_sync(cache.get(), AsyncExitStack())["rates"]
+
+    assert list(policy_cache) == [cache_key]
+    assert policy_cache[cache_key] is rates
+    flight.resolve(policy_cache, cache_key, rates)
+
+
+def wait_for(predicate: Callable[[], bool]) -> None:
+    deadline = time.perf_counter() + 5
+    while not predicate():
+        assert time.perf_counter() < deadline
+        time.sleep(0.01)
+
+
+def test_stale_while_revalidate() -> None:
+    refreshing = threading.Event()
+    release = threading.Event()
+    regions = ["eu", "us"]
+
+    @cached(ttl=10, stale_while_revalidate=60)
+    def get_rates() -> Rates:
+        if len(regions) == 1:
+            refreshing.set()
+            release.wait(5)
+        return Rates(regions.pop(0))
+
+    @injectable
+    def func(rates: Annotated[Rates, Depends(get_rates)]) -> Rates:
+        return rates
+
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=time.monotonic()) as mock_monotonic:
+        rates_1 = func()
+        mock_monotonic.return_value += 10
+
+        # Served stale right away, while a single refresh runs in the background.
+        assert func() is rates_1
+        assert refreshing.wait(5)
+        assert func() is rates_1
+        release.set()
+        wait_for(lambda: func() is not rates_1)
+        assert func().region == "us"
+
+        mock_monotonic.return_value += 70
+        regions.append("asia")
+        assert func().region == "asia"
+
+
+async def test_stale_while_revalidate_failure(caplog: pytest.LogCaptureFixture) -> None:
+    failures: list[str] = []
+
+    @cached(ttl=10, stale_while_revalidate=60)
+    async def get_rates() -> Rates:
+        if failures:
+            raise RuntimeError(failures[-1])
+        return Rates("eu")
+
+    @injectable
+    async def func(rates: Annotated[Rates, Depends(get_rates)]) -> Rates:
+        return rates
+
+    with patch("src.fastapi_injectable.cache.time.monotonic", return_value=time.monotonic()) as mock_monotonic:
+        rates_1 = await func()
+        failures.append("unavailable")
+        mock_monotonic.return_value += 10
+
+        assert await func() is rates_1
+        wait_for(lambda: "Failed to refresh the stale value" in caplog.text)
+        assert await func() is rates_1
+
+        mock_monotonic.return_value += 60
+        with pytest.raises(RuntimeError, match="unavailable"):
+            await func()
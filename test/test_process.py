@@ -0,0 +1,127 @@
+import os
+from collections.abc import Generator
+from typing import Annotated
+from unittest.mock import Mock, patch
+
+import pytest
+from fastapi import Depends, FastAPI
+
+from src.fastapi_injectable.cache import DependencyCache
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.process import (
+    InjectableProcessPoolExecutor,
+    _bootstrap_worker,
+    _call_in_worker,
+    _shutdown_worker,
+)
+
+
+def get_pid() -> int:
+    return os.getpid()
+
+
+def get_name() -> str:
+    return "default"
+
+
+def get_overridden_name() -> str:
+    return "overridden"
+
+
+def create_app() -> FastAPI:
+    app = FastAPI()
+    app.dependency_overrides[get_name] = get_overridden_name
+    return app
+
+
+@injectable
+def whoami(suffix: str, pid: Annotated[int, Depends(get_pid)], name: Annotated[str, Depends(get_name)]) -> str:
+    return f"{pid}:{name}:{suffix}"
+
+
+@injectable
+async def awhoami(pid: Annotated[int, Depends(get_pid)]) -> int:
+    return pid
+
+
+@pytest.fixture
+def executor() -> Generator[InjectableProcessPoolExecutor, None, None]:
+    with InjectableProcessPoolExecutor(max_workers=1, app_factory=create_app) as executor:
+        yield executor
+
+
+def test_submit_resolves_dependencies_in_worker(executor: InjectableProcessPoolExecutor) -> None:
+    pid, name, suffix = executor.submit(whoami, "a").result().split(":")
+
+    assert int(pid) != os.getpid()
+    assert name == "overridden"
+    assert suffix == "a"
+
+
+def test_submit_awaits_async_function_in_worker(executor: InjectableProcessPoolExecutor) -> None:
+    assert executor.submit(awhoami).result() != os.getpid()
+
+
+def test_map_resolves_dependencies_in_worker(executor: InjectableProcessPoolExecutor) -> None:
+    results = list(executor.map(whoami, ["a", "b", "c"], chunksize=2))
+
+    assert [result.split(":", 1)[1] for result in results] == ["overridden:a", "overridden:b", "overridden:c"]
+    assert len({result.split(":")[0] for result in results}) == 1
+
+
+def test_bootstrap_worker() -> None:
+    cache = DependencyCache()
+    cache.get()["key"] = "value"
+    policy_cache = cache.get_policy_cache(whoami, max_size=None, ttl=None)
+    policy_cache["key"] = "value"
+    app = FastAPI()
+    initializer = Mock()
+
+    with (
+        patch("src.fastapi_injectable.process.dependency_cache", cache),
+        patch("src.fastapi_injectable.process.async_exit_stack_manager") as mock_manager,
+        patch("src.fastapi_injectable.process.run_coroutine_sync") as mock_run,
+        patch("src.fastapi_injectable.process.register_app", Mock()) as mock_register_app,
+        patch("src.fastapi_injectable.process.multiprocessing.util.Finalize") as mock_finalize,
+    ):
+        _bootstrap_worker(lambda: app, initializer, (1, 2))
+
+    assert cache.get() == {}
+    assert len(policy_cache) == 0
+    mock_manager.reset.assert_called_once_with()
+    mock_register_app.assert_called_once_with(app)
+    mock_run.assert_called_once_with(mock_register_app.return_value)
+    mock_finalize.assert_called_once_with(None, _shutdown_worker, exitpriority=0)
+    initializer.assert_called_once_with(1, 2)
+
+
+def test_bootstrap_worker_without_app_factory_and_initializer() -> None:
+    with (
+        patch("src.fastapi_injectable.process.dependency_cache"),
+        patch("src.fastapi_injectable.process.async_exit_stack_manager"),
+        patch("src.fastapi_injectable.process.run_coroutine_sync") as mock_run,
+        patch("src.fastapi_injectable.process.multiprocessing.util.Finalize"),
+    ):
+        _bootstrap_worker(None, None, ())
+
+    mock_run.assert_not_called()
+
+
+def test_shutdown_worker() -> None:
+    with (
+        patch("src.fastapi_injectable.process.cleanup_all_exit_stacks", Mock()) as mock_cleanup,
+        patch("src.fastapi_injectable.process.run_coroutine_sync") as mock_run,
+        patch("src.fastapi_injectable.process.loop_manager") as mock_loop_manager,
+    ):
+        _shutdown_worker()
+
+    mock_run.assert_called_once_with(mock_cleanup.return_value)
+    mock_loop_manager.shutdown.assert_called_once_with()
+
+
+def test_call_in_worker() -> None:
+    async def add(a: int, b: int) -> int:
+        return a + b
+
+    assert _call_in_worker(lambda a, b: a + b, 1, b=2) == 3
+    assert _call_in_worker(add, 1, b=2) == 3
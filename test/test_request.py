@@ -0,0 +1,124 @@
+import json
+from collections.abc import AsyncGenerator
+from typing import Annotated, Any
+
+import pytest
+from fastapi import Depends, FastAPI, Header, Request
+
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.request import capture_request, get_current_request
+from src.fastapi_injectable.scope import Scope, dependency_scope
+
+
+class Session:
+    def __init__(self) -> None:
+        self.closed = False
+
+
+@dependency_scope(Scope.SCOPED)
+async def get_session() -> AsyncGenerator[Session, None]:
+    session = Session()
+    yield session
+    session.closed = True
+
+
+def get_user(x_user: Annotated[str, Header()]) -> str:
+    return x_user
+
+
+@injectable
+async def load(
+    session: Annotated[Session, Depends(get_session)], user: Annotated[str, Depends(get_user)]
+) -> tuple[Session, str]:
+    return session, user
+
+
+@injectable
+def load_sync(
+    session: Annotated[Session, Depends(get_session)], user: Annotated[str, Depends(get_user)]
+) -> tuple[Session, str]:
+    return session, user
+
+
+async def call(app: FastAPI, path: str) -> Any:  # noqa: ANN401
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"x-user", b"alice")],
+        "http_version": "1.1",
+        "scheme": "http",
+        "server": ("test", 80),
+        "client": ("test", 1234),
+    }
+    messages: list[dict[str, Any]] = []
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message: dict[str, Any]) -> None:
+        messages.append(message)
+
+    await app(scope, receive, send)
+    return json.loads(b"".join(message.get("body", b"") for message in messages))
+
+
+async def test_capture_request() -> None:
+    app = FastAPI(dependencies=[Depends(capture_request)])
+    sessions: list[Session] = []
+
+    @app.get("/async")
+    async def async_route(request: Request) -> dict[str, Any]:
+        session_1, user = await load()
+        session_2, _ = await load()
+        sessions.append(session_1)
+        return {
+            "shared": session_1 is session_2,
+            "closed": session_1.closed,
+            "user": user,
+            "request": get_current_request() is request,
+        }
+
+    @app.get("/sync")
+    def sync_route() -> dict[str, Any]:
+        session_1, user = load_sync()
+        session_2, _ = load_sync()
+        sessions.append(session_1)
+        return {"shared": session_1 is session_2, "closed": session_1.closed, "user": user, "request": True}
+
+    expected = {"shared": True, "closed": False, "user": "alice", "request": True}
+    assert await call(app, "/async") == expected
+    assert await call(app, "/sync") == expected
+
+    assert len(sessions) == 2
+    assert sessions[0] is not sessions[1]
+    assert all(session.closed for session in sessions)
+    assert get_current_request() is None
+
+
+async def test_capture_request_dependency_error() -> None:
+    app = FastAPI(dependencies=[Depends(capture_request)])
+    sessions: list[Session] = []
+
+    def get_session_of(session: Annotated[Session, Depends(get_session)]) -> Session:
+        sessions.append(session)
+        return session
+
+    def fail(session: Annotated[Session, Depends(get_session_of)], user: Annotated[str, Depends(get_user)]) -> None:
+        raise RuntimeError(user)
+
+    @injectable
+    async def load_failing(value: Annotated[None, Depends(fail)]) -> None:
+        return value
+
+    @app.get("/")
+    async def route() -> dict[str, Any]:
+        with pytest.raises(RuntimeError, match="alice"):
+            await load_failing()
+        return {"failed": True}
+
+    assert await call(app, "/") == {"failed": True}
+    assert len(sessions) == 1
@@ -0,0 +1,196 @@
+from collections.abc import AsyncGenerator, Generator
+from typing import Annotated
+
+from fastapi import Depends, Request
+
+from src.fastapi_injectable.decorator import injectable
+from src.fastapi_injectable.main import resolve_dependencies
+from src.fastapi_injectable.scope import Scope, dependency_scope, get_current_scope, get_scope, injection_scope
+from src.fastapi_injectable.util import cleanup_exit_stack_of_func
+
+
+class Pool:
+    pass
+
+
+class Session:
+    def __init__(self, pool: Pool) -> None:
+        self.pool = pool
+        self.closed = False
+
+
+def test_dependency_scope() -> None:
+    def get_pool() -> Pool:
+        return Pool()
+
+    @dependency_scope(Scope.TRANSIENT)
+    def get_session() -> None:
+        return None
+
+    assert get_scope(get_pool) is Scope.SINGLETON
+    assert get_scope(get_session) is Scope.TRANSIENT
+
+
+def test_injection_scope_sync() -> None:
+    def get_pool() -> Pool:
+        return Pool()
+
+    @dependency_scope(Scope.SCOPED)
+    def get_session(pool: Annotated[Pool, Depends(get_pool)]) -> Generator[Session, None, None]:
+        session = Session(pool)
+        yield session
+        session.closed = True
+
+    @injectable
+    def func(session: Annotated[Session, Depends(get_session)]) -> Session:
+        return session
+
+    with injection_scope() as scope:
+        assert get_current_scope() is scope
+        session_1 = func()
+        session_2 = func()
+        assert session_1 is session_2
+        assert not session_1.closed
+
+    assert get_current_scope() is None
+    assert session_1.closed
+    assert scope.cache == {}
+
+    with injection_scope():
+        session_3 = func()
+
+    assert session_3 is not session_1
+    assert session_3.pool is session_1.pool
+
+
+async def test_injection_scope_async() -> None:
+    @dependency_scope(Scope.SCOPED)
+    async def get_session() -> AsyncGenerator[Session, None]:
+        session = Session(Pool())
+        yield session
+        session.closed = True
+
+    @injectable
+    async def func(session: Annotated[Session, Depends(get_session)]) -> Session:
+        return session
+
+    async with injection_scope():
+        session_1 = await func()
+        session_2 = await func()
+        assert session_1 is session_2
+
+    assert session_1.closed
+
+    async with injection_scope():
+        assert await func() is not session_1
+
+
+def test_injection_scope_is_propagated_to_background_loop() -> None:
+    @dependency_scope(Scope.SCOPED)
+    async def get_session() -> Session:
+        return Session(Pool())
+
+    @injectable
+    def func(session: Annotated[Session, Depends(get_session)]) -> Session:
+        return session
+
+    with injection_scope():
+        assert func() is func()
+
+
+def test_scoped_without_injection_scope_is_resolved_per_call() -> None:
+    @dependency_scope(Scope.SCOPED)
+    def get_session() -> Session:
+        return Session(Pool())
+
+    @injectable
+    def func(
+        session_1: Annotated[Session, Depends(get_session)], session_2: Annotated[Session, Depends(get_session)]
+    ) -> tuple[Session, Session]:
+        return session_1, session_2
+
+    session_1, session_2 = func()
+    session_3, _ = func()
+
+    assert session_1 is session_2
+    assert session_1 is not session_3
+
+
+def test_transient() -> None:
+    @dependency_scope(Scope.TRANSIENT)
+    def get_session() -> Session:
+        return Session(Pool())
+
+    @injectable
+    def func(
+        session_1: Annotated[Session, Depends(get_session)], session_2: Annotated[Session, Depends(get_session)]
+    ) -> tuple[Session, Session]:
+        return session_1, session_2
+
+    with injection_scope():
+        session_1, session_2 = func()
+        session_3, _ = func()
+
+    assert session_1 is session_2
+    assert session_1 is not session_3
+
+
+async def test_injection_scope_with_request_dependency() -> None:
+    def get_pool() -> Pool:
+        return Pool()
+
+    @dependency_scope(Scope.SCOPED)
+    def get_session(request: Request, pool: Annotated[Pool, Depends(get_pool)]) -> Session:
+        return Session(pool)
+
+    @dependency_scope(Scope.TRANSIENT)
+    def get_transient() -> Pool:
+        return Pool()
+
+    def func(
+        session: Annotated[Session, Depends(get_session)], transient: Annotated[Pool, Depends(get_transient)]
+    ) -> None:
+        return None
+
+    async with injection_scope() as scope:
+        values_1 = await resolve_dependencies(func)
+        values_2 = await resolve_dependencies(func)
+        assert values_1["session"] is values_2["session"]
+        assert values_1["transient"] is not values_2["transient"]
+        assert scope.cache == {(get_session, ()): values_1["session"]}
+
+    values_3 = await resolve_dependencies(func)
+    values_4 = await resolve_dependencies(func)
+    assert values_3["session"] is not values_4["session"]
+    assert values_3["session"].pool is values_1["session"].pool
+
+
+async def test_injection_scope_with_request_dependency_cleans_up_each_generator_with_its_lifetime() -> None:
+    closed: list[str] = []
+
+    def get_pool() -> Generator[Pool, None, None]:
+        yield Pool()
+        closed.append("pool")
+
+    @dependency_scope(Scope.SCOPED)
+    def get_session(request: Request, pool: Annotated[Pool, Depends(get_pool)]) -> Generator[Session, None, None]:
+        yield Session(pool)
+        closed.append("session")
+
+    @dependency_scope(Scope.TRANSIENT)
+    async def get_transient(pool: Annotated[Pool, Depends(get_pool)]) -> AsyncGenerator[Pool, None]:
+        yield Pool()
+        closed.append("transient")
+
+    def func(
+        session: Annotated[Session, Depends(get_session)], transient: Annotated[Pool, Depends(get_transient)]
+    ) -> None:
+        return None
+
+    async with injection_scope():
+        await resolve_dependencies(func)
+        assert closed == []
+
+    assert closed == ["session"]
+    await cleanup_exit_stack_of_func(func)
+    assert sorted(closed) == ["pool", "session", "transient"]
@@ -1,15 +1,25 @@
+import asyncio
 import signal
 from collections.abc import AsyncGenerator, Generator
-from typing import Any
+from typing import Annotated, Any
 from unittest.mock import AsyncMock, Mock, patch
 
 import pytest
+from fastapi import Depends
 
+from src.fastapi_injectable.concurrency import run_coroutine_sync
+from src.fastapi_injectable.decorator import injectable
 from src.fastapi_injectable.util import (
+    aget_injected_obj,
     cleanup_all_exit_stacks,
     cleanup_exit_stack_of_func,
     clear_dependency_cache,
+    configure_dependency_cache,
+    configure_loop_pool,
+    get_dependency_cache_stats,
     get_injected_obj,
+    get_injected_objs,
+    invalidate_dependency_cache,
     setup_graceful_shutdown,
 )
 
@@ -191,6 +201,88 @@ async def test_clear_dependency_cache(mock_dependency_cache: Mock) -> None:
     mock_dependency_cache.clear.assert_awaited_once()
 
 
+async def test_invalidate_dependency_cache() -> None:
+    calls: list[str] = []
+
+    def get_settings() -> DummyDependency:
+        calls.append("settings")
+        return DummyDependency()
+
+    def get_client(settings: Annotated[DummyDependency, Depends(get_settings)]) -> DummyDependency:
+        calls.append("client")
+        return DummyDependency()
+
+    def get_pool() -> DummyDependency:
+        calls.append("pool")
+        return DummyDependency()
+
+    @injectable
+    async def func(
+        client: Annotated[DummyDependency, Depends(get_client)], pool: Annotated[DummyDependency, Depends(get_pool)]
+    ) -> tuple[DummyDependency, DummyDependency]:
+        return client, pool
+
+    client_1, pool_1 = await func()
+    assert await invalidate_dependency_cache(get_settings) == 2
+    client_2, pool_2 = await func()
+
+    assert calls == ["settings", "client", "pool", "settings", "client"]
+    assert client_2 is not client_1
+    assert pool_2 is pool_1
+
+
+def test_configure_dependency_cache(mock_dependency_cache: Mock) -> None:
+    configure_dependency_cache(max_size=10, ttl=60)
+    mock_dependency_cache.configure.assert_called_once_with(max_size=10, ttl=60)
+
+
+async def test_aget_injected_obj(mock_run_coroutine_sync: Mock) -> None:
+    loops: list[asyncio.AbstractEventLoop] = []
+    shared = DummyDependency()
+
+    async def get_shared() -> DummyDependency:
+        loops.append(asyncio.get_running_loop())
+        return shared
+
+    def get_sync(
+        attr_1: int, shared: Annotated[DummyDependency, Depends(get_shared)], attr_2: str = ""
+    ) -> DummyDependency:
+        return DummyDependency(attr_1, attr_2)
+
+    async def get_async(shared: Annotated[DummyDependency, Depends(get_shared)]) -> DummyDependency:
+        return shared
+
+    def get_sync_gen(shared: Annotated[DummyDependency, Depends(get_shared)]) -> Generator[DummyDependency, None, None]:
+        yield shared
+
+    async def get_async_gen(
+        shared: Annotated[DummyDependency, Depends(get_shared)],
+    ) -> AsyncGenerator[DummyDependency, None]:
+        yield shared
+
+    dependency = await aget_injected_obj(get_sync, [1], {"attr_2": "test"}, use_cache=False)
+    assert (dependency.attr_1, dependency.attr_2) == (1, "test")
+    assert await aget_injected_obj(get_async, use_cache=False) is shared
+    assert await aget_injected_obj(get_sync_gen, use_cache=False) is shared
+    assert await aget_injected_obj(get_async_gen, use_cache=False) is shared
+    assert await aget_injected_obj(injectable(get_async), use_cache=False) is shared
+
+    mock_run_coroutine_sync.assert_not_called()
+    assert loops == [asyncio.get_running_loop()] * 5
+
+
+def test_configure_loop_pool() -> None:
+    with patch("src.fastapi_injectable.util.loop_manager") as mock_loop_manager:
+        configure_loop_pool(4, sharding="round-robin")
+    mock_loop_manager.configure.assert_called_once_with(
+        4, sharding="round-robin", inline=False, on_running_loop="offload", loop_factory=None
+    )
+
+
+def test_get_dependency_cache_stats(mock_dependency_cache: Mock) -> None:
+    assert get_dependency_cache_stats() is mock_dependency_cache.stats.return_value
+
+
 def test_setup_graceful_shutdown(mock_run_coroutine_sync: Mock) -> None:
     with patch("src.fastapi_injectable.util.atexit.register") as mock_register:  # noqa: SIM117
         with patch("src.fastapi_injectable.util.signal.signal") as mock_signal:
@@ -234,3 +326,36 @@ async def test_setup_graceful_shutdown_handler_called(mock_run_coroutine_sync: M
             await cleanup_coro
 
             assert cleanup_coro.__name__ == "cleanup_all_exit_stacks"
+
+
+def test_get_injected_objs() -> None:
+    calls: list[str] = []
+
+    def get_shared() -> DummyDependency:
+        calls.append("shared")
+        return DummyDependency()
+
+    def get_sync(shared: Annotated[DummyDependency, Depends(get_shared)]) -> DummyDependency:
+        return shared
+
+    async def get_async(shared: Annotated[DummyDependency, Depends(get_shared)]) -> DummyDependency:
+        return shared
+
+    def get_sync_gen(shared: Annotated[DummyDependency, Depends(get_shared)]) -> Generator[DummyDependency, None, None]:
+        yield shared
+
+    async def get_async_gen(
+        shared: Annotated[DummyDependency, Depends(get_shared)],
+    ) -> AsyncGenerator[DummyDependency, None]:
+        yield shared
+
+    with patch("src.fastapi_injectable.util.run_coroutine_sync", wraps=run_coroutine_sync) as mock:
+        results = get_injected_objs(
+            [get_sync, get_async, get_sync_gen, get_async_gen, injectable(get_sync)], use_cache=False
+        )
+
+    mock.assert_called_once()
+    assert calls == ["shared"]
+    assert len(results) == 5
+    assert all(result is results[0] for result in results)
+    assert isinstance(results[0], DummyDependency)